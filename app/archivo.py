@@ -0,0 +1,101 @@
+"""
+Archivo de solicitudes ya procesadas
+Mueve a solicitudes_archivo (partición fría, una sub-partición por año de fecha_solicitud)
+las solicitudes decididas, con la respuesta enviada y sin cambios hace ARCHIVO_DIAS.
+Así el cron y /action trabajan sobre solicitudes_activas, que no crece con el historial.
+
+Corre al final del cron de notificaciones; también se puede correr a mano:
+    python archivo.py --lote 5000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import db
+
+ARCHIVO_DIAS = int(os.getenv("ARCHIVO_DIAS", 30))  # 0 = no archivar
+ARCHIVO_LOTE = int(os.getenv("ARCHIVO_LOTE", 5000))  # filas por transacción
+
+# Nada que el cron (respuestas, resumen de novedades) o /action/lote todavía necesiten
+CONDICION = """
+    estado IN ('Aceptado', 'Rechazado')
+    AND email_respuesta_enviado
+    AND fecha_actualizacion < NOW() - make_interval(days => %(dias)s)
+"""
+
+SQL_ANIOS = f"""
+    SELECT DISTINCT extract(year FROM fecha_solicitud AT TIME ZONE 'UTC')::int AS anio
+    FROM solicitudes_activas
+    WHERE {CONDICION}
+"""
+
+# Moverla por la tabla particionada cambia la fila de partición (DELETE + INSERT internos);
+# las estadísticas no cambian porque solo cambia archivada
+SQL_MOVER_LOTE = f"""
+    UPDATE solicitudes_adopcion
+    SET archivada = TRUE
+    WHERE archivada = FALSE
+    AND id IN (
+        SELECT id FROM solicitudes_activas
+        WHERE {CONDICION}
+        LIMIT %(lote)s
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+
+async def crear_particion(anio: int):
+    """Crea solicitudes_archivo_<año> si no existe (antes de mover filas de ese año)"""
+    nombre = f"solicitudes_archivo_{anio}"
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute("SELECT to_regclass(%s) IS NOT NULL AS existe", (nombre,))
+        if (await cur.fetchone())['existe']:
+            return
+        await cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {nombre} PARTITION OF solicitudes_archivo
+            FOR VALUES FROM ('{anio}-01-01 00:00+00') TO ('{anio + 1}-01-01 00:00+00')
+        """)
+    print(f"✅ Partición {nombre} creada")
+
+
+async def archivar(dias: int = ARCHIVO_DIAS, lote: int = ARCHIVO_LOTE) -> int:
+    """Mueve al archivo todas las solicitudes procesadas; devuelve cuántas movió"""
+    if dias <= 0:
+        return 0
+
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute(SQL_ANIOS, {"dias": dias})
+        anios = [fila['anio'] for fila in await cur.fetchall()]
+    for anio in anios:
+        await crear_particion(anio)
+
+    movidas = 0
+    while True:
+        async with db.conexion() as conn, conn.cursor() as cur:
+            await cur.execute(SQL_MOVER_LOTE, {"dias": dias, "lote": lote})
+            cantidad = cur.rowcount
+        if cantidad <= 0:
+            return movidas
+        movidas += cantidad
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dias", type=int, default=ARCHIVO_DIAS, help="días sin cambios antes de archivar")
+    parser.add_argument("--lote", type=int, default=ARCHIVO_LOTE, help="filas por transacción")
+    args = parser.parse_args()
+
+    await db.abrir_pool()
+    try:
+        inicio = time.perf_counter()
+        movidas = await archivar(args.dias, args.lote)
+    finally:
+        await db.cerrar_pool()
+    print(f"✅ {movidas} solicitudes archivadas ({time.perf_counter() - inicio:.1f}s)")
+    print("El espacio de solicitudes_activas se reutiliza después del VACUUM (autovacuum o VACUUM manual)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
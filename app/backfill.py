@@ -0,0 +1,44 @@
+"""
+Backfill de respuestas del formulario a solicitudes_adopcion
+
+Lee NDJSON (una respuesta del formulario por línea, mismo formato que /webhook/form)
+desde un archivo o stdin y lo carga con COPY en lotes, usando la base de las variables DB_*.
+
+Uso:
+    python backfill.py respuestas.jsonl --notificar ninguno
+    cat respuestas.jsonl | python backfill.py - --lote 1000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+import db
+from ingesta import NOTIFICAR, LOTE_INGESTA, ingerir_ndjson
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archivo", help="archivo NDJSON ('-' para stdin)")
+    parser.add_argument("--lote", type=int, default=LOTE_INGESTA, help="filas por transacción")
+    parser.add_argument("--notificar", choices=NOTIFICAR, default="ninguno",
+                        help="avisos al equipo: ninguno, resumen por lote o uno por solicitud")
+    args = parser.parse_args()
+
+    origen = sys.stdin.buffer if args.archivo == "-" else open(args.archivo, "rb")
+    await db.abrir_pool()
+    try:
+        with origen:
+            resultado = await ingerir_ndjson(iter(lambda: origen.read(1 << 16), b""),
+                                             notificar=args.notificar, lote=args.lote)
+    finally:
+        await db.cerrar_pool()
+
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    if args.notificar != "ninguno":
+        print("Los avisos quedaron en email_outbox; los envía el worker del servicio o el próximo cron")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
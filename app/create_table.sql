@@ -1,9 +1,25 @@
 -- Script de creación de tabla para Supabase
 -- Ejecutar en: Dashboard > SQL Editor
 
+-- solicitudes_adopcion está particionada en caliente/frío por la columna archivada:
+--   solicitudes_activas  (archivada = false): todo lo que el cron o /action todavía pueden tocar
+--   solicitudes_archivo  (archivada = true):  solicitudes decididas y respondidas, movidas por
+--                                             archivo.py y particionadas por año de fecha_solicitud
+-- Los caminos de escritura usan solicitudes_activas directamente; el panel, la búsqueda, la
+-- exportación y las estadísticas leen solicitudes_adopcion (todo el historial).
+
+-- Instalaciones anteriores: la tabla existente pasa a ser la partición caliente (sin copiar datos)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass('solicitudes_adopcion') AND relkind = 'r') THEN
+        ALTER TABLE solicitudes_adopcion RENAME TO solicitudes_activas;
+    END IF;
+END
+$$;
+
 CREATE TABLE IF NOT EXISTS solicitudes_adopcion (
     -- Identificadores
-    id TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
     
     -- Timestamps del sistema
     fecha_solicitud TIMESTAMPTZ NOT NULL,
@@ -34,19 +50,365 @@ CREATE TABLE IF NOT EXISTS solicitudes_adopcion (
     nombre_peludo TEXT,
     
     -- JSON completo del formulario (backup de todos los campos)
-    datos_completos JSONB
-);
+    datos_completos JSONB,
+    
+    -- Huella de la respuesta (Idempotency-Key o hash del contenido) para descartar reenvíos
+    huella TEXT,
+    
+    -- Búsqueda del panel: texto completo (con ranking) + trigramas para nombres parciales,
+    -- handles de Instagram, teléfonos (solo dígitos) y errores de tipeo
+    busqueda TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(nombre_apellido, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(instagram, '') || ' ' || coalesce(celular, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(nombre_peludo, '')), 'B') ||
+        setweight(jsonb_to_tsvector('spanish', coalesce(datos_completos, '{}'), '["string"]'), 'C')
+    ) STORED,
+    busqueda_texto TEXT GENERATED ALWAYS AS (
+        lower(
+            coalesce(nombre_apellido, '') || ' ' || coalesce(instagram, '') || ' ' ||
+            coalesce(celular, '') || ' ' || regexp_replace(coalesce(celular, ''), '\D', '', 'g') || ' ' ||
+            coalesce(nombre_peludo, '')
+        )
+    ) STORED,
+    
+    -- Partición: false = caliente, true = archivo
+    archivada BOOLEAN NOT NULL DEFAULT FALSE
+) PARTITION BY LIST (archivada);
+
+-- Completa la tabla anterior (renombrada arriba) y la engancha como partición caliente
+DO $$
+BEGIN
+    IF to_regclass('solicitudes_activas') IS NOT NULL
+       AND NOT (SELECT relispartition FROM pg_class WHERE oid = to_regclass('solicitudes_activas')) THEN
+        ALTER TABLE solicitudes_activas ADD COLUMN IF NOT EXISTS huella TEXT;
+        ALTER TABLE solicitudes_activas ADD COLUMN IF NOT EXISTS busqueda TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('spanish', coalesce(nombre_apellido, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(instagram, '') || ' ' || coalesce(celular, '')), 'A') ||
+            setweight(to_tsvector('spanish', coalesce(nombre_peludo, '')), 'B') ||
+            setweight(jsonb_to_tsvector('spanish', coalesce(datos_completos, '{}'), '["string"]'), 'C')
+        ) STORED;
+        ALTER TABLE solicitudes_activas ADD COLUMN IF NOT EXISTS busqueda_texto TEXT GENERATED ALWAYS AS (
+            lower(
+                coalesce(nombre_apellido, '') || ' ' || coalesce(instagram, '') || ' ' ||
+                coalesce(celular, '') || ' ' || regexp_replace(coalesce(celular, ''), '\D', '', 'g') || ' ' ||
+                coalesce(nombre_peludo, '')
+            )
+        ) STORED;
+        -- DEFAULT constante: no reescribe la tabla; el CHECK evita el escaneo del ATTACH
+        ALTER TABLE solicitudes_activas ADD COLUMN IF NOT EXISTS archivada BOOLEAN NOT NULL DEFAULT FALSE
+            CONSTRAINT solicitudes_activas_no_archivada CHECK (archivada = FALSE);
+        ALTER TABLE solicitudes_adopcion ATTACH PARTITION solicitudes_activas FOR VALUES IN (FALSE);
+    END IF;
+END
+$$;
+
+-- Instalación nueva
+CREATE TABLE IF NOT EXISTS solicitudes_activas PARTITION OF solicitudes_adopcion (
+    PRIMARY KEY (id)
+) FOR VALUES IN (FALSE);
+
+CREATE TABLE IF NOT EXISTS solicitudes_archivo PARTITION OF solicitudes_adopcion
+    FOR VALUES IN (TRUE) PARTITION BY RANGE (fecha_solicitud);
+
+-- Por si una fecha no tiene su partición anual (archivo.py las crea antes de mover filas)
+CREATE TABLE IF NOT EXISTS solicitudes_archivo_otras PARTITION OF solicitudes_archivo DEFAULT;
+
+-- Índices para mejorar rendimiento de queries (partición caliente)
+CREATE INDEX IF NOT EXISTS idx_solicitudes_estado ON solicitudes_activas(estado);
+CREATE INDEX IF NOT EXISTS idx_solicitudes_email ON solicitudes_activas(email);
+CREATE INDEX IF NOT EXISTS idx_solicitudes_nombre_peludo ON solicitudes_activas(nombre_peludo);
+
+-- Índices parciales para el cron de notificaciones (solo cubren las filas que todavía tiene que procesar;
+-- el de respuestas está más abajo, junto a sus columnas de reintento)
+CREATE INDEX IF NOT EXISTS idx_solicitudes_pendientes
+    ON solicitudes_activas(fecha_solicitud)
+    WHERE estado = 'Pendiente' AND fecha_aceptado IS NULL AND fecha_rechazado IS NULL;
+
+-- Listado del panel con paginación keyset sobre (fecha_solicitud, id): sin filtros y por estado.
+-- El de orden reemplaza al que tenía solo fecha_solicitud (no alcanzaba para el keyset y con
+-- las particiones el listado sin filtros terminaba en Seq Scan + Sort)
+DROP INDEX IF EXISTS idx_solicitudes_fecha_solicitud;
+CREATE INDEX IF NOT EXISTS idx_solicitudes_orden
+    ON solicitudes_activas(fecha_solicitud DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_solicitudes_listado
+    ON solicitudes_activas(estado, fecha_solicitud DESC, id DESC);
 
--- Índices para mejorar rendimiento de queries
-CREATE INDEX IF NOT EXISTS idx_solicitudes_estado ON solicitudes_adopcion(estado);
-CREATE INDEX IF NOT EXISTS idx_solicitudes_fecha_solicitud ON solicitudes_adopcion(fecha_solicitud DESC);
-CREATE INDEX IF NOT EXISTS idx_solicitudes_email ON solicitudes_adopcion(email);
-CREATE INDEX IF NOT EXISTS idx_solicitudes_nombre_peludo ON solicitudes_adopcion(nombre_peludo);
+-- Filtro por zona del listado y de la exportación (mismo orden keyset)
+CREATE INDEX IF NOT EXISTS idx_solicitudes_zona
+    ON solicitudes_activas(zona, fecha_solicitud DESC, id DESC);
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_solicitudes_busqueda ON solicitudes_activas USING GIN (busqueda);
+CREATE INDEX IF NOT EXISTS idx_solicitudes_busqueda_trgm
+    ON solicitudes_activas USING GIN (busqueda_texto gin_trgm_ops);
+
+-- Resumen incremental: solicitudes resueltas desde el último resumen
+CREATE INDEX IF NOT EXISTS idx_solicitudes_fecha_actualizacion ON solicitudes_activas(fecha_actualizacion);
+
+-- Una respuesta del formulario se inserta una sola vez (las filas viejas sin huella no chocan).
+-- Solo en la partición caliente: los reintentos llegan minutos después, nunca sobre una archivada.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_solicitudes_huella ON solicitudes_activas(huella);
+
+-- Envío de la respuesta al solicitante (aceptado/rechazado): cada falla suma un intento y
+-- posterga el próximo (backoff); al agotar los intentos queda respuesta_fallida y el cron
+-- no la vuelve a tomar (aparece en la vista emails_fallidos)
+ALTER TABLE solicitudes_adopcion ADD COLUMN IF NOT EXISTS respuesta_intentos INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE solicitudes_adopcion ADD COLUMN IF NOT EXISTS respuesta_proximo_intento TIMESTAMPTZ;
+ALTER TABLE solicitudes_adopcion ADD COLUMN IF NOT EXISTS respuesta_ultimo_error TEXT;
+ALTER TABLE solicitudes_adopcion ADD COLUMN IF NOT EXISTS respuesta_fallida BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Edad y celular tipados (formulario.edad_anios / celular_digitos) para la exportación
+ALTER TABLE solicitudes_adopcion ADD COLUMN IF NOT EXISTS edad_anios SMALLINT;
+ALTER TABLE solicitudes_adopcion ADD COLUMN IF NOT EXISTS celular_digitos TEXT;
+
+-- Filas cargadas antes de estas columnas: mismas reglas que formulario.py
+-- (primer número de la edad si está entre 1 y 119; celular sin lo que no sea dígito)
+UPDATE solicitudes_adopcion
+SET celular_digitos = regexp_replace(coalesce(celular, ''), '\D', '', 'g'),
+    edad_anios = (
+        SELECT CASE WHEN n BETWEEN 1 AND 119 THEN n END
+        FROM (SELECT substring(substring(edad FROM '\d+') FROM '^0*(\d{1,3})$')::int AS n) AS e
+    )
+WHERE celular_digitos IS NULL;
+
+DROP INDEX IF EXISTS idx_solicitudes_respuesta_pendiente;
+CREATE INDEX IF NOT EXISTS idx_solicitudes_respuesta_por_enviar
+    ON solicitudes_activas(estado, fecha_solicitud)
+    WHERE email_respuesta_enviado IS NOT TRUE AND NOT respuesta_fallida;
+
+-- Cola de fallidos (vista emails_fallidos y /emails/fallidos/reintentar): pocas filas
+CREATE INDEX IF NOT EXISTS idx_solicitudes_respuesta_fallida
+    ON solicitudes_activas(fecha_actualizacion)
+    WHERE respuesta_fallida;
+
+-- Índices del archivo (se crean en cada partición anual): lo que usan el panel y /action
+CREATE INDEX IF NOT EXISTS idx_archivo_id ON solicitudes_archivo(id);
+CREATE INDEX IF NOT EXISTS idx_archivo_orden ON solicitudes_archivo(fecha_solicitud DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_archivo_listado ON solicitudes_archivo(estado, fecha_solicitud DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_archivo_zona ON solicitudes_archivo(zona, fecha_solicitud DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_archivo_nombre_peludo ON solicitudes_archivo(nombre_peludo);
+CREATE INDEX IF NOT EXISTS idx_archivo_busqueda ON solicitudes_archivo USING GIN (busqueda);
+CREATE INDEX IF NOT EXISTS idx_archivo_busqueda_trgm ON solicitudes_archivo USING GIN (busqueda_texto gin_trgm_ops);
 
 -- Comentarios para documentación
 COMMENT ON TABLE solicitudes_adopcion IS 'Tabla principal de solicitudes de adopción';
 COMMENT ON COLUMN solicitudes_adopcion.id IS 'ID único generado con formato SOL-XXXXXXXX';
 COMMENT ON COLUMN solicitudes_adopcion.estado IS 'Estados posibles: Pendiente, Aceptado, Rechazado';
-COMMENT ON COLUMN solicitudes_adopcion.datos_completos IS 'JSON con todos los campos del formulario original';
+COMMENT ON COLUMN solicitudes_adopcion.datos_completos IS 'JSON con todos los campos del formulario original (claves codificadas según preguntas_diccionario, versión en _v)';
 COMMENT ON COLUMN solicitudes_adopcion.fecha_aceptado IS 'Timestamp cuando se marcó como Aceptado';
 COMMENT ON COLUMN solicitudes_adopcion.fecha_rechazado IS 'Timestamp cuando se marcó como Rechazado';
+COMMENT ON COLUMN solicitudes_adopcion.busqueda IS 'tsvector generado (nombre, instagram, celular, peludo y respuestas del formulario) para /solicitudes/buscar';
+COMMENT ON COLUMN solicitudes_adopcion.busqueda_texto IS 'Nombre, instagram, celular y peludo en minúsculas para búsqueda por trigramas';
+COMMENT ON COLUMN solicitudes_adopcion.edad_anios IS 'Edad en años leída de edad (NULL si no hay un número entre 1 y 119)';
+COMMENT ON COLUMN solicitudes_adopcion.celular_digitos IS 'Celular solo con dígitos';
+COMMENT ON COLUMN solicitudes_adopcion.huella IS 'k:sha256(Idempotency-Key) o c:sha256(JSON normalizado); evita duplicados por reintentos';
+COMMENT ON COLUMN solicitudes_adopcion.archivada IS 'Partición: false = solicitudes_activas, true = solicitudes_archivo (decididas y respondidas, ver archivo.py)';
+
+
+-- Outbox de emails: se escribe en la misma transacción que la solicitud
+-- y un worker en segundo plano lo envía con reintentos
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    destinatario TEXT NOT NULL,
+    asunto TEXT NOT NULL,
+    html TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ultimo_error TEXT,
+    fecha_creacion TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    enviado_en TIMESTAMPTZ,
+    -- X-Request-ID del request que generó el email (trazabilidad)
+    request_id TEXT
+);
+
+ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS request_id TEXT;
+
+-- Solo los emails pendientes se consultan seguido
+CREATE INDEX IF NOT EXISTS idx_outbox_pendientes ON email_outbox(proximo_intento) WHERE estado = 'pendiente';
+CREATE INDEX IF NOT EXISTS idx_outbox_fallidos ON email_outbox(fecha_creacion) WHERE estado = 'fallido';
+
+COMMENT ON TABLE email_outbox IS 'Emails a enviar por el worker del outbox';
+COMMENT ON COLUMN email_outbox.estado IS 'Estados posibles: pendiente, enviado, fallido (agotó los reintentos)';
+
+-- Cola de fallidos: emails que agotaron los reintentos (se vuelven a encolar con POST /emails/fallidos/reintentar)
+CREATE OR REPLACE VIEW emails_fallidos AS
+    SELECT 'respuesta' AS tipo, id, email AS destinatario, respuesta_intentos AS intentos,
+           respuesta_ultimo_error AS ultimo_error, fecha_actualizacion AS fecha
+    FROM solicitudes_activas
+    WHERE respuesta_fallida
+    UNION ALL
+    SELECT 'outbox', id::text, destinatario, intentos, ultimo_error, fecha_creacion
+    FROM email_outbox
+    WHERE estado = 'fallido';
+
+COMMENT ON VIEW emails_fallidos IS 'Respuestas a solicitantes y emails del outbox que agotaron sus reintentos';
+
+
+-- Estado del resumen de pendientes: hasta dónde ya se informó (una sola fila)
+CREATE TABLE IF NOT EXISTS digest_estado (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    ultimo_reporte TIMESTAMPTZ,
+    ultimo_completo TIMESTAMPTZ
+);
+
+INSERT INTO digest_estado (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+COMMENT ON COLUMN digest_estado.ultimo_reporte IS 'Marca de agua: las solicitudes creadas/actualizadas hasta acá ya se informaron';
+COMMENT ON COLUMN digest_estado.ultimo_completo IS 'Último resumen completo de pendientes';
+
+
+-- Diccionario de preguntas: datos_completos guarda códigos cortos en lugar de los títulos
+-- ({"_v": versión, "nombre": ...}). La app registra sus versiones al arrancar y
+-- migrar_datos_completos.py convierte las filas del formato anterior.
+CREATE TABLE IF NOT EXISTS preguntas_diccionario (
+    version INTEGER NOT NULL,
+    codigo TEXT NOT NULL,
+    pregunta TEXT NOT NULL,
+    PRIMARY KEY (version, codigo),
+    UNIQUE (version, pregunta)
+);
+
+COMMENT ON TABLE preguntas_diccionario IS 'Código corto -> título de la pregunta, por versión del formulario';
+
+-- Para consultas a mano: SELECT decodificar_datos(datos_completos) FROM solicitudes_adopcion
+CREATE OR REPLACE FUNCTION decodificar_datos(datos JSONB) RETURNS JSONB
+LANGUAGE sql STABLE AS $$
+    SELECT CASE WHEN datos ? '_v' THEN (
+        SELECT coalesce(jsonb_object_agg(coalesce(d.pregunta, e.key), e.value), '{}'::jsonb)
+        FROM jsonb_each(datos) AS e
+        LEFT JOIN preguntas_diccionario AS d
+            ON d.version = (datos->>'_v')::int AND d.codigo = e.key
+        WHERE e.key <> '_v'
+    ) ELSE datos END
+$$;
+
+
+-- Estadísticas pre-agregadas: solicitudes por peludo, por zona y totales, con decisiones y
+-- tiempo hasta la decisión. Las mantienen los triggers de solicitudes_adopcion (una suma por
+-- sentencia, en la misma transacción que la escritura), así /estadisticas no recorre la tabla.
+CREATE TABLE IF NOT EXISTS estadisticas_adopcion (
+    dimension TEXT NOT NULL,            -- total | peludo | zona
+    valor TEXT NOT NULL,                -- '' para total y para peludo/zona sin completar
+    solicitudes BIGINT NOT NULL DEFAULT 0,
+    pendientes BIGINT NOT NULL DEFAULT 0,
+    aceptadas BIGINT NOT NULL DEFAULT 0,
+    rechazadas BIGINT NOT NULL DEFAULT 0,
+    segundos_decision DOUBLE PRECISION NOT NULL DEFAULT 0,  -- suma del tiempo hasta la decisión
+    decisiones_medidas BIGINT NOT NULL DEFAULT 0,           -- decididas con fecha de decisión
+    PRIMARY KEY (dimension, valor)
+);
+
+COMMENT ON TABLE estadisticas_adopcion IS 'Contadores por peludo/zona mantenidos por trigger; reconstruir con SELECT recalcular_estadisticas()';
+
+-- INSERT ... ON CONFLICT que suma al contador el aporte de las filas de origen
+-- (signo 1 para las filas nuevas, -1 para las que se borran o reemplazan)
+CREATE OR REPLACE FUNCTION sql_estadisticas(origen TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT format($f$
+        INSERT INTO estadisticas_adopcion AS e
+            (dimension, valor, solicitudes, pendientes, aceptadas, rechazadas,
+             segundos_decision, decisiones_medidas)
+        SELECT d.dimension, d.valor,
+               sum(f.signo),
+               coalesce(sum(f.signo) FILTER (WHERE f.estado = 'Pendiente'), 0),
+               coalesce(sum(f.signo) FILTER (WHERE f.estado = 'Aceptado'), 0),
+               coalesce(sum(f.signo) FILTER (WHERE f.estado = 'Rechazado'), 0),
+               coalesce(sum(f.signo * extract(epoch FROM t.decision - f.fecha_solicitud)), 0),
+               coalesce(sum(f.signo) FILTER (WHERE t.decision IS NOT NULL), 0)
+        FROM (%s) AS f
+        CROSS JOIN LATERAL (SELECT CASE f.estado WHEN 'Aceptado' THEN f.fecha_aceptado
+                                                 WHEN 'Rechazado' THEN f.fecha_rechazado END) AS t(decision)
+        CROSS JOIN LATERAL (VALUES
+            ('total', ''),
+            ('peludo', coalesce(f.nombre_peludo, '')),
+            ('zona', coalesce(f.zona, ''))
+        ) AS d(dimension, valor)
+        GROUP BY d.dimension, d.valor
+        -- Orden fijo: dos transacciones bloquean las filas en el mismo orden (sin deadlocks)
+        ORDER BY d.dimension, d.valor
+        ON CONFLICT (dimension, valor) DO UPDATE SET
+            solicitudes = e.solicitudes + EXCLUDED.solicitudes,
+            pendientes = e.pendientes + EXCLUDED.pendientes,
+            aceptadas = e.aceptadas + EXCLUDED.aceptadas,
+            rechazadas = e.rechazadas + EXCLUDED.rechazadas,
+            segundos_decision = e.segundos_decision + EXCLUDED.segundos_decision,
+            decisiones_medidas = e.decisiones_medidas + EXCLUDED.decisiones_medidas
+    $f$, origen)
+$$;
+
+CREATE OR REPLACE FUNCTION acumular_estadisticas() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Las tablas de transición se ven desde EXECUTE dentro de esta misma función
+    IF TG_OP = 'INSERT' THEN
+        EXECUTE sql_estadisticas($o$
+            SELECT 1 AS signo, estado, zona, nombre_peludo, fecha_solicitud, fecha_aceptado, fecha_rechazado
+            FROM nuevas
+        $o$);
+    ELSIF TG_OP = 'DELETE' THEN
+        EXECUTE sql_estadisticas($o$
+            SELECT -1 AS signo, estado, zona, nombre_peludo, fecha_solicitud, fecha_aceptado, fecha_rechazado
+            FROM viejas
+        $o$);
+    ELSE
+        -- Resta la versión vieja y suma la nueva, solo de las filas que cambiaron algo que cuenta
+        -- (el cron que marca email_respuesta_enviado no toca las estadísticas)
+        EXECUTE sql_estadisticas($o$
+            SELECT c.*
+            FROM nuevas AS n
+            JOIN viejas AS v ON v.id = n.id
+            CROSS JOIN LATERAL (VALUES
+                (1, n.estado, n.zona, n.nombre_peludo, n.fecha_solicitud, n.fecha_aceptado, n.fecha_rechazado),
+                (-1, v.estado, v.zona, v.nombre_peludo, v.fecha_solicitud, v.fecha_aceptado, v.fecha_rechazado)
+            ) AS c(signo, estado, zona, nombre_peludo, fecha_solicitud, fecha_aceptado, fecha_rechazado)
+            WHERE (n.estado, n.zona, n.nombre_peludo, n.fecha_solicitud, n.fecha_aceptado, n.fecha_rechazado)
+                IS DISTINCT FROM
+                  (v.estado, v.zona, v.nombre_peludo, v.fecha_solicitud, v.fecha_aceptado, v.fecha_rechazado)
+        $o$);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+-- Un disparo por sentencia: un COPY o un UPDATE de 500 filas hace una suma por grupo, no por fila.
+-- Los triggers de sentencia solo disparan en la tabla nombrada en la sentencia, así que van en la
+-- tabla particionada y en cada partición que la app escribe directo (mover una fila al archivo
+-- resta en una y suma en la otra, o no cambia nada si se mueve por solicitudes_adopcion).
+DO $$
+DECLARE
+    tabla TEXT;
+BEGIN
+    FOREACH tabla IN ARRAY ARRAY['solicitudes_adopcion', 'solicitudes_activas', 'solicitudes_archivo'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS estadisticas_insert ON %I', tabla);
+        EXECUTE format('CREATE TRIGGER estadisticas_insert AFTER INSERT ON %I
+            REFERENCING NEW TABLE AS nuevas
+            FOR EACH STATEMENT EXECUTE FUNCTION acumular_estadisticas()', tabla);
+        EXECUTE format('DROP TRIGGER IF EXISTS estadisticas_update ON %I', tabla);
+        EXECUTE format('CREATE TRIGGER estadisticas_update AFTER UPDATE ON %I
+            REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+            FOR EACH STATEMENT EXECUTE FUNCTION acumular_estadisticas()', tabla);
+        EXECUTE format('DROP TRIGGER IF EXISTS estadisticas_delete ON %I', tabla);
+        EXECUTE format('CREATE TRIGGER estadisticas_delete AFTER DELETE ON %I
+            REFERENCING OLD TABLE AS viejas
+            FOR EACH STATEMENT EXECUTE FUNCTION acumular_estadisticas()', tabla);
+    END LOOP;
+END
+$$;
+
+-- Reconstruye los contadores desde cero (la primera vez y si se tocó la tabla con los triggers apagados).
+-- Bloquea las escrituras en solicitudes_adopcion mientras recalcula.
+CREATE OR REPLACE FUNCTION recalcular_estadisticas() RETURNS VOID
+LANGUAGE plpgsql AS $$
+BEGIN
+    LOCK TABLE solicitudes_adopcion IN SHARE MODE;
+    DELETE FROM estadisticas_adopcion;
+    EXECUTE sql_estadisticas($o$
+        SELECT 1 AS signo, estado, zona, nombre_peludo, fecha_solicitud, fecha_aceptado, fecha_rechazado
+        FROM solicitudes_adopcion
+    $o$);
+END
+$$;
+
+SELECT recalcular_estadisticas();
@@ -0,0 +1,89 @@
+"""
+Acceso asíncrono a PostgreSQL (Supabase) con psycopg 3
+El pool se crea una sola vez en el lifespan de FastAPI y lo comparten todos los endpoints,
+así una consulta lenta no bloquea el event loop de uvicorn.
+"""
+
+import os
+import time
+from contextlib import asynccontextmanager
+
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from metricas import ESPERA_POOL
+
+# Configuración de base de datos
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_NAME = os.getenv("DB_NAME")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+# Tamaño del pool (Supabase limita la cantidad de conexiones por proyecto)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 5))
+
+# El pooler de Supabase en modo transacción (puerto 6543) no soporta prepared statements:
+# en ese caso usar DB_PREPARE_THRESHOLD=none
+_prepare = os.getenv("DB_PREPARE_THRESHOLD", "5")
+DB_PREPARE_THRESHOLD = None if _prepare.lower() == "none" else int(_prepare)
+
+_pool = None
+
+
+def get_pool() -> AsyncConnectionPool:
+    """Devuelve el pool compartido (lo crea sin abrir si todavía no existe)"""
+    global _pool
+    if _pool is None:
+        _pool = AsyncConnectionPool(
+            make_conninfo(
+                host=DB_HOST,
+                port=DB_PORT,
+                dbname=DB_NAME,
+                user=DB_USER,
+                password=DB_PASSWORD
+            ),
+            min_size=DB_POOL_MIN,
+            max_size=DB_POOL_MAX,
+            kwargs={"row_factory": dict_row, "prepare_threshold": DB_PREPARE_THRESHOLD},
+            # Verifica cada conexión al sacarla del pool y descarta las caídas
+            check=AsyncConnectionPool.check_connection,
+            open=False
+        )
+    return _pool
+
+
+async def abrir_pool():
+    """Abre el pool (se llama al iniciar la aplicación)"""
+    await get_pool().open()
+
+
+async def verificar(timeout: float):
+    """
+    Consulta mínima para saber si la base responde (arranque y readiness).
+    No usa pool.wait(): si vence, cierra el pool; así el pool sigue reintentando.
+    """
+    async with get_pool().connection(timeout=timeout) as conn:
+        await conn.execute("SELECT 1")
+
+
+async def cerrar_pool():
+    """Cierra todas las conexiones del pool (se llama al apagar la aplicación)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@asynccontextmanager
+async def conexion():
+    """
+    Toma una conexión del pool dentro de una transacción: commit al salir
+    (o rollback si hubo error) y la devuelve al pool.
+    """
+    inicio = time.perf_counter()
+    async with get_pool().connection() as conn:
+        ESPERA_POOL.observe(time.perf_counter() - inicio)
+        yield conn
@@ -0,0 +1,90 @@
+"""
+Decisiones sobre las solicitudes (Aceptar/Rechazar)
+/action decide una por clic; decidir_lote() decide muchas con un solo UPDATE y devuelve
+el resultado de cada ID. El lote solo toca las que siguen pendientes: una solicitud ya
+aceptada o rechazada (por otra voluntaria o en otra pestaña) no se pisa.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List
+
+import db
+
+# acción -> (estado, mensaje, color, emoji, columna de fecha)
+ACCIONES = {
+    "aceptar": ("Aceptado", "ACEPTADA", "#34a853", "✅", "fecha_aceptado"),
+    "rechazar": ("Rechazado", "RECHAZADA", "#ea4335", "❌", "fecha_rechazado")
+}
+
+DECISION_LOTE_MAX = 500  # IDs por request
+PENDIENTES_PAGINA = 200  # solicitudes que muestra /pendientes
+
+# Un clic de /action ({tabla}: primero la partición caliente, el archivo para emails viejos)
+SQL_DECIDIR = """
+    UPDATE {tabla}
+    SET estado = %s, fecha_actualizacion = %s, {campo_fecha} = %s
+    WHERE id = %s
+"""
+TABLAS_DECIDIR = ("solicitudes_activas", "solicitudes_archivo")
+
+# Resultado por ID pedido: el SELECT final ve la tabla antes del UPDATE, así que para las
+# no actualizadas devuelve el estado que ya tenían (NULL si el ID no existe). Las pendientes
+# están siempre en la partición caliente; el archivo solo se consulta para informar el estado.
+SQL_DECIDIR_LOTE = """
+    WITH pedidas AS (
+        SELECT DISTINCT unnest(%(ids)s::text[]) AS id
+    ), actualizadas AS (
+        UPDATE solicitudes_activas
+        SET estado = %(estado)s, fecha_actualizacion = %(ahora)s, {campo_fecha} = %(ahora)s
+        WHERE id = ANY(%(ids)s) AND estado = 'Pendiente'
+        RETURNING id
+    )
+    SELECT p.id, a.id IS NOT NULL AS actualizada, s.estado
+    FROM pedidas p
+    LEFT JOIN actualizadas a ON a.id = p.id
+    LEFT JOIN solicitudes_adopcion s ON s.id = p.id
+"""
+
+SQL_PENDIENTES = """
+    SELECT id, fecha_solicitud, nombre_apellido, edad, zona, tipo_vivienda, nombre_peludo
+    FROM solicitudes_activas
+    WHERE estado = 'Pendiente'
+    ORDER BY fecha_solicitud, id
+    LIMIT %s
+"""
+
+
+def ahora_bsas() -> datetime:
+    # Hora de Buenos Aires (UTC-3)
+    return datetime.now(timezone(timedelta(hours=-3)))
+
+
+async def decidir_lote(accion: str, ids: List[str]) -> Dict[str, Any]:
+    """
+    Aplica la acción a todas las pendientes de ids en una transacción.
+    Devuelve {"actualizadas": n, "resultados": {id: "actualizada" | "ya_decidida" | "no_encontrada"}}
+    """
+    nuevo_estado, _, _, _, campo_fecha = ACCIONES[accion]
+    sql = SQL_DECIDIR_LOTE.format(campo_fecha=campo_fecha)
+    params = {"ids": list(ids), "estado": nuevo_estado, "ahora": ahora_bsas()}
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute(sql, params)
+        filas = await cur.fetchall()
+
+    resultados = {}
+    for fila in filas:
+        if fila["actualizada"]:
+            resultados[fila["id"]] = "actualizada"
+        elif fila["estado"] is None:
+            resultados[fila["id"]] = "no_encontrada"
+        else:
+            resultados[fila["id"]] = "ya_decidida"
+    actualizadas = sum(1 for r in resultados.values() if r == "actualizada")
+    return {"accion": accion, "estado": nuevo_estado, "actualizadas": actualizadas, "resultados": resultados}
+
+
+async def pendientes(limite: int = PENDIENTES_PAGINA) -> List[Dict[str, Any]]:
+    """Las pendientes más viejas primero (para la vista de decisión en lote)"""
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute(SQL_PENDIENTES, (limite,))
+        return await cur.fetchall()
@@ -0,0 +1,91 @@
+"""
+Diccionario de preguntas del formulario
+datos_completos se guarda con claves cortas (códigos) en lugar del título completo de cada
+pregunta: {"_v": 1, "nombre": ..., "edad": ...}. Cada versión del diccionario queda en la
+tabla preguntas_diccionario, así cualquier fila se puede decodificar (también desde SQL).
+Las preguntas que no están en el diccionario se guardan con su título, como antes.
+"""
+
+from typing import Dict, Any
+
+import db
+
+CLAVE_VERSION = "_v"
+
+# Versión 1: código -> título de la pregunta. Para cambiar un título o agregar preguntas,
+# crear una versión nueva (las filas guardadas con la anterior se siguen decodificando)
+PREGUNTAS_V1 = {
+    "nombre": "Nombre y Apellido",
+    "edad": "Edad",
+    "ocupacion": "Ocupación",
+    "email": "Email",
+    "celular": "Celular de contacto",
+    "instagram": "Instagram",
+    "zona": "¿Vivís en CABA? ¿En qué zona estas?",
+    "tipo_vivienda": "¿Vivís en casa o departamento?",
+    "tenencia_vivienda": "Tipo de tenencia de la vivienda",
+    "consulto_duenos": "En caso de que sea alquilada, prestada o compartida: ¿consultaste previamente con los dueños?",
+    "cerramientos": "¿Tenes cerramientos/protecciones en ventanas/balcón/patio/terraza?",
+    "cerramientos_compromiso": "En caso de no tener, comentanos si estás dispuesto a ponerlos y cuándo, sino no podremos considerar su solicitud de adopción.",
+    "otros_animales": "¿Tenes otros animales?",
+    "otros_animales_detalle": "Contanos un poco más acerca de si son gatos o perros, cuantos y que edades tienen!",
+    "vacunados": "¿Están vacunados y/o castrados?",
+    "vacunados_motivos": "En caso de no estar vacunados y/o castrados, contanos los motivos que te llevaron a esa decisión.",
+    "animales_previos": "¿Tuviste animales previamente?",
+    "animales_previos_destino": "Contanos que ocurrió con ellos",
+    "alimentacion_actual": "¿Qué alimentación le/s das? (Detalle marca si es alimento balanceado)",
+    "alimentacion_previa": "¿Qué alimento le/s dabas?",
+    "ninos": "¿Hay niños pequeños en el domicilio? Aclarar sus edades.",
+    "tiempo_solo": "¿Cuánto tiempo estaría solo el peludo en su vida cotidiana?",
+    "vacaciones": "¿Qué harías con el peludo en caso de vacaciones?",
+    "mudanza": "¿Qué harías con el peludo en caso de mudanza?",
+    "fotos": "En este espacio cargue las fotos o un video de los cerramientos. No mas de 100MB",
+    "nombre_peludo": "Nombre del peludo en el que estas interesado/a.En caso de que no tenga un nombre asignado por nosotras, describir su aspecto."
+}
+
+VERSIONES: Dict[int, Dict[str, str]] = {1: PREGUNTAS_V1}
+VERSION_ACTUAL = 1
+
+# Título -> código de la versión actual
+_CODIGOS = {pregunta: codigo for codigo, pregunta in VERSIONES[VERSION_ACTUAL].items()}
+
+SQL_REGISTRAR = """
+    INSERT INTO preguntas_diccionario (version, codigo, pregunta)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (version, codigo) DO NOTHING
+"""
+
+SQL_LEER = "SELECT version, codigo, pregunta FROM preguntas_diccionario"
+
+
+def codificar(datos: Dict[str, Any]) -> Dict[str, Any]:
+    """Respuesta del formulario -> formato compacto para datos_completos"""
+    codificados = {CLAVE_VERSION: VERSION_ACTUAL}
+    for pregunta, valor in datos.items():
+        codificados[_CODIGOS.get(pregunta, pregunta)] = valor
+    return codificados
+
+
+def decodificar(datos: Dict[str, Any]) -> Dict[str, Any]:
+    """datos_completos (compacto o del formato anterior) -> claves con el título de cada pregunta"""
+    version = datos.get(CLAVE_VERSION)
+    if version is None:
+        return datos
+    preguntas = VERSIONES[version]
+    return {preguntas.get(clave, clave): valor for clave, valor in datos.items() if clave != CLAVE_VERSION}
+
+
+async def sincronizar():
+    """
+    Registra en la tabla las versiones de este código y carga las que agregaron otros
+    despliegues (para decodificar filas escritas con una versión más nueva)
+    """
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.executemany(SQL_REGISTRAR, [
+            (version, codigo, pregunta)
+            for version, preguntas in VERSIONES.items()
+            for codigo, pregunta in preguntas.items()
+        ])
+        await cur.execute(SQL_LEER)
+        for fila in await cur.fetchall():
+            VERSIONES.setdefault(fila['version'], {})[fila['codigo']] = fila['pregunta']
@@ -0,0 +1,67 @@
+"""
+Resolución de links de Google Drive a URLs de imagen directa
+Los patrones se compilan una sola vez y los resultados se memorizan por URL.
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import Any, List, Optional
+
+from seguridad import firma_imagen
+
+DRIVE_CACHE = int(os.getenv("DRIVE_CACHE", 1024))
+# Con la URL del servicio (y ADMIN_TOKEN, que firma los links) configurada, las fotos se
+# sirven por el proxy con cache (/imagenes)
+CLOUD_RUN_URL = os.getenv("CLOUD_RUN_URL")
+
+# Formatos de link de Drive, en orden de prioridad
+PATRONES = (
+    re.compile(r'/file/d/([a-zA-Z0-9_-]+)'),
+    re.compile(r'/open\?id=([a-zA-Z0-9_-]+)'),
+    re.compile(r'id=([a-zA-Z0-9_-]+)'),
+    re.compile(r'^([a-zA-Z0-9_-]{25,})$')  # Solo el ID (así llegan los archivos subidos al Form)
+)
+
+# Respuestas con varios archivos pueden venir en un solo texto separado por comas o espacios
+_SEPARADOR = re.compile(r'[,\s]+')
+
+
+@lru_cache(maxsize=DRIVE_CACHE)
+def extraer_file_id(url: str) -> Optional[str]:
+    """Extrae el ID de archivo de un link (o ID suelto) de Google Drive"""
+    for patron in PATRONES:
+        match = patron.search(url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def drive_url_to_image(url: str) -> str:
+    """Extrae el ID de Google Drive y retorna la URL de la imagen (proxy o directa)"""
+    if not url or url == 'N/A':
+        return ''
+    file_id = extraer_file_id(url)
+    if file_id:
+        firma = firma_imagen(file_id) if CLOUD_RUN_URL else None
+        if firma:
+            return f'{CLOUD_RUN_URL}/imagenes/{file_id}?firma={firma}'
+        return f'https://lh3.googleusercontent.com/d/{file_id}'
+    return url
+
+
+def imagenes(valor: Any) -> List[str]:
+    """
+    Devuelve las URLs de imagen de una respuesta del formulario.
+    Acepta un link, un ID, una lista (subida de varios archivos) o varios links en un texto.
+    """
+    if not valor:
+        return []
+    items = valor if isinstance(valor, list) else [valor]
+    urls = []
+    for item in items:
+        for parte in _SEPARADOR.split(str(item).strip()):
+            url = drive_url_to_image(parte)
+            if url and url not in urls:
+                urls.append(url)
+    return urls
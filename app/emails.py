@@ -0,0 +1,92 @@
+"""
+Emails del sistema de adopciones
+Cada función arma el HTML de un email a partir de las plantillas compiladas de app/plantillas/.
+"""
+
+import os
+from typing import Dict, Any, Union
+
+import drive
+import plantillas
+from diccionario import PREGUNTAS_V1
+from formulario import Solicitud, normalizar
+from seguridad import parametros_firmados
+
+CLOUD_RUN_URL = os.getenv("CLOUD_RUN_URL")
+
+
+# Preguntas del formulario que muestra el email al equipo (campo de la plantilla -> pregunta)
+PREGUNTAS_EMAIL = {campo: pregunta for campo, pregunta in PREGUNTAS_V1.items() if campo != "fotos"}
+PREGUNTA_FOTOS = PREGUNTAS_V1["fotos"]
+
+# Plantillas compiladas una sola vez, con la URL del servicio ya resuelta
+PLANTILLA_SOLICITUD = plantillas.obtener("solicitud").fijar(url_base=CLOUD_RUN_URL)
+PLANTILLA_FOTO = plantillas.obtener("solicitud_foto")
+FOTOS_NO_CARGADAS = '<div class="info-line"><strong>Fotos/Video:</strong> No cargadas</div>'
+
+
+def generar_html_email(solicitud_id: str, solicitud: Union[Solicitud, Dict[str, Any]]) -> str:
+    """Genera el HTML del email con todos los campos del formulario (Solicitud o respuesta sin normalizar)"""
+    if not isinstance(solicitud, Solicitud):
+        solicitud = normalizar(solicitud)
+    
+    contexto = {campo: getattr(solicitud, campo) or "No especificado" for campo in PREGUNTAS_EMAIL}
+    contexto["solicitud_id"] = solicitud_id
+    
+    # Todas las fotos subidas (la pregunta admite varios archivos)
+    urls_fotos = drive.imagenes(solicitud.fotos)
+    if urls_fotos:
+        contexto["fotos"] = "".join(PLANTILLA_FOTO.render({"url": url}) for url in urls_fotos)
+    else:
+        contexto["fotos"] = FOTOS_NO_CARGADAS
+    
+    return PLANTILLA_SOLICITUD.render(contexto)
+
+
+PLANTILLAS_RESPUESTA = {
+    "aceptar": plantillas.obtener("respuesta_aceptar"),
+    "rechazar": plantillas.obtener("respuesta_rechazar")
+}
+PLANTILLA_RESUMEN = plantillas.obtener("resumen_pendientes").fijar(url_base=CLOUD_RUN_URL)
+PLANTILLA_NOVEDADES = plantillas.obtener("resumen_novedades").fijar(url_base=CLOUD_RUN_URL)
+PLANTILLA_RESUMEN_ITEM = plantillas.obtener("resumen_item").fijar(url_base=CLOUD_RUN_URL)
+CAMPOS_RESUMEN_ITEM = (
+    "edad", "ocupacion", "zona", "email", "celular", "instagram",
+    "tipo_vivienda", "tenencia_vivienda", "nombre_peludo"
+)
+
+
+def generar_email_respuesta(nombre: str, accion: str, nombre_peludo: str) -> str:
+    """Genera el email de respuesta para el solicitante"""
+    return PLANTILLAS_RESPUESTA[accion].render({"nombre": nombre, "nombre_peludo": nombre_peludo})
+
+
+def _items_resumen(solicitudes: list) -> str:
+    """Un fragmento por solicitud y un solo join al final"""
+    items = []
+    for sol in solicitudes:
+        contexto = {campo: sol.get(campo) or 'N/A' for campo in CAMPOS_RESUMEN_ITEM}
+        contexto["id"] = sol['id']
+        contexto["nombre_apellido"] = sol.get('nombre_apellido') or 'Sin nombre'
+        items.append(PLANTILLA_RESUMEN_ITEM.render(contexto))
+    return "".join(items)
+
+
+def generar_email_resumen_pendientes(solicitudes: list) -> str:
+    """Genera email con resumen de solicitudes pendientes"""
+    return PLANTILLA_RESUMEN.render({
+        "cantidad": len(solicitudes),
+        "items": _items_resumen(solicitudes),
+        "firma": parametros_firmados("pendientes")
+    })
+
+
+def generar_email_novedades_pendientes(nuevas: list, resueltas: int, pendientes: int) -> str:
+    """Genera el resumen incremental: solo las solicitudes nuevas y los totales"""
+    return PLANTILLA_NOVEDADES.render({
+        "nuevas": len(nuevas),
+        "resueltas": resueltas,
+        "pendientes": pendientes,
+        "items": _items_resumen(nuevas),
+        "firma": parametros_firmados("pendientes")
+    })
@@ -0,0 +1,52 @@
+"""
+Estadísticas de adopción para el panel (endpoint /estadisticas)
+Se leen de estadisticas_adopcion, que mantienen los triggers de solicitudes_adopcion
+(ver create_table.sql): una fila por peludo y por zona más el total, sin recorrer la tabla.
+"""
+
+from typing import Dict, Any
+
+import db
+
+SQL_LEER = """
+    SELECT dimension, valor, solicitudes, pendientes, aceptadas, rechazadas,
+           segundos_decision, decisiones_medidas
+    FROM estadisticas_adopcion
+    WHERE solicitudes > 0
+    ORDER BY dimension, solicitudes DESC, valor
+"""
+
+SEGUNDOS_POR_DIA = 86400
+
+
+def _resumen(fila: Dict[str, Any]) -> Dict[str, Any]:
+    """Contadores + tasa de aceptación (sobre las decididas) y días promedio hasta decidir"""
+    decididas = fila["aceptadas"] + fila["rechazadas"]
+    medidas = fila["decisiones_medidas"]
+    return {
+        "solicitudes": fila["solicitudes"],
+        "pendientes": fila["pendientes"],
+        "aceptadas": fila["aceptadas"],
+        "rechazadas": fila["rechazadas"],
+        "tasa_aceptacion": round(fila["aceptadas"] / decididas, 4) if decididas else None,
+        "dias_hasta_decision": round(fila["segundos_decision"] / medidas / SEGUNDOS_POR_DIA, 2) if medidas else None
+    }
+
+
+async def obtener() -> Dict[str, Any]:
+    """{"total": {...}, "por_peludo": [...], "por_zona": [...]} (más pedidos primero)"""
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute(SQL_LEER)
+        filas = await cur.fetchall()
+
+    resultado = {"total": _resumen({
+        "solicitudes": 0, "pendientes": 0, "aceptadas": 0, "rechazadas": 0,
+        "segundos_decision": 0, "decisiones_medidas": 0
+    }), "por_peludo": [], "por_zona": []}
+    for fila in filas:
+        if fila["dimension"] == "total":
+            resultado["total"] = _resumen(fila)
+        else:
+            clave = "nombre_peludo" if fila["dimension"] == "peludo" else "zona"
+            resultado[f"por_{fila['dimension']}"].append({clave: fila["valor"] or None, **_resumen(fila)})
+    return resultado
@@ -0,0 +1,139 @@
+"""
+Exportación de solicitudes_adopcion a CSV o NDJSON
+Las filas se leen con un cursor del lado del servidor (named cursor) de a EXPORTACION_LOTE
+y se envían a medida que llegan: la memoria no depende del tamaño de la tabla.
+Cada descarga ocupa una conexión del pool mientras dura (el cursor vive en su transacción);
+EXPORTACION_TIMEOUT acota cada lectura y la espera a que el cliente reciba el lote anterior,
+así una descarga colgada no retiene la conexión (se corta y el archivo queda incompleto).
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
+
+from psycopg.rows import tuple_row
+
+import db
+from diccionario import decodificar
+from listado import filtros
+
+EXPORTACION_LOTE = int(os.getenv("EXPORTACION_LOTE", 1000))
+EXPORTACION_TIMEOUT = int(os.getenv("EXPORTACION_TIMEOUT", 60))  # segundos
+
+# Límites de la transacción de la descarga (solo para esa transacción)
+SQL_LIMITES = """
+    SELECT set_config('statement_timeout', %(ms)s, true),
+           set_config('idle_in_transaction_session_timeout', %(ms)s, true)
+"""
+
+# Un texto que empieza así se interpreta como fórmula al abrir el CSV en una planilla
+_INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+FORMATOS = ("csv", "ndjson")
+
+# Columnas que se pueden pedir (en este orden por defecto); datos_completos va decodificado
+COLUMNAS_EXPORTABLES = (
+    "id", "fecha_solicitud", "estado", "nombre_apellido", "edad", "edad_anios", "ocupacion", "email",
+    "instagram", "celular", "celular_digitos", "zona", "tipo_vivienda", "tenencia_vivienda", "cerramientos_url",
+    "nombre_peludo", "fecha_aceptado", "fecha_rechazado", "email_respuesta_enviado",
+    "fecha_creacion", "fecha_actualizacion", "datos_completos"
+)
+COLUMNAS_POR_DEFECTO = tuple(c for c in COLUMNAS_EXPORTABLES if c != "datos_completos")
+
+
+def elegir_columnas(columnas: Optional[str]) -> List[str]:
+    """'id,estado,...' -> lista validada; lanza ValueError con las columnas desconocidas"""
+    if not columnas:
+        return list(COLUMNAS_POR_DEFECTO)
+    elegidas = [c.strip() for c in columnas.split(",") if c.strip()]
+    desconocidas = [c for c in elegidas if c not in COLUMNAS_EXPORTABLES]
+    if desconocidas or not elegidas:
+        raise ValueError(f"Columnas desconocidas: {desconocidas}; disponibles: {COLUMNAS_EXPORTABLES}")
+    return elegidas
+
+
+def _valor_json(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"No se puede serializar {type(valor).__name__}")
+
+
+def _valor_csv(valor: Any) -> Any:
+    if valor is None:
+        return ""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, dict):
+        return json.dumps(valor, ensure_ascii=False)
+    if isinstance(valor, str) and valor.startswith(_INICIO_FORMULA):
+        # Respuestas del formulario: el apóstrofo hace que la planilla lo muestre como texto
+        return "'" + valor
+    return valor
+
+
+def armar_consulta(columnas: Sequence[str], estado: Optional[str], nombre_peludo: Optional[str],
+                   zona: Optional[str], desde: Optional[datetime],
+                   hasta: Optional[datetime]) -> Tuple[str, list]:
+    """SELECT de la exportación (mismos filtros que el listado), de la más vieja a la más nueva"""
+    condiciones, params = filtros(estado, nombre_peludo, zona, desde, hasta)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    sql = f"""
+        SELECT {", ".join(columnas)}
+        FROM solicitudes_adopcion
+        {where}
+        ORDER BY fecha_solicitud, id
+    """
+    return sql, params
+
+
+async def _lotes(columnas: Sequence[str], estado: Optional[str], nombre_peludo: Optional[str],
+                 zona: Optional[str], desde: Optional[datetime],
+                 hasta: Optional[datetime]) -> AsyncIterator[List[tuple]]:
+    """Filas (tuplas en el orden de columnas) de a EXPORTACION_LOTE con un named cursor"""
+    sql, params = armar_consulta(columnas, estado, nombre_peludo, zona, desde, hasta)
+    decodificar_datos = "datos_completos" in columnas
+    indice_datos = columnas.index("datos_completos") if decodificar_datos else None
+
+    # El cursor vive en el servidor dentro de la transacción de la conexión
+    async with db.conexion() as conn:
+        await conn.execute(SQL_LIMITES, {"ms": str(EXPORTACION_TIMEOUT * 1000)})
+        async with conn.cursor(name="exportacion", row_factory=tuple_row) as cur:
+            await cur.execute(sql, params)
+            while True:
+                filas = await cur.fetchmany(EXPORTACION_LOTE)
+                if not filas:
+                    return
+                if decodificar_datos:
+                    filas = [
+                        fila[:indice_datos] + (decodificar(fila[indice_datos] or {}),) + fila[indice_datos + 1:]
+                        for fila in filas
+                    ]
+                yield filas
+
+
+async def exportar(formato: str, columnas: Sequence[str], estado: Optional[str] = None,
+                   nombre_peludo: Optional[str] = None, zona: Optional[str] = None,
+                   desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> AsyncIterator[bytes]:
+    """Genera el archivo de a un lote de filas por chunk"""
+    lotes = _lotes(columnas, estado, nombre_peludo, zona, desde, hasta)
+
+    if formato == "csv":
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(columnas)
+        # BOM para que Excel/Sheets detecten UTF-8
+        yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+        async for filas in lotes:
+            buffer.seek(0)
+            buffer.truncate()
+            escritor.writerows([_valor_csv(v) for v in fila] for fila in filas)
+            yield buffer.getvalue().encode("utf-8")
+    else:
+        async for filas in lotes:
+            yield "".join(
+                json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=_valor_json) + "\n"
+                for fila in filas
+            ).encode("utf-8")
@@ -0,0 +1,49 @@
+"""
+Cola de fallidos: emails que agotaron sus reintentos (vista emails_fallidos)
+Respuestas a solicitantes (respuesta_fallida) y emails del outbox en estado fallido.
+Después de corregir la causa (dirección mal escrita, credenciales SMTP) se vuelven a encolar.
+"""
+
+from typing import Dict, Any, List, Optional
+
+import db
+
+TIPOS = ("respuesta", "outbox")
+FALLIDOS_LIMITE = 200
+
+SQL_LISTAR = """
+    SELECT tipo, id, destinatario, intentos, ultimo_error, fecha
+    FROM emails_fallidos
+    ORDER BY fecha DESC
+    LIMIT %s
+"""
+
+SQL_REINTENTAR = {
+    "respuesta": """
+        UPDATE solicitudes_activas
+        SET respuesta_fallida = FALSE, respuesta_intentos = 0, respuesta_proximo_intento = NULL
+        WHERE respuesta_fallida
+    """,
+    "outbox": """
+        UPDATE email_outbox
+        SET estado = 'pendiente', intentos = 0, proximo_intento = NOW()
+        WHERE estado = 'fallido'
+    """
+}
+
+
+async def listar(limite: int = FALLIDOS_LIMITE) -> List[Dict[str, Any]]:
+    """Los fallidos más recientes primero"""
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute(SQL_LISTAR, (limite,))
+        return await cur.fetchall()
+
+
+async def reintentar(tipo: Optional[str] = None) -> Dict[str, int]:
+    """Vuelve a encolar los fallidos (de un tipo o todos); devuelve cuántos por tipo"""
+    reencolados = {}
+    async with db.conexion() as conn, conn.cursor() as cur:
+        for nombre in ([tipo] if tipo else TIPOS):
+            await cur.execute(SQL_REINTENTAR[nombre])
+            reencolados[nombre] = cur.rowcount
+    return reencolados
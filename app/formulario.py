@@ -0,0 +1,163 @@
+"""
+Esquema del formulario de adopción
+Cada campo se declara una vez (código del diccionario + conversor) y al importar se arma,
+por cada formato de claves, la lista de (campo, clave, conversor). normalizar() lee cada
+campo una sola vez y devuelve una Solicitud (__slots__) con los valores ya convertidos;
+el INSERT, los emails y las exportaciones leen de ahí. La edad y el celular también quedan
+tipados (edad_anios, celular_digitos) para buscar y exportar sin reinterpretar el texto.
+"""
+
+import re
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from diccionario import CLAVE_VERSION, VERSIONES, VERSION_ACTUAL
+
+
+def _texto(valor: Any) -> str:
+    """Primer valor si viene como lista (así manda Apps Script algunas respuestas)"""
+    if isinstance(valor, list):
+        valor = valor[0] if valor else ""
+    if valor is None:
+        return ""
+    return valor if isinstance(valor, str) else str(valor)
+
+
+def _zona(valor: Any) -> str:
+    return _texto(valor).strip().upper()
+
+
+def _lista(valor: Any) -> List[str]:
+    """Respuestas de archivo: siempre una lista de strings"""
+    if isinstance(valor, list):
+        return [str(v) for v in valor if v]
+    texto = _texto(valor)
+    return [texto] if texto else []
+
+
+_NUMERO = re.compile(r"\d+")
+_NO_DIGITO = re.compile(r"\D")
+
+
+def edad_anios(edad: str) -> Optional[int]:
+    """'32', '32 años' -> 32; None si no hay un número razonable"""
+    match = _NUMERO.search(edad)
+    if not match:
+        return None
+    anios = int(match.group())
+    return anios if 0 < anios < 120 else None
+
+
+def celular_digitos(celular: str) -> str:
+    """'+54 9 11 5555-5555' -> '5491155555555' (solo dígitos, para buscar y deduplicar)"""
+    return _NO_DIGITO.sub("", celular)
+
+
+# Campos del formulario: código en el diccionario -> conversor del valor crudo
+ESQUEMA: Tuple[Tuple[str, Callable[[Any], Any]], ...] = (
+    ("nombre", _texto),
+    ("edad", _texto),
+    ("ocupacion", _texto),
+    ("email", _texto),
+    ("celular", _texto),
+    ("instagram", _texto),
+    ("zona", _zona),
+    ("tipo_vivienda", _texto),
+    ("tenencia_vivienda", _texto),
+    ("consulto_duenos", _texto),
+    ("cerramientos", _texto),
+    ("cerramientos_compromiso", _texto),
+    ("otros_animales", _texto),
+    ("otros_animales_detalle", _texto),
+    ("vacunados", _texto),
+    ("vacunados_motivos", _texto),
+    ("animales_previos", _texto),
+    ("animales_previos_destino", _texto),
+    ("alimentacion_actual", _texto),
+    ("alimentacion_previa", _texto),
+    ("ninos", _texto),
+    ("tiempo_solo", _texto),
+    ("vacaciones", _texto),
+    ("mudanza", _texto),
+    ("fotos", _lista),
+    ("nombre_peludo", _texto),
+)
+
+CAMPOS = tuple(codigo for codigo, _ in ESQUEMA)
+
+
+# El timestamp no está en el diccionario: siempre viene con el título "Timestamp"
+_LEIDOS = ESQUEMA + (("timestamp", _texto),)
+
+
+def _lecturas(claves: Dict[str, str]) -> Tuple[Tuple[str, Optional[str], Callable[[Any], Any]], ...]:
+    """(campo, clave en la respuesta, conversor) para un formato de claves; clave None si no viene"""
+    return tuple((campo, claves.get(campo), conversor) for campo, conversor in _LEIDOS)
+
+
+def _preparar() -> Dict[Optional[int], tuple]:
+    """
+    Lecturas por versión del diccionario (claves = códigos) y para las respuestas crudas
+    (clave None: títulos de la versión actual, sin "_v")
+    """
+    formatos = {}
+    for version, preguntas in VERSIONES.items():
+        formatos[version] = _lecturas({**{codigo: codigo for codigo in preguntas}, "timestamp": "Timestamp"})
+    formatos[None] = _lecturas({**VERSIONES[VERSION_ACTUAL], "timestamp": "Timestamp"})
+    return formatos
+
+
+class Solicitud:
+    """Respuesta del formulario normalizada (se crea con normalizar())"""
+
+    __slots__ = CAMPOS + ("timestamp", "datos", "edad_anios", "celular_digitos")
+
+    edad_anios: Optional[int]
+    celular_digitos: str
+
+    def campos_db(self) -> Dict[str, Any]:
+        """Columnas de solicitudes_adopcion (y claves del resumen de pendientes)"""
+        return {
+            "nombre_apellido": self.nombre,
+            "edad": self.edad,
+            "edad_anios": self.edad_anios,
+            "ocupacion": self.ocupacion,
+            "email": self.email,
+            "instagram": self.instagram,
+            "celular": self.celular,
+            "celular_digitos": self.celular_digitos,
+            "zona": self.zona,
+            "tipo_vivienda": self.tipo_vivienda,
+            "tenencia_vivienda": self.tenencia_vivienda,
+            "cerramientos_url": self.fotos[0] if self.fotos else "",
+            "nombre_peludo": self.nombre_peludo
+        }
+
+
+_FORMATOS = _preparar()
+
+
+def normalizar(datos: Dict[str, Any]) -> Solicitud:
+    """
+    Respuesta del formulario (cruda o de datos_completos) -> Solicitud.
+    Las preguntas que no están en el esquema quedan solo en .datos.
+    Un "_v" que no es una versión conocida (p. ej. en un body armado a mano) se ignora y
+    la respuesta se lee con los títulos de la versión actual.
+    """
+    version = datos.get(CLAVE_VERSION)
+    if type(version) is not int:
+        version = None
+    elif version not in _FORMATOS:
+        # Versión cargada de la base después de importar (diccionario.sincronizar)
+        _FORMATOS.update(_preparar())
+        if version not in _FORMATOS:
+            version = None
+
+    solicitud = Solicitud.__new__(Solicitud)
+    solicitud.datos = datos
+    for campo, clave, conversor in _FORMATOS[version]:
+        valor = datos.get(clave) if clave else None
+        # Los textos (casi todos) ya vienen como str: se guardan sin llamar al conversor
+        setattr(solicitud, campo, valor if conversor is _texto and valor.__class__ is str else conversor(valor))
+    solicitud.edad_anios = edad_anios(solicitud.edad)
+    solicitud.celular_digitos = celular_digitos(solicitud.celular)
+    return solicitud
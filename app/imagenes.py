@@ -0,0 +1,266 @@
+"""
+Proxy de imágenes de Drive para los emails (endpoint /imagenes/{file_id})
+Cada foto se pide una sola vez al origen, ya achicada (lh3.googleusercontent.com acepta
+=w<ancho>), y se guarda en un cache LRU en disco acotado por tamaño. Los emails apuntan
+acá, así abrir un email no vuelve a bajar el original de varios MB.
+Las URLs van firmadas (seguridad.firma_imagen): el proxy no baja IDs arbitrarios.
+
+El origen es intercambiable con IMAGENES_ORIGEN:
+    https://lh3.googleusercontent.com/d/{id}=w{ancho}   (por defecto)
+    file:///ruta/a/directorio                           (archivos locales <id>.<ext>, para pruebas)
+"""
+
+import asyncio
+import glob
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+IMAGENES_ORIGEN = os.getenv("IMAGENES_ORIGEN", "https://lh3.googleusercontent.com/d/{id}=w{ancho}")
+IMAGENES_CACHE_DIR = os.getenv("IMAGENES_CACHE_DIR", "/tmp/rescataditos-imagenes")
+# En Cloud Run /tmp está en memoria: el límite cuenta contra la memoria de la instancia
+IMAGENES_CACHE_MB = float(os.getenv("IMAGENES_CACHE_MB", 64))
+IMAGENES_TIMEOUT = 15  # segundos por pedido al origen
+IMAGENES_MAX_BYTES = int(float(os.getenv("IMAGENES_MAX_MB", 10)) * 1024 * 1024)
+# Los IDs que el origen no tiene se recuerdan un rato para no volver a pedirlos
+IMAGENES_404_TTL = int(os.getenv("IMAGENES_404_TTL", 600))
+NO_ENCONTRADAS_MAX = 4096
+
+# Anchos permitidos (acota las variantes cacheadas por foto); el email usa ANCHO_EMAIL
+ANCHOS = (200, 400, 800)
+ANCHO_EMAIL = 800
+CACHE_CONTROL = "public, max-age=604800"  # 7 días
+
+_FILE_ID = re.compile(r"^[a-zA-Z0-9_-]{10,128}$")
+
+
+class ImagenNoEncontrada(Exception):
+    pass
+
+
+class ImagenMuyGrande(Exception):
+    pass
+
+
+class OrigenHTTP:
+    """Pide la imagen a una URL armada con la plantilla ({id}, {ancho})"""
+
+    def __init__(self, plantilla: str):
+        self.plantilla = plantilla
+
+    def _bajar(self, file_id: str, ancho: int) -> Tuple[bytes, str]:
+        url = self.plantilla.format(id=file_id, ancho=ancho)
+        try:
+            with urllib.request.urlopen(url, timeout=IMAGENES_TIMEOUT) as respuesta:
+                tipo = respuesta.headers.get_content_type()
+                largo = respuesta.headers.get("Content-Length")
+                if largo and largo.isdigit() and int(largo) > IMAGENES_MAX_BYTES:
+                    raise ImagenMuyGrande(file_id)
+                # Sin Content-Length (o si miente) se lee como mucho un byte más del límite
+                contenido = respuesta.read(IMAGENES_MAX_BYTES + 1)
+                if len(contenido) > IMAGENES_MAX_BYTES:
+                    raise ImagenMuyGrande(file_id)
+                return contenido, tipo
+        except urllib.error.HTTPError as e:
+            if e.code in (403, 404):
+                raise ImagenNoEncontrada(file_id) from e
+            raise
+
+    async def obtener(self, file_id: str, ancho: int) -> Tuple[bytes, str]:
+        return await asyncio.to_thread(self._bajar, file_id, ancho)
+
+
+class OrigenLocal:
+    """Sirve <directorio>/<id>.<ext> tal cual (sin achicar): reemplazo de Drive en pruebas"""
+
+    def __init__(self, directorio: str):
+        self.directorio = directorio
+
+    def _leer(self, file_id: str) -> Tuple[bytes, str]:
+        candidatos = glob.glob(os.path.join(self.directorio, glob.escape(file_id) + ".*"))
+        if not candidatos:
+            raise ImagenNoEncontrada(file_id)
+        with open(candidatos[0], "rb") as f:
+            return f.read(), mimetypes.guess_type(candidatos[0])[0] or "application/octet-stream"
+
+    async def obtener(self, file_id: str, ancho: int) -> Tuple[bytes, str]:
+        return await asyncio.to_thread(self._leer, file_id)
+
+
+def crear_origen(configuracion: str):
+    if configuracion.startswith("file://"):
+        return OrigenLocal(configuracion[len("file://"):])
+    return OrigenHTTP(configuracion)
+
+
+class CacheDisco:
+    """
+    LRU en disco acotado por bytes. El índice (clave -> archivo, tamaño, etag) vive en
+    memoria; al arrancar se reconstruye con lo que ya hay en el directorio.
+    leer() y guardar() se llaman desde hilos (asyncio.to_thread): el índice se toca con
+    el lock tomado y los archivos se leen y escriben fuera de él.
+    """
+
+    def __init__(self, directorio: str, max_bytes: int):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._indice: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+        archivos = []
+        for nombre in os.listdir(directorio):
+            ruta = os.path.join(directorio, nombre)
+            if nombre.endswith(".tmp"):
+                # Escritura cortada por un reinicio
+                os.remove(ruta)
+            else:
+                archivos.append(ruta)
+        for ruta in sorted(archivos, key=os.path.getmtime):
+            clave = os.path.basename(ruta).rsplit(".", 1)[0]
+            tipo = mimetypes.guess_type(ruta)[0] or "application/octet-stream"
+            self._registrar(clave, ruta, os.path.getsize(ruta), tipo, None)
+        self._recortar()
+
+    def _registrar(self, clave: str, ruta: str, tamanio: int, tipo: str, etag: Optional[str]):
+        self._indice[clave] = {"ruta": ruta, "tamanio": tamanio, "tipo": tipo, "etag": etag}
+        self.total += tamanio
+
+    def _recortar(self):
+        while self.total > self.max_bytes and self._indice:
+            _, entrada = self._indice.popitem(last=False)
+            self.total -= entrada["tamanio"]
+            try:
+                os.remove(entrada["ruta"])
+            except OSError:
+                pass
+
+    def leer(self, clave: str) -> Optional[Tuple[bytes, str, str]]:
+        """(contenido, tipo, etag) o None; marca la entrada como usada recientemente"""
+        with self._lock:
+            entrada = self._indice.get(clave)
+        if entrada is None:
+            return None
+        try:
+            with open(entrada["ruta"], "rb") as f:
+                contenido = f.read()
+        except OSError:
+            # Lo borró alguien más (p. ej. limpieza de /tmp o _recortar): se vuelve a pedir
+            with self._lock:
+                if self._indice.get(clave) is entrada:
+                    self._indice.pop(clave)
+                    self.total -= entrada["tamanio"]
+            return None
+        if entrada["etag"] is None:
+            entrada["etag"] = calcular_etag(contenido)
+        with self._lock:
+            if clave in self._indice:
+                self._indice.move_to_end(clave)
+        return contenido, entrada["tipo"], entrada["etag"]
+
+    def guardar(self, clave: str, contenido: bytes, tipo: str) -> str:
+        """Escribe la imagen (archivo temporal + rename) y devuelve su etag"""
+        extension = mimetypes.guess_extension(tipo) or ".bin"
+        ruta = os.path.join(self.directorio, clave + extension)
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+        etag = calcular_etag(contenido)
+        with self._lock:
+            anterior = self._indice.pop(clave, None)
+            if anterior:
+                self.total -= anterior["tamanio"]
+                if anterior["ruta"] != ruta:
+                    # Cambió el tipo (y la extensión): el archivo anterior quedaría huérfano
+                    try:
+                        os.remove(anterior["ruta"])
+                    except OSError:
+                        pass
+            self._registrar(clave, ruta, len(contenido), tipo, etag)
+            self._recortar()
+        return etag
+
+
+def calcular_etag(contenido: bytes) -> str:
+    return '"' + hashlib.sha256(contenido).hexdigest()[:32] + '"'
+
+
+_origen = crear_origen(IMAGENES_ORIGEN)
+_cache: Optional[CacheDisco] = None
+# Un solo pedido al origen por imagen aunque la pidan varios clientes a la vez
+_en_curso: Dict[str, asyncio.Future] = {}
+# file_id -> momento (monotonic) hasta el que se responde 404 sin ir al origen
+_no_encontradas: Dict[str, float] = {}
+
+
+def get_cache() -> CacheDisco:
+    global _cache
+    if _cache is None:
+        _cache = CacheDisco(IMAGENES_CACHE_DIR, int(IMAGENES_CACHE_MB * 1024 * 1024))
+    return _cache
+
+
+def configurar(origen=None, cache: Optional[CacheDisco] = None):
+    """Reemplaza el origen y/o el cache (pruebas y benchmarks)"""
+    global _origen, _cache
+    if origen is not None:
+        _origen = origen
+    if cache is not None:
+        _cache = cache
+    _no_encontradas.clear()
+
+
+def validar(file_id: str, ancho: int):
+    """Lanza ValueError si el ID o el ancho no son válidos"""
+    if not _FILE_ID.match(file_id):
+        raise ValueError("ID de archivo inválido")
+    if ancho not in ANCHOS:
+        raise ValueError(f"ancho debe ser uno de {ANCHOS}")
+
+
+async def obtener(file_id: str, ancho: int = ANCHO_EMAIL) -> Tuple[bytes, str, str]:
+    """
+    (contenido, tipo, etag) desde el cache o desde el origen.
+    Lanza ValueError (parámetros) o ImagenNoEncontrada.
+    """
+    validar(file_id, ancho)
+    clave = f"{file_id}-{ancho}"
+    cacheada = await asyncio.to_thread(get_cache().leer, clave)
+    if cacheada:
+        return cacheada
+
+    hasta = _no_encontradas.get(file_id)
+    if hasta is not None:
+        if hasta > time.monotonic():
+            raise ImagenNoEncontrada(file_id)
+        del _no_encontradas[file_id]
+
+    pedido = _en_curso.get(clave)
+    if pedido is None:
+        pedido = asyncio.ensure_future(_bajar(clave, file_id, ancho))
+        _en_curso[clave] = pedido
+        pedido.add_done_callback(lambda _: _en_curso.pop(clave, None))
+    return await asyncio.shield(pedido)
+
+
+async def _bajar(clave: str, file_id: str, ancho: int) -> Tuple[bytes, str, str]:
+    try:
+        contenido, tipo = await _origen.obtener(file_id, ancho)
+        if not tipo.startswith("image/"):
+            # Archivo no público: Drive devuelve la página de login en lugar de la imagen
+            raise ImagenNoEncontrada(file_id)
+    except ImagenNoEncontrada:
+        if len(_no_encontradas) >= NO_ENCONTRADAS_MAX:
+            _no_encontradas.clear()
+        _no_encontradas[file_id] = time.monotonic() + IMAGENES_404_TTL
+        raise
+    etag = await asyncio.to_thread(get_cache().guardar, clave, contenido, tipo)
+    return contenido, tipo, etag
@@ -0,0 +1,267 @@
+"""
+Ingesta de solicitudes en solicitudes_adopcion
+Fila de la tabla a partir de la respuesta normalizada (formulario.py), INSERT de una
+solicitud (webhook) y carga masiva por COPY desde NDJSON (/webhook/form/batch y backfill.py).
+"""
+
+import codecs
+import hashlib
+import json
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, AsyncIterator, Tuple
+
+from psycopg.types.json import Jsonb
+
+import db
+import outbox
+from diccionario import codificar
+from formulario import Solicitud, normalizar
+from emails import generar_html_email, generar_email_resumen_pendientes
+from mailer import EMAIL_DESTINO
+
+# Estados
+ESTADOS = {
+    "PENDIENTE": "Pendiente",
+    "ACEPTADO": "Aceptado",
+    "RECHAZADO": "Rechazado"
+}
+
+# Modos de aviso al equipo para la carga masiva
+NOTIFICAR = ("ninguno", "resumen", "individual")
+
+LOTE_INGESTA = 500
+
+COLUMNAS = (
+    "id", "fecha_solicitud", "estado", "nombre_apellido", "edad", "edad_anios", "ocupacion",
+    "email", "instagram", "celular", "celular_digitos", "zona", "tipo_vivienda", "tenencia_vivienda",
+    "cerramientos_url", "nombre_peludo", "datos_completos",
+    "fecha_creacion", "fecha_actualizacion", "fecha_aceptado", "fecha_rechazado",
+    "huella"
+)
+
+# Un reenvío de la misma respuesta choca con el índice único de huella y no inserta nada.
+# Las solicitudes nuevas van directo a la partición caliente (donde está ese índice)
+SQL_INSERTAR_SOLICITUD = f"""
+    INSERT INTO solicitudes_activas ({", ".join(COLUMNAS)})
+    VALUES ({", ".join(["%s"] * len(COLUMNAS))})
+    ON CONFLICT (huella) DO NOTHING
+    RETURNING id
+"""
+
+SQL_ID_POR_HUELLA = """
+    SELECT id FROM solicitudes_activas WHERE huella = %s
+"""
+
+# La carga masiva pasa por una tabla temporal para poder descartar duplicados con ON CONFLICT
+SQL_CREAR_TEMPORAL = """
+    CREATE TEMP TABLE ingesta_lote (LIKE solicitudes_adopcion INCLUDING DEFAULTS) ON COMMIT DROP
+"""
+
+SQL_COPY_SOLICITUDES = f"COPY ingesta_lote ({', '.join(COLUMNAS)}) FROM STDIN"
+
+# Sin conflict target: descarta tanto las huellas repetidas como los IDs que chocan con la
+# clave primaria (generar_id tiene 32 bits); los choques se detectan después y se reintentan
+SQL_VOLCAR_TEMPORAL = f"""
+    INSERT INTO solicitudes_activas ({", ".join(COLUMNAS)})
+    SELECT {", ".join(COLUMNAS)} FROM ingesta_lote
+    ON CONFLICT DO NOTHING
+    RETURNING id, huella
+"""
+
+# Filas del lote que no entraron y cuya huella tampoco está cargada: chocó el ID
+SQL_CHOQUES_DE_ID = """
+    SELECT t.huella FROM ingesta_lote AS t
+    WHERE NOT EXISTS (SELECT 1 FROM solicitudes_activas AS s WHERE s.huella = t.huella)
+"""
+
+SQL_CAMBIAR_ID = "UPDATE ingesta_lote SET id = %s WHERE huella = %s"
+
+# Vueltas de volcado con IDs nuevos antes de abortar el lote
+INTENTOS_ID = 5
+
+# Huellas ya procesadas por esta instancia: los reintentos inmediatos no tocan la base
+HUELLAS_RECIENTES_MAX = 1024
+_huellas_recientes: "OrderedDict[str, str]" = OrderedDict()
+
+
+def generar_id() -> str:
+    """Genera un ID único para la solicitud"""
+    return f"SOL-{str(uuid.uuid4())[:8].upper()}"
+
+
+def calcular_huella(datos: Dict[str, Any], clave_idempotencia: str = None) -> str:
+    """
+    Huella de una respuesta del formulario: el Idempotency-Key si vino,
+    o un hash del contenido normalizado (claves ordenadas)
+    """
+    if clave_idempotencia:
+        return "k:" + hashlib.sha256(clave_idempotencia.encode("utf-8")).hexdigest()
+    contenido = json.dumps(datos, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return "c:" + hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def id_reciente(huella: str) -> str:
+    """ID de una solicitud ya procesada por esta instancia (o None)"""
+    return _huellas_recientes.get(huella)
+
+
+def recordar_huella(huella: str, solicitud_id: str):
+    _huellas_recientes[huella] = solicitud_id
+    _huellas_recientes.move_to_end(huella)
+    if len(_huellas_recientes) > HUELLAS_RECIENTES_MAX:
+        _huellas_recientes.popitem(last=False)
+
+
+def fila_solicitud(solicitud_id: str, solicitud: Solicitud, huella: str) -> Tuple:
+    """Arma la fila de solicitudes_adopcion en el orden de COLUMNAS"""
+    # El timestamp viene dentro de los datos del formulario
+    # Si no hay timestamp, usar hora de Buenos Aires (UTC-3)
+    tz_bsas = timezone(timedelta(hours=-3))
+    timestamp = solicitud.timestamp or datetime.now(tz_bsas).isoformat()
+    ahora = datetime.now().isoformat()
+
+    return (
+        solicitud_id,
+        timestamp,
+        ESTADOS["PENDIENTE"],
+        solicitud.nombre,
+        solicitud.edad,
+        solicitud.edad_anios,
+        solicitud.ocupacion,
+        solicitud.email,
+        solicitud.instagram,
+        solicitud.celular,
+        solicitud.celular_digitos,
+        solicitud.zona,
+        solicitud.tipo_vivienda,
+        solicitud.tenencia_vivienda,
+        solicitud.fotos[0] if solicitud.fotos else "",
+        solicitud.nombre_peludo,
+        Jsonb(codificar(solicitud.datos)),
+        ahora,
+        ahora,
+        None,
+        None,
+        huella
+    )
+
+
+async def insertar_lote(cur, lote: List[Dict[str, Any]], notificar: str) -> List[Dict[str, Any]]:
+    """
+    Carga un lote de respuestas con COPY y encola los avisos al equipo, todo en la
+    transacción del cursor. Las respuestas que ya estaban cargadas (misma huella) se descartan;
+    las que chocan con el ID de otra solicitud se vuelven a insertar con un ID nuevo.
+    Devuelve las solicitudes insertadas (id + campos).
+    """
+    leidas = {}
+    await cur.execute(SQL_CREAR_TEMPORAL)
+    async with cur.copy(SQL_COPY_SOLICITUDES) as copy:
+        for datos in lote:
+            solicitud = normalizar(datos)
+            huella = calcular_huella(datos)
+            await copy.write_row(fila_solicitud(generar_id(), solicitud, huella))
+            leidas.setdefault(huella, solicitud)
+
+    insertados = {}
+    for _ in range(INTENTOS_ID):
+        await cur.execute(SQL_VOLCAR_TEMPORAL)
+        insertados.update((fila['huella'], fila['id']) for fila in await cur.fetchall())
+        await cur.execute(SQL_CHOQUES_DE_ID)
+        choques = [fila['huella'] for fila in await cur.fetchall()]
+        if not choques:
+            break
+        print(f"⚠️  {len(choques)} ID(s) repetido(s) en la carga masiva, se generan otros")
+        await cur.executemany(SQL_CAMBIAR_ID, [(generar_id(), huella) for huella in choques])
+    else:
+        raise RuntimeError("No se encontraron IDs libres para el lote")
+
+    # Solo se avisa por las que no estaban cargadas
+    cargadas = [
+        {"id": insertados[huella], **solicitud.campos_db(), "_solicitud": solicitud}
+        for huella, solicitud in leidas.items() if huella in insertados
+    ]
+
+    if notificar == "individual":
+        for sol in cargadas:
+            await outbox.encolar(
+                cur,
+                destinatario=EMAIL_DESTINO,
+                asunto=f"🐾 Nueva Solicitud - {sol['nombre_apellido']}",
+                html_body=generar_html_email(sol['id'], sol['_solicitud'])
+            )
+    elif notificar == "resumen" and cargadas:
+        await outbox.encolar(
+            cur,
+            destinatario=EMAIL_DESTINO,
+            asunto=f"📥 {len(cargadas)} Solicitud(es) Importada(s)",
+            html_body=generar_email_resumen_pendientes(cargadas)
+        )
+
+    return cargadas
+
+
+async def _a_async(iterable):
+    for item in iterable:
+        yield item
+
+
+async def _lineas(origen) -> AsyncIterator[Tuple[int, str]]:
+    """Numera las líneas de un iterable (sync o async) de chunks bytes/str partidos en cualquier lugar"""
+    if not hasattr(origen, "__aiter__"):
+        origen = _a_async(origen)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    resto = ""
+    numero = 0
+    async for chunk in origen:
+        resto += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        *completas, resto = resto.split("\n")
+        for linea in completas:
+            numero += 1
+            yield numero, linea
+    resto += decoder.decode(b"", final=True)
+    if resto:
+        yield numero + 1, resto
+
+
+async def ingerir_ndjson(origen, notificar: str = "resumen", lote: int = LOTE_INGESTA) -> Dict[str, Any]:
+    """
+    Carga en solicitudes_adopcion un stream NDJSON (una respuesta del formulario por línea).
+    Cada lote va en su propia transacción; las líneas inválidas se informan y se saltean.
+    """
+    if notificar not in NOTIFICAR:
+        raise ValueError(f"notificar debe ser uno de {NOTIFICAR}")
+
+    resultado = {"insertadas": 0, "duplicadas": 0, "lotes": 0, "errores": []}
+    pendiente = []
+
+    async def volcar():
+        async with db.conexion() as conn, conn.cursor() as cur:
+            cargadas = await insertar_lote(cur, pendiente, notificar)
+        resultado["insertadas"] += len(cargadas)
+        resultado["duplicadas"] += len(pendiente) - len(cargadas)
+        resultado["lotes"] += 1
+        pendiente.clear()
+        if notificar != "ninguno":
+            outbox.despertar()
+
+    async for numero, linea in _lineas(origen):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+        except json.JSONDecodeError as e:
+            resultado["errores"].append({"linea": numero, "error": str(e)})
+            continue
+        if not isinstance(datos, dict):
+            resultado["errores"].append({"linea": numero, "error": "Se esperaba un objeto JSON"})
+            continue
+        pendiente.append(datos)
+        if len(pendiente) >= lote:
+            await volcar()
+
+    if pendiente:
+        await volcar()
+
+    return resultado
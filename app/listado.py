@@ -0,0 +1,193 @@
+"""
+Listado y búsqueda de solicitudes para el panel de voluntarias
+Filtros por estado, peludo, zona y rango de fechas, con paginación keyset sobre
+(fecha_solicitud, id): cada página es un rango del índice, sin OFFSET.
+La búsqueda usa las columnas generadas busqueda (tsvector) y busqueda_texto (trigramas).
+Los resultados se cachean unos segundos en memoria y el cache se vacía con cada escritura.
+"""
+
+import base64
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+
+import db
+from formulario import celular_digitos
+
+LISTADO_LIMITE = 20
+LISTADO_LIMITE_MAX = 100
+LISTADO_CACHE_TTL = float(os.getenv("LISTADO_CACHE_TTL", 5))  # segundos
+LISTADO_CACHE_MAX = 256  # páginas distintas en memoria
+
+COLUMNAS_LISTADO = (
+    "id, fecha_solicitud, estado, nombre_apellido, edad, ocupacion, email, instagram, celular, "
+    "zona, tipo_vivienda, tenencia_vivienda, nombre_peludo, fecha_aceptado, fecha_rechazado, "
+    "email_respuesta_enviado"
+)
+
+BUSQUEDA_MIN = 2  # caracteres
+
+# Coincidencias por texto completo (palabras, con stemming en castellano), por substring
+# (nombre parcial, @handle, teléfono) o parecidas (errores de tipeo); ordenadas por relevancia
+SQL_BUSCAR = f"""
+    SELECT {COLUMNAS_LISTADO},
+           ts_rank_cd(busqueda, consulta) + word_similarity(%(texto)s, busqueda_texto) AS relevancia
+    FROM solicitudes_adopcion, websearch_to_tsquery('spanish', %(texto)s) AS consulta
+    WHERE (busqueda @@ consulta
+           OR busqueda_texto LIKE %(patron)s
+           OR %(texto)s <%% busqueda_texto)
+    AND (%(estado)s::text IS NULL OR estado = %(estado)s)
+    ORDER BY relevancia DESC, fecha_solicitud DESC
+    LIMIT %(limite)s
+"""
+
+_COMODINES_LIKE = re.compile(r"([\\%_])")
+
+# Un teléfono escrito con espacios, guiones o paréntesis ('11 5555-5555', '(011) 5555 5555')
+_TELEFONO = re.compile(r"\+?[\d\s().-]+")
+TELEFONO_MIN = 6  # dígitos
+
+_cache: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+# Aumenta con cada invalidación: una consulta que empezó antes no guarda su resultado viejo
+_generacion = 0
+
+
+def invalidar_cache():
+    """Descarta las páginas cacheadas (llamar después de cada escritura en solicitudes_adopcion)"""
+    global _generacion
+    _generacion += 1
+    _cache.clear()
+
+
+def codificar_cursor(fecha: datetime, solicitud_id: str) -> str:
+    crudo = json.dumps([fecha.isoformat(), solicitud_id]).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Lanza ValueError si el cursor no es válido"""
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fecha, solicitud_id = json.loads(crudo)
+        return datetime.fromisoformat(fecha), str(solicitud_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
+def filtros(estado: Optional[str], nombre_peludo: Optional[str], zona: Optional[str],
+            desde: Optional[datetime], hasta: Optional[datetime]) -> Tuple[List[str], list]:
+    """Condiciones del WHERE y sus parámetros para los filtros presentes (listado y exportación)"""
+    condiciones = []
+    params = []
+    if estado:
+        condiciones.append("estado = %s")
+        params.append(estado)
+    if nombre_peludo:
+        condiciones.append("nombre_peludo = %s")
+        params.append(nombre_peludo)
+    if zona:
+        # La zona se guarda en mayúsculas (formulario.normalizar)
+        condiciones.append("zona = %s")
+        params.append(zona.upper())
+    if desde:
+        condiciones.append("fecha_solicitud >= %s")
+        params.append(desde)
+    if hasta:
+        condiciones.append("fecha_solicitud < %s")
+        params.append(hasta)
+    return condiciones, params
+
+
+def armar_consulta(estado: Optional[str], nombre_peludo: Optional[str], zona: Optional[str],
+                   desde: Optional[datetime], hasta: Optional[datetime],
+                   despues_de: Optional[Tuple[datetime, str]], limite: int) -> Tuple[str, list]:
+    """SELECT con los filtros presentes; ordena por (fecha_solicitud, id) descendente"""
+    condiciones, params = filtros(estado, nombre_peludo, zona, desde, hasta)
+    if despues_de:
+        condiciones.append("(fecha_solicitud, id) < (%s, %s)")
+        params.extend(despues_de)
+
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    sql = f"""
+        SELECT {COLUMNAS_LISTADO}
+        FROM solicitudes_adopcion
+        {where}
+        ORDER BY fecha_solicitud DESC, id DESC
+        LIMIT %s
+    """
+    params.append(limite + 1)
+    return sql, params
+
+
+async def listar(estado: Optional[str] = None, nombre_peludo: Optional[str] = None,
+                 zona: Optional[str] = None, desde: Optional[datetime] = None,
+                 hasta: Optional[datetime] = None, cursor: Optional[str] = None,
+                 limite: int = LISTADO_LIMITE) -> Dict[str, Any]:
+    """
+    Devuelve una página {"solicitudes", "siguiente"}; "siguiente" es el cursor de la
+    página que sigue (None si es la última)
+    """
+    limite = max(1, min(limite, LISTADO_LIMITE_MAX))
+    despues_de = decodificar_cursor(cursor) if cursor else None
+
+    async def consultar():
+        sql, params = armar_consulta(estado, nombre_peludo, zona, desde, hasta, despues_de, limite)
+        async with db.conexion() as conn, conn.cursor() as cur:
+            await cur.execute(sql, params)
+            filas = await cur.fetchall()
+
+        siguiente = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            siguiente = codificar_cursor(filas[-1]['fecha_solicitud'], filas[-1]['id'])
+        return {"solicitudes": filas, "siguiente": siguiente}
+
+    return await _cacheado(("listar", estado, nombre_peludo, zona, desde, hasta, cursor, limite), consultar)
+
+
+async def buscar(texto: str, estado: Optional[str] = None, limite: int = LISTADO_LIMITE) -> Dict[str, Any]:
+    """Busca por nombre, instagram, celular, peludo y respuestas del formulario; lanza ValueError si el texto es corto"""
+    texto = " ".join(texto.split()).lower()
+    if len(texto) < BUSQUEDA_MIN:
+        raise ValueError(f"La búsqueda necesita al menos {BUSQUEDA_MIN} caracteres")
+    limite = max(1, min(limite, LISTADO_LIMITE_MAX))
+
+    # Los % y _ que escriba el usuario se buscan literalmente. Un teléfono se busca por sus
+    # dígitos (busqueda_texto tiene el celular también sin separadores)
+    digitos = celular_digitos(texto)
+    if len(digitos) >= TELEFONO_MIN and _TELEFONO.fullmatch(texto):
+        patron = "%" + digitos + "%"
+    else:
+        patron = "%" + _COMODINES_LIKE.sub(r"\\\1", texto) + "%"
+
+    async def consultar():
+        params = {
+            "texto": texto,
+            "patron": patron,
+            "estado": estado,
+            "limite": limite
+        }
+        async with db.conexion() as conn, conn.cursor() as cur:
+            await cur.execute(SQL_BUSCAR, params)
+            return {"solicitudes": await cur.fetchall()}
+
+    return await _cacheado(("buscar", texto, estado, limite), consultar)
+
+
+async def _cacheado(clave: Tuple, consultar: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Devuelve el resultado cacheado si no venció; si no, consulta y lo guarda"""
+    ahora = time.monotonic()
+    cacheado = _cache.get(clave)
+    if cacheado and cacheado[0] > ahora:
+        return cacheado[1]
+
+    generacion = _generacion
+    resultado = await consultar()
+    if generacion == _generacion:
+        if len(_cache) >= LISTADO_CACHE_MAX:
+            _cache.clear()
+        _cache[clave] = (ahora + LISTADO_CACHE_TTL, resultado)
+    return resultado
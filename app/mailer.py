@@ -0,0 +1,175 @@
+"""
+Envío de emails con Gmail SMTP
+Una SesionSMTP mantiene una sola conexión autenticada para todo un lote de emails,
+se reconecta si Gmail la corta y respeta un límite de envío (token bucket).
+"""
+
+import os
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from typing import Dict, Any, List, Tuple
+
+from metricas import EMAILS, etapa
+
+# Configuración de email
+GMAIL_USER = os.getenv("GMAIL_USER")
+GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
+EMAIL_DESTINO = os.getenv("EMAIL_DESTINO")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") == "1"
+
+# Límite de envío: Gmail corta las ráfagas largas, así que se envía a ritmo constante
+MAIL_TASA_POR_MINUTO = float(os.getenv("MAIL_TASA_POR_MINUTO", 20))
+MAIL_RAFAGA = int(os.getenv("MAIL_RAFAGA", 5))
+
+
+class LimitadorTasa:
+    """Token bucket thread-safe: `tasa` tokens por segundo con capacidad `capacidad`"""
+
+    def __init__(self, tasa: float, capacidad: int):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        """Bloquea hasta que haya un token disponible y lo consume"""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.tasa
+            time.sleep(espera)
+
+
+# Compartido por todas las sesiones del proceso
+limitador = LimitadorTasa(MAIL_TASA_POR_MINUTO / 60, MAIL_RAFAGA)
+
+
+def es_transitorio(error: smtplib.SMTPException) -> bool:
+    """4xx de SMTP (p. ej. 421 por exceso de envíos): el mismo mensaje puede salir más tarde"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codigos = [codigo for codigo, _ in error.recipients.values()]
+    else:
+        codigos = [getattr(error, "smtp_code", None)]
+    return bool(codigos) and all(isinstance(c, int) and 400 <= c < 500 for c in codigos)
+
+
+def construir_mensaje(destinatario: str, asunto: str, html_body: str) -> MIMEMultipart:
+    """Arma el mensaje MIME con el cuerpo HTML"""
+    if any(c in valor for valor in (destinatario, asunto) for c in "\r\n"):
+        # Un email del formulario con saltos de línea agregaría headers (p. ej. Bcc)
+        raise ValueError("destinatario o asunto con saltos de línea")
+    message = MIMEMultipart('alternative')
+    message['From'] = f"101 Rescataditos <{GMAIL_USER}>"
+    message['To'] = destinatario
+    message['Subject'] = asunto
+    message.attach(MIMEText(html_body, 'html'))
+    return message
+
+
+class SesionSMTP:
+    """
+    Conexión SMTP autenticada reutilizable para un lote de emails.
+    Uso:
+        with SesionSMTP() as sesion:
+            resultado = sesion.enviar(destinatario, asunto, html)
+    """
+
+    def __init__(self, limitador: LimitadorTasa = limitador):
+        self.limitador = limitador
+        self._server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def _conectar(self):
+        if SMTP_SSL:
+            server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=30)
+        else:
+            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+        if GMAIL_APP_PASSWORD:
+            server.login(GMAIL_USER, GMAIL_APP_PASSWORD)
+        self._server = server
+
+    def cerrar(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+    def enviar(self, destinatario: str, asunto: str, html_body: str) -> Dict[str, Any]:
+        """
+        Envía un email y devuelve {"destinatario", "ok", "error"} sin lanzar excepciones.
+        Si la conexión se cayó o el servidor respondió un 4xx, reconecta una vez y reintenta.
+        """
+        try:
+            message = construir_mensaje(destinatario, asunto, html_body)
+        except ValueError as e:
+            EMAILS.labels("fallido").inc()
+            print(f"❌ Email a {destinatario!r} descartado: {str(e)}")
+            return {"destinatario": destinatario, "ok": False, "error": str(e)}
+        with etapa("smtp", "limite_tasa"):
+            self.limitador.esperar()
+
+        for _ in range(2):
+            try:
+                if self._server is None:
+                    with etapa("smtp", "conexion"):
+                        self._conectar()
+                with etapa("smtp", "envio"):
+                    self._server.send_message(message)
+                EMAILS.labels("enviado").inc()
+                print(f"✅ Email enviado a {destinatario}")
+                return {"destinatario": destinatario, "ok": True, "error": None}
+            except smtplib.SMTPServerDisconnected as e:
+                # Conexión caída o vencida: se descarta y se reintenta con una nueva
+                self._server = None
+                error = e
+            except smtplib.SMTPException as e:
+                # (va antes que OSError porque SMTPException hereda de OSError)
+                error = e
+                if not es_transitorio(e):
+                    # Rechazo definitivo (5xx) del mensaje o del destinatario: reintentar no sirve
+                    break
+                # 4xx: Gmail suele cortar la conexión después de un 421, se reintenta con una
+                # nueva; si vuelve a fallar queda para la próxima corrida (backoff del llamador)
+                self.cerrar()
+            except OSError as e:
+                # Error de red: igual que una conexión caída
+                self._server = None
+                error = e
+            except Exception as e:
+                # Mensaje que no se puede serializar (p. ej. un header inválido): no se
+                # reintenta y el lote sigue con el próximo
+                error = e
+                break
+
+        EMAILS.labels("fallido").inc()
+        print(f"❌ Error al enviar email a {destinatario}: {str(error)}")
+        return {"destinatario": destinatario, "ok": False, "error": str(error)}
+
+    def enviar_todos(self, mensajes: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+        """Envía (destinatario, asunto, html) en orden; un resultado por mensaje"""
+        return [self.enviar(*mensaje) for mensaje in mensajes]
+
+
+def enviar_lote(mensajes: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+    """Envía (destinatario, asunto, html) usando una sola sesión; un resultado por mensaje"""
+    with SesionSMTP() as sesion:
+        return sesion.enviar_todos(mensajes)
+
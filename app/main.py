@@ -3,325 +3,145 @@ Sistema de Gestión de Adopciones - Cloud Run
 FastAPI + PostgreSQL (Supabase) + Gmail SMTP
 """
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
-from datetime import datetime, timezone, timedelta
+from fastapi import FastAPI, Request, HTTPException, Depends, Header
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
 import os
-import uuid
-from typing import Dict, Any
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import json
-
-app = FastAPI()
-
-# Configuración de base de datos
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-
-# Configuración de email
-GMAIL_USER = os.getenv("GMAIL_USER")
-GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
-EMAIL_DESTINO = os.getenv("EMAIL_DESTINO")
-CLOUD_RUN_URL = os.getenv("CLOUD_RUN_URL")
-
-
-def get_db_connection():
-    """Crear conexión a PostgreSQL"""
-    return psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        cursor_factory=RealDictCursor
-    )
-
-# Estados
-ESTADOS = {
-    "PENDIENTE": "Pendiente",
-    "ACEPTADO": "Aceptado",
-    "RECHAZADO": "Rechazado"
-}
-
-
-def enviar_email_gmail(destinatario: str, asunto: str, html_body: str):
-    """Envía un email usando Gmail SMTP con App Password"""
+from typing import Optional
+from urllib.parse import parse_qs, urlencode
+
+import db
+import diccionario
+import estadisticas
+import exportacion
+import fallidos
+import imagenes
+import listado
+import plantillas
+from decisiones import (
+    ACCIONES, DECISION_LOTE_MAX, SQL_DECIDIR, TABLAS_DECIDIR, ahora_bsas, decidir_lote, pendientes
+)
+from emails import generar_html_email
+from formulario import normalizar
+from ingesta import (
+    ESTADOS, NOTIFICAR, LOTE_INGESTA, SQL_INSERTAR_SOLICITUD, SQL_ID_POR_HUELLA,
+    generar_id, fila_solicitud, ingerir_ndjson,
+    calcular_huella, id_reciente, recordar_huella
+)
+from mailer import EMAIL_DESTINO
+import metricas
+from metricas import etapa
+import notificaciones
+import outbox
+from seguridad import firma_imagen_valida, parametros_firmados, requerir_admin, requerir_admin_o_firma
+
+
+# Segundos que el calentamiento espera a que el pool abra una conexión
+ARRANQUE_TIMEOUT = float(os.getenv("ARRANQUE_TIMEOUT", 10))
+
+
+async def calentar_base():
+    """
+    Abre la primera conexión del pool y sincroniza el diccionario de preguntas, en segundo
+    plano: el servicio atiende mientras tanto y /ready devuelve 503 hasta que la base responda.
+    """
     try:
-        # Crear mensaje MIME
-        message = MIMEMultipart('alternative')
-        message['From'] = f"101 Rescataditos <{GMAIL_USER}>"
-        message['To'] = destinatario
-        message['Subject'] = asunto
-        
-        # Agregar contenido HTML
-        html_part = MIMEText(html_body, 'html')
-        message.attach(html_part)
-        
-        # Conectar a Gmail SMTP
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(GMAIL_USER, GMAIL_APP_PASSWORD)
-            server.send_message(message)
-        
-        print(f"✅ Email enviado a {destinatario}")
-        return True
+        await db.verificar(ARRANQUE_TIMEOUT)
+        await diccionario.sincronizar()
+        print("✅ Pool de conexiones listo")
     except Exception as e:
-        print(f"❌ Error al enviar email: {str(e)}")
-        raise
+        print(f"❌ La base no respondió al arrancar: {str(e)}")
 
 
-def generar_id() -> str:
-    """Genera un ID único para la solicitud"""
-    return f"SOL-{str(uuid.uuid4())[:8].upper()}"
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Abre el pool, lo calienta en segundo plano y arranca el worker del outbox; los cierra al apagar"""
+    # Plantillas y regex usadas una vez antes del primer request (no tocan la base)
+    plantillas.cargar()
+    generar_html_email("SOL-ARRANQUE", {})
+    await db.abrir_pool()
+    calentamiento = asyncio.create_task(calentar_base())
+    outbox.iniciar_worker()
+    yield
+    calentamiento.cancel()
+    await outbox.detener_worker()
+    await db.cerrar_pool()
 
 
-def extraer_campos_db(datos: Dict[str, Any]) -> Dict[str, Any]:
-    """Extrae solo los campos que van a la base de datos"""
-    
-    # Helper para obtener el primer valor de la lista
-    def get_value(key: str) -> str:
-        return datos.get(key, [""])[0] if isinstance(datos.get(key), list) else datos.get(key, "")
-    
-    zona_value = get_value("¿Vivís en CABA? ¿En qué zona estas?")
-    
-    return {
-        "nombre_apellido": get_value("Nombre y Apellido"),
-        "edad": get_value("Edad"),
-        "ocupacion": get_value("Ocupación"),
-        "email": get_value("Email"),
-        "instagram": get_value("Instagram"),
-        "celular": get_value("Celular de contacto"),
-        "zona": zona_value.upper() if zona_value else "",
-        "tipo_vivienda": get_value("¿Vivís en casa o departamento?"),
-        "tenencia_vivienda": get_value("Tipo de tenencia de la vivienda"),
-        "cerramientos_url": get_value("En este espacio cargue las fotos o un video de los cerramientos. No mas de 100MB"),
-        "nombre_peludo": get_value("Nombre del peludo en el que estas interesado/a.En caso de que no tenga un nombre asignado por nosotras, describir su aspecto.")
-    }
-
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metricas.MiddlewareMetricas)
 
-def generar_html_email(solicitud_id: str, datos: Dict[str, Any]) -> str:
-    """Genera el HTML del email con todos los campos del formulario"""
-    
-    # Helper para convertir URLs de Google Drive a imágenes directas
-    def drive_url_to_image(url: str) -> str:
-        """Extrae el ID de Google Drive y retorna URL de imagen directa"""
-        if not url or url == 'N/A':
-            return ''
-        
-        import re
-        # Extraer ID de diferentes formatos de URL de Google Drive
-        patterns = [
-            r'/file/d/([a-zA-Z0-9_-]+)',
-            r'id=([a-zA-Z0-9_-]+)',
-            r'/open\?id=([a-zA-Z0-9_-]+)',
-            r'^([a-zA-Z0-9_-]{25,})$'  # Solo el ID
-        ]
-        
-        file_id = None
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                file_id = match.group(1)
-                break
-        
-        if file_id:
-            return f'https://lh3.googleusercontent.com/d/{file_id}'
-        return url
-    
-    # Helper para obtener valores
-    def get_value(key: str) -> str:
-        val = datos.get(key, [""])[0] if isinstance(datos.get(key), list) else datos.get(key, "")
-        return val if val else "No especificado"
-    
-    # URLs para los botones
-    url_aceptar = f"{CLOUD_RUN_URL}/action?action=aceptar&id={solicitud_id}"
-    url_rechazar = f"{CLOUD_RUN_URL}/action?action=rechazar&id={solicitud_id}"
-    
-    html = f"""
-    <html>
-      <head>
-        <style>
-          body {{ font-family: Arial, sans-serif; line-height: 1.5; color: #333; background: #f5f5f5; }}
-          .container {{ max-width: 700px; margin: 20px auto; background: white; border-radius: 10px; overflow: hidden; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-          .header {{ 
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white; 
-            padding: 25px; 
-            text-align: center; 
-          }}
-          .badge {{ 
-            display: inline-block;
-            background: rgba(255,255,255,0.2);
-            color: white;
-            padding: 6px 12px;
-            border-radius: 5px;
-            font-size: 13px;
-            font-family: monospace;
-            margin-top: 8px;
-          }}
-          .content {{ padding: 25px; }}
-          .section {{ margin-bottom: 20px; padding: 15px; background: #f9f9f9; border-left: 3px solid #667eea; border-radius: 5px; }}
-          .section-title {{ font-size: 16px; font-weight: bold; color: #667eea; margin-bottom: 10px; }}
-          .info-line {{ margin: 6px 0; font-size: 14px; }}
-          .info-line strong {{ color: #555; }}
-          .peludo {{ font-size: 16px; font-weight: bold; color: #667eea; background: #fff; padding: 10px; border-radius: 5px; margin-top: 5px; }}
-          .buttons {{ text-align: center; padding: 20px; background: #f9f9f9; border-top: 2px solid #eee; }}
-          .button {{ 
-            display: inline-block; 
-            padding: 12px 30px; 
-            margin: 5px; 
-            text-decoration: none; 
-            border-radius: 8px; 
-            font-weight: bold;
-            color: white;
-            font-size: 15px;
-          }}
-          .btn-aceptar {{ background-color: #34a853; }}
-          .btn-rechazar {{ background-color: #ea4335; }}
-          .footer {{ text-align: center; padding: 15px; color: #777; font-size: 11px; background: #f5f5f5; }}
-        </style>
-      </head>
-      <body>
-        <div class="container">
-          <div class="header">
-            <h1>🐾 Nueva Solicitud de Adopción</h1>
-            <div class="badge">ID: {solicitud_id}</div>
-          </div>
-          
-          <div class="content">
-            <!-- Datos Personales -->
-            <div class="section">
-              <div class="section-title">👤 Datos Personales</div>
-              <div class="info-line"><strong>Nombre:</strong> {get_value("Nombre y Apellido")}</div>
-              <div class="info-line"><strong>Edad:</strong> {get_value("Edad")} • <strong>Ocupación:</strong> {get_value("Ocupación")}</div>
-              <div class="info-line"><strong>Email:</strong> {get_value("Email")}</div>
-              <div class="info-line"><strong>Celular:</strong> {get_value("Celular de contacto")} • <strong>Instagram:</strong> {get_value("Instagram")}</div>
-              <div class="info-line"><strong>Zona:</strong> {get_value("¿Vivís en CABA? ¿En qué zona estas?")}</div> 
-            </div>
-
-            <!-- Vivienda -->
-            <div class="section">
-              <div class="section-title">🏠 Vivienda</div>
-              <div class="info-line"><strong>Tipo:</strong> {get_value("¿Vivís en casa o departamento?")} • <strong>Tenencia:</strong> {get_value("Tipo de tenencia de la vivienda")}</div>
-              <div class="info-line"><strong>Consultó dueños:</strong> {get_value("En caso de que sea alquilada, prestada o compartida: ¿consultaste previamente con los dueños?")}</div>
-              <div class="info-line"><strong>Cerramientos:</strong> {get_value("¿Tenes cerramientos/protecciones en ventanas/balcón/patio/terraza?")}</div>
-              {f'<div class="info-line"><strong>Fotos/Video:</strong><br><img src="{drive_url_to_image(get_value("En este espacio cargue las fotos o un video de los cerramientos. No mas de 100MB"))}" style="max-width: 100%; height: auto; margin-top: 10px; border-radius: 8px;"></div>' if get_value("En este espacio cargue las fotos o un video de los cerramientos. No mas de 100MB") != 'N/A' else '<div class="info-line"><strong>Fotos/Video:</strong> No cargadas</div>'}
-              <div class="info-line"><strong>Si no tiene:</strong> {get_value("En caso de no tener, comentanos si estás dispuesto a ponerlos y cuándo, sino no podremos considerar su solicitud de adopción.")}</div>
-            </div>
-
-            <!-- Experiencia con animales -->
-            <div class="section">
-              <div class="section-title">🐕 Experiencia</div>
-              <div class="info-line"><strong>Tiene otros animales:</strong> {get_value("¿Tenes otros animales?")}</div>
-              <div class="info-line"><strong>Detalles:</strong> {get_value("Contanos un poco más acerca de si son gatos o perros, cuantos y que edades tienen!")}</div>
-              <div class="info-line"><strong>Vacunados/Castrados:</strong> {get_value("¿Están vacunados y/o castrados?")}</div>
-              <div class="info-line"><strong>Motivos si no:</strong> {get_value("En caso de no estar vacunados y/o castrados, contanos los motivos que te llevaron a esa decisión.")}</div>
-              <div class="info-line"><strong>Tuvo antes:</strong> {get_value("¿Tuviste animales previamente?")}</div>
-              <div class="info-line"><strong>Qué pasó:</strong> {get_value("Contanos que ocurrió con ellos")}</div>
-              <div class="info-line"><strong>Alimentación actual:</strong> {get_value("¿Qué alimentación le/s das? (Detalle marca si es alimento balanceado)")}</div>
-              <div class="info-line"><strong>Alimentación previa:</strong> {get_value("¿Qué alimento le/s dabas?")}</div>
-            </div>
-
-            <!-- Otros -->
-            <div class="section">
-              <div class="section-title">🌟 Otros Datos</div>
-              <div class="info-line"><strong>Niños (edades):</strong> {get_value("¿Hay niños pequeños en el domicilio? Aclarar sus edades.")}</div>
-              <div class="info-line"><strong>Tiempo solo:</strong> {get_value("¿Cuánto tiempo estaría solo el peludo en su vida cotidiana?")}</div>
-              <div class="info-line"><strong>En vacaciones:</strong> {get_value("¿Qué harías con el peludo en caso de vacaciones?")}</div>
-              <div class="info-line"><strong>En mudanza:</strong> {get_value("¿Qué harías con el peludo en caso de mudanza?")}</div>
-            </div>
-
-            <!-- Peludo -->
-            <div class="section">
-              <div class="section-title">❤️ Peludo de Interés</div>
-              <div class="peludo">{get_value("Nombre del peludo en el que estas interesado/a.En caso de que no tenga un nombre asignado por nosotras, describir su aspecto.")}</div>
-            </div>
-          </div>
-          
-          <div class="buttons">
-            <h3 style="margin: 0 0 15px 0; font-size: 16px;">⚡ Acciones Rápidas</h3>
-            <a href="{url_aceptar}" class="button btn-aceptar">✅ Aceptar</a>
-            <a href="{url_rechazar}" class="button btn-rechazar">❌ Rechazar</a>
-          </div>
-          
-          <div class="footer">
-            <p>💾 Sistema automático de gestión de adopciones</p>
-          </div>
-        </div>
-      </body>
-    </html>
-    """
-    
-    return html
+# Página de confirmación de /action
+PLANTILLA_ACCION = plantillas.obtener("accion")
+# Decisión en lote: vista de pendientes y confirmación (los links son relativos al servicio)
+PLANTILLA_PENDIENTES = plantillas.obtener("pendientes").fijar(url_base="")
+PLANTILLA_PENDIENTE = plantillas.obtener("pendientes_fila")
+PLANTILLA_ACCION_LOTE = plantillas.obtener("accion_lote").fijar(url_base="")
 
 
 @app.post("/webhook/form")
-async def handle_form_submission(request: Request):
-    """Recibe los datos del formulario desde Apps Script"""
-    datos_formulario = await request.json()
+async def handle_form_submission(request: Request, idempotency_key: Optional[str] = Header(None)):
+    """
+    Recibe los datos del formulario desde Apps Script.
+    Es idempotente: si la misma respuesta llega de nuevo (reintento de UrlFetchApp o trigger
+    duplicado) devuelve el ID original sin insertar ni enviar otro email.
+    """
+    with etapa("webhook", "leer_body"):
+        datos_formulario = await request.json()
+    
+    # Huella de la respuesta (Idempotency-Key si lo manda Apps Script)
+    huella = calcular_huella(datos_formulario, idempotency_key)
     
-    # El timestamp viene dentro de los datos del formulario
-    # Si no hay timestamp, usar hora de Buenos Aires (UTC-3)
-    tz_bsas = timezone(timedelta(hours=-3))
-    timestamp = datos_formulario.get("Timestamp", datetime.now(tz_bsas).isoformat())
+    # Camino rápido: reintento que ya procesó esta instancia
+    id_original = id_reciente(huella)
+    if id_original:
+        return respuesta_duplicada(id_original)
     
     # Generar ID único
     solicitud_id = generar_id()
     
-    # Extraer campos para la base de datos
-    campos_db = extraer_campos_db(datos_formulario)
-    
-    # Guardar en PostgreSQL
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO solicitudes_adopcion (
-            id, fecha_solicitud, estado, nombre_apellido, edad, ocupacion,
-            email, instagram, celular, zona, tipo_vivienda, tenencia_vivienda,
-            cerramientos_url, nombre_peludo, datos_completos,
-            fecha_creacion, fecha_actualizacion, fecha_aceptado, fecha_rechazado
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-        )
-    """, (
-        solicitud_id,
-        timestamp,
-        ESTADOS["PENDIENTE"],
-        campos_db["nombre_apellido"],
-        campos_db["edad"],
-        campos_db["ocupacion"],
-        campos_db["email"],
-        campos_db["instagram"],
-        campos_db["celular"],
-        campos_db["zona"],
-        campos_db["tipo_vivienda"],
-        campos_db["tenencia_vivienda"],
-        campos_db["cerramientos_url"],
-        campos_db["nombre_peludo"],
-        json.dumps(datos_formulario),
-        datetime.now().isoformat(),
-        datetime.now().isoformat(),
-        None,
-        None
-    ))
-    conn.commit()
-    cur.close()
-    conn.close()
-    
-    # Enviar email de notificación
-    html_email = generar_html_email(solicitud_id, datos_formulario)
-    
-    enviar_email_gmail(
-        destinatario=EMAIL_DESTINO,
-        asunto=f"🐾 Nueva Solicitud - {campos_db['nombre_apellido']}",
-        html_body=html_email
-    )
+    # Normalizar la respuesta una sola vez (la usan el INSERT y el email)
+    with etapa("webhook", "normalizar"):
+        solicitud = normalizar(datos_formulario)
+    
+    # Email de notificación para el equipo
+    with etapa("webhook", "generar_html"):
+        html_email = generar_html_email(solicitud_id, solicitud)
+    
+    # Guardar en PostgreSQL la solicitud y el email en la misma transacción
+    # ("transaccion" incluye la espera de conexión y el commit)
+    with etapa("webhook", "transaccion"):
+        async with db.conexion() as conn, conn.cursor() as cur:
+            with etapa("webhook", "insert"):
+                await cur.execute(
+                    SQL_INSERTAR_SOLICITUD,
+                    fila_solicitud(solicitud_id, solicitud, huella)
+                )
+                insertada = await cur.fetchone() is not None
+            if not insertada:
+                # Ya estaba cargada (por otra instancia o antes de un reinicio)
+                await cur.execute(SQL_ID_POR_HUELLA, (huella,))
+                id_original = (await cur.fetchone())['id']
+            else:
+                with etapa("webhook", "encolar_email"):
+                    await outbox.encolar(
+                        cur,
+                        destinatario=EMAIL_DESTINO,
+                        asunto=f"🐾 Nueva Solicitud - {solicitud.nombre}",
+                        html_body=html_email
+                    )
+    
+    if id_original:
+        recordar_huella(huella, id_original)
+        return respuesta_duplicada(id_original)
+    
+    recordar_huella(huella, solicitud_id)
+    listado.invalidar_cache()
+    
+    # El worker envía el email en segundo plano
+    outbox.despertar()
     
     return {
         "success": True,
@@ -330,314 +150,320 @@ async def handle_form_submission(request: Request):
     }
 
 
-def generar_email_respuesta(nombre: str, accion: str, nombre_peludo: str) -> str:
-    """Genera el email de respuesta para el solicitante"""
-    
-    if accion == "aceptar":
-        return f"""
-        <html>
-          <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-              <h2 style="color: #34a853;">🎉 ¡Buenas noticias, {nombre}!</h2>
-              <p>Nos complace informarte que tu solicitud de adopción para <strong>{nombre_peludo}</strong> ha sido <strong style="color: #34a853;">ACEPTADA</strong>.</p>
-              <p>Nos pondremos en contacto contigo en breve para coordinar los próximos pasos.</p>
-              <p>¡Gracias por darle una oportunidad a nuestros rescataditos! 🐾</p>
-              <hr style="margin: 30px 0; border: none; border-top: 1px solid #eee;">
-              <p style="color: #999; font-size: 12px;">Este es un mensaje automático del sistema de adopciones.</p>
-            </div>
-          </body>
-        </html>
-        """
-    else:  # rechazar
-        return f"""
-        <html>
-          <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-              <h2 style="color: #ea4335;">Sobre tu solicitud de adopción</h2>
-              <p>Hola {nombre},</p>
-              <p>Queríamos agradecerte mucho por tu interés en <strong>{nombre_peludo}</strong> y por tomarte el tiempo de completar el formulario.</p>
-              <p>Hemos recibido muchas solicitudes y, tras revisarlas cuidadosamente, hemos decidido avanzar con una familia cuyo entorno y rutina se ajustan un poco más a las necesidades específicas que tiene <strong>{nombre_peludo}</strong> en este momento.</p>
-              <p>Te animamos a seguir buscando, ya que hay muchos animales esperando una oportunidad.</p>
-              <p><strong>¡Gracias por querer adoptar! 🐾</strong></p>
-              <hr style="margin: 30px 0; border: none; border-top: 1px solid #eee;">
-              <p style="color: #999; font-size: 12px;">Este es un mensaje automático del sistema de adopciones.</p>
-            </div>
-          </body>
-        </html>
-        """
-
-
-def generar_email_resumen_pendientes(solicitudes: list) -> str:
-    """Genera email con resumen de solicitudes pendientes"""
+def respuesta_duplicada(solicitud_id: str) -> dict:
+    return {
+        "success": True,
+        "id": solicitud_id,
+        "duplicado": True,
+        "message": "La solicitud ya había sido procesada"
+    }
+
+
+@app.post("/webhook/form/batch", dependencies=[Depends(requerir_admin)])
+async def handle_form_batch(request: Request, notificar: str = "resumen", lote: int = LOTE_INGESTA):
+    """
+    Carga masiva de respuestas del formulario (backfill).
+    El body es NDJSON: una respuesta por línea, con el mismo formato que /webhook/form.
+    notificar: ninguno | resumen (un email por lote) | individual (un email por solicitud)
+    """
+    if notificar not in NOTIFICAR:
+        raise HTTPException(status_code=400, detail=f"notificar debe ser uno de {NOTIFICAR}")
+    if lote < 1:
+        raise HTTPException(status_code=400, detail="lote debe ser mayor a 0")
     
-    items_html = ""
-    for sol in solicitudes:
-        url_aceptar = f"{CLOUD_RUN_URL}/action?action=aceptar&id={sol['id']}"
-        url_rechazar = f"{CLOUD_RUN_URL}/action?action=rechazar&id={sol['id']}"
-        
-        items_html += f"""
-        <div class="solicitud-item">
-            <div class="solicitud-header">
-                <strong>{sol.get('nombre_apellido', 'Sin nombre')}</strong>
-                <span class="badge-pendiente">Pendiente</span>
-            </div>
-            <div class="solicitud-info">
-                <p><strong>👤 Datos Personales:</strong> {sol.get('edad', 'N/A')} años • {sol.get('ocupacion', 'N/A')} • {sol.get('zona', 'N/A')}</p>
-                <p><strong>📧 Contacto:</strong> {sol.get('email', 'N/A')} • {sol.get('celular', 'N/A')} • {sol.get('instagram', 'N/A')}</p>
-                <p><strong>🏠 Vivienda:</strong> {sol.get('tipo_vivienda', 'N/A')} ({sol.get('tenencia_vivienda', 'N/A')})</p>
-                <p><strong>🐾 Peludo:</strong> {sol.get('nombre_peludo', 'N/A')}</p>
-                <p><strong>ID:</strong> <code>{sol['id']}</code></p>
-            </div>
-            <div class="solicitud-actions">
-                <a href="{url_aceptar}" class="btn btn-aceptar">✅ Aceptar</a>
-                <a href="{url_rechazar}" class="btn btn-rechazar">❌ Rechazar</a>
-            </div>
-        </div>
-        """
+    try:
+        resultado = await ingerir_ndjson(request.stream(), notificar=notificar, lote=lote)
+    finally:
+        # Los lotes ya confirmados quedan aunque falle uno posterior
+        listado.invalidar_cache()
     
-    html = f"""
-    <html>
-      <head>
-        <style>
-          body {{ font-family: Arial, sans-serif; background: #f5f5f5; padding: 20px; }}
-          .container {{ max-width: 800px; margin: 0 auto; background: white; border-radius: 10px; padding: 30px; }}
-          h1 {{ color: #667eea; border-bottom: 3px solid #667eea; padding-bottom: 15px; }}
-          .solicitud-item {{ 
-            background: #f9f9f9; 
-            border-left: 4px solid #fbbc04; 
-            padding: 20px; 
-            margin: 20px 0; 
-            border-radius: 5px; 
-          }}
-          .solicitud-header {{ 
-            display: flex; 
-            justify-content: space-between; 
-            align-items: center; 
-            margin-bottom: 15px; 
-          }}
-          .badge-pendiente {{ 
-            background: #fbbc04; 
-            color: white; 
-            padding: 5px 12px; 
-            border-radius: 15px; 
-            font-size: 12px; 
-          }}
-          .solicitud-info {{ margin: 15px 0; color: #555; }}
-          .solicitud-info p {{ margin: 8px 0; }}
-          .solicitud-actions {{ margin-top: 15px; text-align: center; }}
-          .btn {{
-            display: inline-block;
-            padding: 12px 25px;
-            margin: 5px;
-            text-decoration: none;
-            border-radius: 6px;
-            font-weight: bold;
-            color: white;
-          }}
-          .btn-aceptar {{ background-color: #34a853; }}
-          .btn-rechazar {{ background-color: #ea4335; }}
-          code {{ background: #eee; padding: 2px 6px; border-radius: 3px; font-size: 12px; }}
-        </style>
-      </head>
-      <body>
-        <div class="container">
-          <h1>⏳ Solicitudes Pendientes ({len(solicitudes)})</h1>
-          <p>Tienes <strong>{len(solicitudes)}</strong> solicitud(es) sin responder:</p>
-          {items_html}
-        </div>
-      </body>
-    </html>
-    """
-    return html
+    return {"success": True, **resultado}
 
 
 @app.get("/action")
 async def handle_button_action(action: str, id: str):
     """Maneja los clics en los botones del email - SOLO registra fecha"""
     
-    estados_map = {
-        "aceptar": ("Aceptado", "ACEPTADA", "#34a853", "✅", "fecha_aceptado"),
-        "rechazar": ("Rechazado", "RECHAZADA", "#ea4335", "❌", "fecha_rechazado")
-    }
-    
-    if action not in estados_map:
+    if action not in ACCIONES:
         return HTMLResponse("<h2>❌ Acción no válida</h2>")
     
-    nuevo_estado, mensaje, color, emoji, campo_fecha = estados_map[action]
-    
-    # Actualizar en PostgreSQL
-    # Hora de Buenos Aires (UTC-3)
-    tz_bsas = timezone(timedelta(hours=-3))
-    now = datetime.now(tz_bsas)
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(f"""
-        UPDATE solicitudes_adopcion 
-        SET estado = %s, fecha_actualizacion = %s, {campo_fecha} = %s
-        WHERE id = %s
-    """, (nuevo_estado, now, now, id))
-    conn.commit()
-    cur.close()
-    conn.close()
+    nuevo_estado, mensaje, color, emoji, campo_fecha = ACCIONES[action]
+    
+    # Actualizar en PostgreSQL (partición caliente; el archivo solo si el email es viejo)
+    now = ahora_bsas()
+    with etapa("action", "transaccion"):
+        async with db.conexion() as conn, conn.cursor() as cur:
+            with etapa("action", "update"):
+                for tabla in TABLAS_DECIDIR:
+                    await cur.execute(
+                        SQL_DECIDIR.format(tabla=tabla, campo_fecha=campo_fecha),
+                        (nuevo_estado, now, now, id)
+                    )
+                    if cur.rowcount:
+                        break
+    listado.invalidar_cache()
         
-        # Página de confirmación
-    html = f"""
-        <html>
-          <head>
-            <style>
-              body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                min-height: 100vh;
-                margin: 0;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-              }}
-              .container {{
-                background: white;
-                padding: 60px;
-                border-radius: 20px;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                text-align: center;
-                max-width: 500px;
-              }}
-              .icon {{ font-size: 100px; margin-bottom: 20px; }}
-              h1 {{ color: {color}; margin: 20px 0; font-size: 32px; }}
-              .id {{
-                background: #f5f5f5;
-                padding: 20px;
-                border-radius: 10px;
-                font-family: 'Courier New', monospace;
-                margin: 25px 0;
-                font-size: 20px;
-              }}
-              .info {{ color: #999; font-size: 14px; margin-top: 20px; }}
-            </style>
-          </head>
-          <body>
-            <div class="container">
-              <div class="icon">{emoji}</div>
-              <h1>Solicitud {mensaje}</h1>
-              <p style="font-size: 18px;">La solicitud ha sido actualizada exitosamente</p>
-              <div class="id">ID: {id}</div>
-              <p>Estado: <strong style="color: {color}; font-size: 20px;">{nuevo_estado}</strong></p>
-              <p class="info">El email al solicitante se enviará automáticamente en el próximo proceso programado</p>
-              <p style="margin-top: 40px; color: #999;">✨ Puedes cerrar esta ventana</p>
-            </div>
-          </body>
-        </html>
-        """
+    # Página de confirmación
+    with etapa("action", "generar_html"):
+        html = PLANTILLA_ACCION.render({
+            "color": color,
+            "emoji": emoji,
+            "mensaje": mensaje,
+            "id": id,
+            "nuevo_estado": nuevo_estado
+        })
         
     return HTMLResponse(html)
 
 
+def firma_pendientes(vence: Optional[str], firma: Optional[str]) -> str:
+    """Los links de la vista de pendientes conservan la firma con la que se entró (no la renuevan)"""
+    if firma and vence:
+        return urlencode({"vence": vence, "firma": firma})
+    return parametros_firmados("pendientes")
+
+
+@app.post("/action/lote", dependencies=[Depends(requerir_admin_o_firma("pendientes"))])
+async def handle_bulk_action(request: Request, vence: Optional[str] = None, firma: Optional[str] = None):
+    """
+    Acepta o rechaza muchas solicitudes en un solo UPDATE (solo las que siguen pendientes).
+    Body JSON {"accion": "aceptar", "ids": [...]} -> resultado por ID en JSON;
+    formulario de /pendientes (accion=...&id=...&id=...) -> página de confirmación.
+    Pide el header de administración o el link firmado de /pendientes.
+    """
+    es_formulario = request.headers.get("content-type", "").startswith("application/x-www-form-urlencoded")
+    if es_formulario:
+        try:
+            campos = parse_qs((await request.body()).decode())
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="El formulario debe estar en UTF-8")
+        accion = (campos.get("accion") or [""])[0]
+        ids = campos.get("id", [])
+    else:
+        try:
+            cuerpo = await request.json()
+            accion, ids = cuerpo.get("accion"), cuerpo.get("ids")
+        except (ValueError, AttributeError):
+            raise HTTPException(status_code=400, detail='El body debe ser {"accion": ..., "ids": [...]}')
+    
+    if accion not in ACCIONES:
+        raise HTTPException(status_code=400, detail=f"accion debe ser uno de {tuple(ACCIONES)}")
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        raise HTTPException(status_code=400, detail="ids debe ser una lista de IDs")
+    if not ids and not es_formulario:
+        raise HTTPException(status_code=400, detail="ids no puede estar vacía")
+    if len(ids) > DECISION_LOTE_MAX:
+        raise HTTPException(status_code=400, detail=f"Como máximo {DECISION_LOTE_MAX} IDs por request")
+    
+    if ids:
+        with etapa("action_lote", "update"):
+            resultado = await decidir_lote(accion, ids)
+        listado.invalidar_cache()
+    else:
+        resultado = {"accion": accion, "estado": ACCIONES[accion][0], "actualizadas": 0, "resultados": {}}
+    
+    if not es_formulario:
+        return resultado
+    
+    _, mensaje, color, emoji, _ = ACCIONES[accion]
+    estados = list(resultado["resultados"].values())
+    return HTMLResponse(PLANTILLA_ACCION_LOTE.render({
+        "color": color,
+        "emoji": emoji,
+        "mensaje": mensaje,
+        "nuevo_estado": resultado["estado"],
+        "actualizadas": resultado["actualizadas"],
+        "ya_decididas": estados.count("ya_decidida"),
+        "no_encontradas": estados.count("no_encontrada"),
+        "firma": firma_pendientes(vence, firma)
+    }))
+
+
+@app.get("/pendientes", dependencies=[Depends(requerir_admin_o_firma("pendientes"))])
+async def ver_pendientes(vence: Optional[str] = None, firma: Optional[str] = None):
+    """
+    Vista para marcar varias pendientes y aceptarlas o rechazarlas juntas.
+    Se abre con el link firmado del resumen (o con el header de administración).
+    """
+    with etapa("pendientes", "consulta"):
+        solicitudes = await pendientes()
+    filas = "".join(
+        PLANTILLA_PENDIENTE.render({
+            "id": sol["id"],
+            "nombre_apellido": sol["nombre_apellido"] or "Sin nombre",
+            "edad": sol["edad"] or "-",
+            "zona": sol["zona"] or "-",
+            "tipo_vivienda": sol["tipo_vivienda"] or "-",
+            "nombre_peludo": sol["nombre_peludo"] or "-",
+            "fecha": sol["fecha_solicitud"].strftime("%d/%m/%Y") if sol["fecha_solicitud"] else "-"
+        })
+        for sol in solicitudes
+    )
+    return HTMLResponse(PLANTILLA_PENDIENTES.render({
+        "cantidad": len(solicitudes),
+        "filas": filas,
+        "firma": firma_pendientes(vence, firma)
+    }))
+
+
 @app.post("/cron/enviar-notificaciones")
 async def enviar_notificaciones():
     """
     Endpoint ejecutado periódicamente (por Cloud Scheduler):
-    1. Envía emails a solicitantes aceptados (>24h)
-    2. Envía emails a solicitantes rechazados (>2h)
-    3. Envía resumen de pendientes al equipo
+    1. Envía emails a solicitantes aceptados (>48h) y rechazados (>72h)
+    2. Envía al equipo el resumen de pendientes (completo o solo las novedades)
+    3. Reintenta los emails del outbox que quedaron vencidos
     """
-    from datetime import timedelta, timezone
-    
-    ahora = datetime.now(timezone.utc)
-    hace_48h = ahora - timedelta(hours=48)
-    hace_72h = ahora - timedelta(hours=72)
-    
-    enviados = {"aceptados": 0, "rechazados": 0, "pendientes": 0}
-    
-    conn = get_db_connection()
-    cur = conn.cursor()
-        
-    # 1. Buscar ACEPTADOS con >48h desde solicitud sin email enviado
-    cur.execute("""
-        SELECT * FROM solicitudes_adopcion 
-        WHERE estado = 'Aceptado' 
-        AND (email_respuesta_enviado IS NULL OR email_respuesta_enviado = FALSE)
-        AND fecha_solicitud <= %s
-    """, (hace_48h,))
-    aceptados = cur.fetchall()
-    
-    for solicitud in aceptados:
-        html = generar_email_respuesta(
-            solicitud.get('nombre_apellido', 'Solicitante'),
-            'aceptar',
-            solicitud.get('nombre_peludo', 'el peludo')
-        )
-        enviar_email_gmail(
-            solicitud['email'],
-            "✅ Solicitud Aceptada",
-            html
-        )
-        cur.execute("""
-            UPDATE solicitudes_adopcion 
-            SET email_respuesta_enviado = TRUE 
-            WHERE id = %s
-        """, (solicitud['id'],))
-        conn.commit()
-        enviados["aceptados"] += 1
-    
-    # 2. Buscar RECHAZADOS con >72h desde solicitud sin email enviado
-    cur.execute("""
-        SELECT * FROM solicitudes_adopcion 
-        WHERE estado = 'Rechazado' 
-        AND (email_respuesta_enviado IS NULL OR email_respuesta_enviado = FALSE)
-        AND fecha_solicitud <= %s
-    """, (hace_72h,))
-    rechazados = cur.fetchall()
-    
-    for solicitud in rechazados:
-        html = generar_email_respuesta(
-            solicitud.get('nombre_apellido', 'Solicitante'),
-            'rechazar',
-            solicitud.get('nombre_peludo', 'el peludo')
-        )
-        enviar_email_gmail(
-            solicitud['email'],
-            "Sobre tu solicitud de adopción",
-            html
-        )
-        cur.execute("""
-            UPDATE solicitudes_adopcion 
-            SET email_respuesta_enviado = TRUE 
-            WHERE id = %s
-        """, (solicitud['id'],))
-        conn.commit()
-        enviados["rechazados"] += 1
-    
-    # 3. Buscar PENDIENTES
-    cur.execute("""
-        SELECT * FROM solicitudes_adopcion 
-        WHERE estado = 'Pendiente' 
-        AND fecha_aceptado IS NULL 
-        AND fecha_rechazado IS NULL
-    """)
-    pendientes = cur.fetchall()
-    
-    if pendientes:
-        html_resumen = generar_email_resumen_pendientes(pendientes)
-        enviar_email_gmail(
-            EMAIL_DESTINO,
-            f"⏳ {len(pendientes)} Solicitud(es) Pendiente(s)",
-            html_resumen
-        )
-        enviados["pendientes"] = len(pendientes)
-    
-    cur.close()
-    conn.close()
+    resultado = await notificaciones.ejecutar()
+    # Cambió email_respuesta_enviado de las solicitudes respondidas
+    listado.invalidar_cache()
+    return resultado
+
+
+@app.get("/emails/fallidos", dependencies=[Depends(requerir_admin)])
+async def ver_emails_fallidos(limite: int = fallidos.FALLIDOS_LIMITE):
+    """Respuestas y emails del outbox que agotaron sus reintentos"""
+    return {"fallidos": await fallidos.listar(max(1, min(limite, fallidos.FALLIDOS_LIMITE)))}
+
+
+@app.post("/emails/fallidos/reintentar", dependencies=[Depends(requerir_admin)])
+async def reintentar_emails_fallidos(tipo: Optional[str] = None):
+    """Vuelve a encolar los fallidos (tipo: respuesta | outbox; sin tipo, todos)"""
+    if tipo and tipo not in fallidos.TIPOS:
+        raise HTTPException(status_code=400, detail=f"tipo debe ser uno de {fallidos.TIPOS}")
+    reencolados = await fallidos.reintentar(tipo)
+    # Los del outbox salen en el próximo drenado; las respuestas, en la próxima corrida del cron
+    outbox.despertar()
+    return {"success": True, "reencolados": reencolados}
+
+
+@app.get("/solicitudes", dependencies=[Depends(requerir_admin)])
+async def listar_solicitudes(
+    estado: Optional[str] = None,
+    nombre_peludo: Optional[str] = None,
+    zona: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: int = listado.LISTADO_LIMITE
+):
+    """
+    Listado paginado para el panel (más recientes primero).
+    Para la página siguiente, pasar en cursor el valor de "siguiente" de la respuesta.
+    """
+    if estado and estado not in ESTADOS.values():
+        raise HTTPException(status_code=400, detail=f"estado debe ser uno de {tuple(ESTADOS.values())}")
+    try:
+        pagina = await listado.listar(estado, nombre_peludo, zona, desde, hasta, cursor, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, **pagina}
+
+
+@app.get("/solicitudes/exportar", dependencies=[Depends(requerir_admin)])
+async def exportar_solicitudes(
+    formato: str = "csv",
+    columnas: Optional[str] = None,
+    estado: Optional[str] = None,
+    nombre_peludo: Optional[str] = None,
+    zona: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None
+):
+    """
+    Descarga las solicitudes (más viejas primero) como CSV o NDJSON, en streaming.
+    columnas: lista separada por comas (datos_completos agrega todas las respuestas del formulario)
+    """
+    if formato not in exportacion.FORMATOS:
+        raise HTTPException(status_code=400, detail=f"formato debe ser uno de {exportacion.FORMATOS}")
+    if estado and estado not in ESTADOS.values():
+        raise HTTPException(status_code=400, detail=f"estado debe ser uno de {tuple(ESTADOS.values())}")
+    try:
+        elegidas = exportacion.elegir_columnas(columnas)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    archivo = f"solicitudes-{datetime.now().strftime('%Y%m%d-%H%M')}.{formato}"
+    return StreamingResponse(
+        exportacion.exportar(formato, elegidas, estado, nombre_peludo, zona, desde, hasta),
+        media_type="text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{archivo}"'}
+    )
+
+
+@app.get("/solicitudes/buscar", dependencies=[Depends(requerir_admin)])
+async def buscar_solicitudes(q: str, estado: Optional[str] = None, limite: int = listado.LISTADO_LIMITE):
+    """
+    Búsqueda por nombre parcial, @instagram, teléfono, peludo o cualquier respuesta del
+    formulario; resultados ordenados por relevancia
+    """
+    if estado and estado not in ESTADOS.values():
+        raise HTTPException(status_code=400, detail=f"estado debe ser uno de {tuple(ESTADOS.values())}")
+    try:
+        resultado = await listado.buscar(q, estado, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, **resultado}
+
+
+@app.get("/imagenes/{file_id}")
+async def ver_imagen(file_id: str, ancho: int = imagenes.ANCHO_EMAIL, firma: Optional[str] = None,
+                     if_none_match: Optional[str] = Header(None)):
+    """
+    Foto de Drive achicada y cacheada en disco. La usan los emails, por eso no pide token
+    sino la firma del link (solo se sirven IDs que salieron en un email).
+    """
+    if not firma_imagen_valida(file_id, firma):
+        raise HTTPException(status_code=403, detail="Firma inválida")
+    try:
+        with etapa("imagenes", "obtener"):
+            contenido, tipo, etag = await imagenes.obtener(file_id, ancho)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except imagenes.ImagenNoEncontrada:
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    except imagenes.ImagenMuyGrande:
+        print(f"❌ La imagen {file_id} supera IMAGENES_MAX_MB")
+        raise HTTPException(status_code=502, detail="Imagen demasiado grande")
+    except Exception as e:
+        print(f"❌ Error obteniendo la imagen {file_id}: {str(e)}")
+        raise HTTPException(status_code=502, detail="No se pudo obtener la imagen")
     
-    return {
-        "success": True,
-        "enviados": enviados,
-        "timestamp": ahora.isoformat()
-    }
+    headers = {"ETag": etag, "Cache-Control": imagenes.CACHE_CONTROL}
+    if if_none_match and etag in if_none_match:
+        return Response(status_code=304, headers=headers)
+    return Response(content=contenido, media_type=tipo, headers=headers)
+
+
+@app.get("/estadisticas", dependencies=[Depends(requerir_admin)])
+async def ver_estadisticas():
+    """Solicitudes por peludo y por zona, tasa de aceptación y días hasta la decisión (pre-agregadas)"""
+    with etapa("estadisticas", "consulta"):
+        return await estadisticas.obtener()
+
+
+@app.get("/metrics", dependencies=[Depends(requerir_admin)])
+async def metrics():
+    """Métricas en formato Prometheus (latencias por etapa, emails, pool de conexiones)"""
+    metricas.actualizar_pool(db.get_pool().get_stats())
+    return Response(metricas.exportar(), media_type=metricas.CONTENT_TYPE_LATEST)
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness (para la startup probe de Cloud Run): 200 solo si la base responde"""
+    try:
+        await db.verificar(2)
+    except Exception as e:
+        # El detalle solo va al log: el endpoint es público
+        print(f"❌ /ready: la base no responde: {str(e)}")
+        return JSONResponse({"status": "no_listo"}, status_code=503)
+    return {"status": "listo"}
 
 
 @app.get("/")
 async def root():
-    """Health check"""
+    """Health check (liveness: no toca la base)"""
     return {"status": "ok", "service": "adopciones-api"}
 
 
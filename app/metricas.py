@@ -0,0 +1,111 @@
+"""
+Métricas de la API para Prometheus (endpoint /metrics)
+Histogramas de latencia por request y por etapa, contadores de emails y uso del pool.
+Cada request lleva un X-Request-ID (el que manda el cliente o uno nuevo) que se devuelve
+en la respuesta, se guarda con los emails del outbox y aparece en los logs de etapas lentas.
+"""
+
+import contextvars
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Etapas más lentas que esto se loguean con su request ID
+METRICAS_ETAPA_LENTA = float(os.getenv("METRICAS_ETAPA_LENTA", 1.0))  # segundos
+
+# Hasta minutos: el cron recorre todas las respuestas pendientes
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+request_id: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+DURACION_REQUEST = Histogram(
+    "adopciones_request_segundos", "Duración de los requests HTTP",
+    ["endpoint", "metodo", "codigo"], buckets=BUCKETS
+)
+DURACION_ETAPA = Histogram(
+    "adopciones_etapa_segundos", "Duración de cada etapa de un endpoint o proceso",
+    ["operacion", "etapa"], buckets=BUCKETS
+)
+ESPERA_POOL = Histogram(
+    "adopciones_pool_espera_segundos", "Tiempo esperando una conexión del pool", buckets=BUCKETS
+)
+EMAILS = Counter(
+    "adopciones_emails_total", "Emails enviados por SMTP", ["resultado"]
+)
+POOL = Gauge(
+    "adopciones_pool_conexiones", "Conexiones del pool de PostgreSQL", ["estado"]
+)
+
+
+def nuevo_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def etapa(operacion: str, nombre: str):
+    """Mide un bloque (sync o con awaits adentro) en adopciones_etapa_segundos"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        DURACION_ETAPA.labels(operacion, nombre).observe(duracion)
+        if duracion >= METRICAS_ETAPA_LENTA:
+            print(f"⏱️ [{request_id.get() or '-'}] {operacion}/{nombre} tardó {duracion:.3f}s")
+
+
+def actualizar_pool(stats: dict):
+    """Copia las estadísticas de psycopg_pool (get_stats) a los gauges"""
+    tamanio = stats.get("pool_size", 0)
+    disponibles = stats.get("pool_available", 0)
+    POOL.labels("abiertas").set(tamanio)
+    POOL.labels("disponibles").set(disponibles)
+    POOL.labels("en_uso").set(tamanio - disponibles)
+    POOL.labels("maximo").set(stats.get("pool_max", 0))
+    POOL.labels("requests_esperando").set(stats.get("requests_waiting", 0))
+
+
+def exportar() -> bytes:
+    """Texto en formato de exposición de Prometheus"""
+    return generate_latest()
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI: asigna el request ID (header X-Request-ID), lo devuelve en la
+    respuesta y registra la duración del request por endpoint
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recibido = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64]
+        rid = recibido or nuevo_request_id()
+        token = request_id.set(rid)
+        codigo = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            nonlocal codigo
+            if mensaje["type"] == "http.response.start":
+                codigo = mensaje["status"]
+                mensaje["headers"] = [*mensaje.get("headers", []), (b"x-request-id", rid.encode("latin-1"))]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # El nombre de la función del endpoint evita una serie por cada URL distinta
+            endpoint = getattr(scope.get("endpoint"), "__name__", "sin_ruta")
+            DURACION_REQUEST.labels(endpoint, scope["method"], str(codigo)).observe(
+                time.perf_counter() - inicio
+            )
+            request_id.reset(token)
@@ -0,0 +1,88 @@
+"""
+Migración de datos_completos al formato con claves codificadas
+
+Registra el diccionario de preguntas y convierte en lotes las filas que todavía tienen
+los títulos completos como claves. Se puede cortar y volver a correr: solo toma las filas
+sin "_v", y SKIP LOCKED permite correrla con el servicio andando.
+
+Uso:
+    python migrar_datos_completos.py --lote 1000
+"""
+
+import argparse
+import asyncio
+import time
+
+import db
+import diccionario
+
+# Reescribe un lote: cada clave que está en el diccionario pasa a su código
+SQL_MIGRAR_LOTE = """
+    UPDATE solicitudes_adopcion AS s
+    SET datos_completos = c.datos
+    FROM (
+        SELECT l.id,
+               jsonb_object_agg(coalesce(d.codigo, e.key), e.value)
+                   || jsonb_build_object('_v', %(version)s::int) AS datos
+        FROM (
+            SELECT id, datos_completos
+            FROM solicitudes_adopcion
+            WHERE datos_completos IS NOT NULL
+            AND datos_completos <> '{}'::jsonb
+            AND NOT datos_completos ? '_v'
+            LIMIT %(lote)s
+            FOR UPDATE SKIP LOCKED
+        ) AS l
+        CROSS JOIN LATERAL jsonb_each(l.datos_completos) AS e
+        LEFT JOIN preguntas_diccionario AS d
+            ON d.version = %(version)s AND d.pregunta = e.key
+        GROUP BY l.id
+    ) AS c
+    WHERE s.id = c.id
+"""
+
+SQL_TAMANIO = """
+    SELECT count(*) AS filas, coalesce(avg(pg_column_size(datos_completos)), 0) AS bytes_promedio
+    FROM solicitudes_adopcion
+"""
+
+
+async def tamanio() -> dict:
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute(SQL_TAMANIO)
+        return await cur.fetchone()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lote", type=int, default=1000, help="filas por transacción")
+    args = parser.parse_args()
+
+    await db.abrir_pool()
+    try:
+        await diccionario.sincronizar()
+        antes = await tamanio()
+
+        migradas = 0
+        inicio = time.perf_counter()
+        while True:
+            async with db.conexion() as conn, conn.cursor() as cur:
+                await cur.execute(SQL_MIGRAR_LOTE, {"version": diccionario.VERSION_ACTUAL, "lote": args.lote})
+                cantidad = cur.rowcount
+            if cantidad <= 0:
+                break
+            migradas += cantidad
+            print(f"✅ {migradas} filas migradas ({time.perf_counter() - inicio:.1f}s)")
+
+        despues = await tamanio()
+    finally:
+        await db.cerrar_pool()
+
+    print(f"Filas migradas: {migradas} de {antes['filas']}")
+    print(f"Tamaño promedio de datos_completos: {float(antes['bytes_promedio']):.0f} -> "
+          f"{float(despues['bytes_promedio']):.0f} bytes")
+    print("El espacio liberado se reutiliza después del VACUUM (autovacuum o VACUUM manual)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,306 @@
+"""
+Cron de notificaciones
+Envía las respuestas a los solicitantes y el resumen de pendientes al equipo.
+Solo corre una ejecución a la vez (advisory lock de Postgres atado a una transacción, que
+funciona también con el pooler de Supabase en modo transacción). Las respuestas se reclaman
+por lotes con una reserva (como el outbox): las filas no quedan bloqueadas mientras se envían.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List
+
+import archivo
+import db
+import outbox
+from outbox import calcular_backoff
+from emails import (
+    generar_email_respuesta, generar_email_resumen_pendientes, generar_email_novedades_pendientes
+)
+from mailer import EMAIL_DESTINO, SesionSMTP, enviar_lote
+from metricas import etapa
+
+# Workers que envían respuestas en paralelo. Todos comparten el límite de MAIL_TASA_POR_MINUTO,
+# así que más de uno solo ayuda si lo que limita es la latencia del servidor SMTP
+NOTIF_PARALELISMO = int(os.getenv("NOTIF_PARALELISMO", 1))
+# Filas que reclama cada worker por transacción
+NOTIF_LOTE = int(os.getenv("NOTIF_LOTE", 10))
+# Reintentos de una respuesta que falla: espera exponencial entre corridas y, al agotarlos,
+# la solicitud pasa a la cola de fallidos (respuesta_fallida, vista emails_fallidos)
+NOTIF_MAX_INTENTOS = int(os.getenv("NOTIF_MAX_INTENTOS", 5))
+NOTIF_BACKOFF_BASE = int(os.getenv("NOTIF_BACKOFF_BASE", 900))  # segundos
+NOTIF_BACKOFF_MAX = int(os.getenv("NOTIF_BACKOFF_MAX", 86400))  # segundos
+
+# Cada cuántas horas el resumen incluye todas las pendientes (0 = siempre completo);
+# en el resto de las corridas solo va lo nuevo desde el último resumen
+DIGEST_COMPLETO_HORAS = float(os.getenv("DIGEST_COMPLETO_HORAS", 24))
+# Las filas más nuevas que esto quedan para la corrida siguiente, así una transacción
+# que todavía no hizo commit no queda del lado ya informado de la marca de agua
+DIGEST_MARGEN = 60  # segundos
+
+# Clave del advisory lock que evita dos corridas simultáneas del cron
+LOCK_NOTIFICACIONES = 101_001
+
+# Tiempo que un lote de respuestas queda reservado mientras se envía (si la instancia
+# muere a mitad del envío, la corrida siguiente las vuelve a tomar después de esto)
+NOTIF_RESERVA = 300  # segundos
+
+# Reserva un lote de respuestas vencidas corriendo su próximo intento; SKIP LOCKED evita que
+# dos workers tomen las mismas y el commit inmediato libera las filas antes de enviar.
+# Las que fallaron esperan su próximo intento, así no se vuelven a tomar en la misma corrida.
+SQL_RECLAMAR_RESPUESTAS = """
+    UPDATE solicitudes_activas
+    SET respuesta_proximo_intento = NOW() + make_interval(secs => %s)
+    WHERE id IN (
+        SELECT id FROM solicitudes_activas
+        WHERE email_respuesta_enviado IS NOT TRUE
+        AND NOT respuesta_fallida
+        AND (
+            (estado = 'Aceptado' AND fecha_solicitud <= %s)
+            OR (estado = 'Rechazado' AND fecha_solicitud <= %s)
+        )
+        AND (respuesta_proximo_intento IS NULL OR respuesta_proximo_intento <= NOW())
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, estado, email, nombre_apellido, nombre_peludo, respuesta_intentos
+"""
+
+SQL_PENDIENTES = """
+    SELECT id, nombre_apellido, edad, ocupacion, zona, email, celular, instagram,
+           tipo_vivienda, tenencia_vivienda, nombre_peludo
+    FROM solicitudes_activas
+    WHERE estado = 'Pendiente'
+    AND fecha_aceptado IS NULL
+    AND fecha_rechazado IS NULL
+    AND fecha_creacion > %s AND fecha_creacion <= %s
+    ORDER BY fecha_solicitud
+"""
+
+SQL_CONTAR_PENDIENTES = """
+    SELECT count(*) AS cantidad
+    FROM solicitudes_activas
+    WHERE estado = 'Pendiente'
+    AND fecha_aceptado IS NULL
+    AND fecha_rechazado IS NULL
+"""
+
+SQL_CONTAR_RESUELTAS = """
+    SELECT count(*) AS cantidad
+    FROM solicitudes_activas
+    WHERE fecha_actualizacion > %s AND fecha_actualizacion <= %s
+    AND estado <> 'Pendiente'
+"""
+
+SQL_DIGEST_ESTADO = """
+    SELECT NOW() - make_interval(secs => %s) AS corte, d.ultimo_reporte, d.ultimo_completo
+    FROM (SELECT 1) AS uno
+    LEFT JOIN digest_estado AS d ON d.id = 1
+"""
+
+SQL_GUARDAR_DIGEST = """
+    INSERT INTO digest_estado (id, ultimo_reporte, ultimo_completo)
+    VALUES (1, %s, %s)
+    ON CONFLICT (id) DO UPDATE
+    SET ultimo_reporte = EXCLUDED.ultimo_reporte,
+        ultimo_completo = COALESCE(EXCLUDED.ultimo_completo, digest_estado.ultimo_completo)
+"""
+
+# Sin marca de agua previa (o en el resumen completo) se toman todas las pendientes
+DESDE_SIEMPRE = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# La reserva se limpia: una fila que se vuelve a abrir (p. ej. un cambio de decisión) no
+# tiene que esperar a que venza una reserva vieja
+SQL_MARCAR_RESPUESTAS_ENVIADAS = """
+    UPDATE solicitudes_activas
+    SET email_respuesta_enviado = TRUE, respuesta_proximo_intento = NULL
+    WHERE id = ANY(%s::text[])
+"""
+
+# Un solo UPDATE para todas las fallas del lote
+SQL_MARCAR_RESPUESTAS_FALLIDAS = """
+    UPDATE solicitudes_activas AS s
+    SET respuesta_intentos = s.respuesta_intentos + 1,
+        respuesta_ultimo_error = f.error,
+        respuesta_proximo_intento = NOW() + make_interval(secs => f.espera),
+        respuesta_fallida = f.descartada
+    FROM unnest(%s::text[], %s::text[], %s::int[], %s::boolean[]) AS f(id, error, espera, descartada)
+    WHERE s.id = f.id
+"""
+
+ASUNTOS_RESPUESTA = {
+    "Aceptado": ("aceptar", "✅ Solicitud Aceptada"),
+    "Rechazado": ("rechazar", "Sobre tu solicitud de adopción")
+}
+
+
+async def _worker_respuestas(limites: tuple, enviados: Dict[str, int], fallidos: List[Dict[str, Any]]):
+    """
+    Reserva lotes de respuestas vencidas y los envía con su propia sesión SMTP hasta agotarlas.
+    No tiene una conexión tomada mientras envía: reserva, envía y después marca.
+    """
+    sesion = SesionSMTP()
+    try:
+        while True:
+            with etapa("cron", "reclamar"):
+                async with db.conexion() as conn, conn.cursor() as cur:
+                    await cur.execute(SQL_RECLAMAR_RESPUESTAS, (NOTIF_RESERVA, *limites, NOTIF_LOTE))
+                    solicitudes = await cur.fetchall()
+            if not solicitudes:
+                return
+
+            mensajes = []
+            with etapa("cron", "generar_html"):
+                for sol in solicitudes:
+                    accion, asunto = ASUNTOS_RESPUESTA[sol['estado']]
+                    html = generar_email_respuesta(
+                        sol.get('nombre_apellido', 'Solicitante'),
+                        accion,
+                        sol.get('nombre_peludo', 'el peludo')
+                    )
+                    mensajes.append((sol['email'], asunto, html))
+
+            with etapa("cron", "envio_respuestas"):
+                resultados = await asyncio.to_thread(sesion.enviar_todos, mensajes)
+
+            ids_enviados = []
+            fallas = {"ids": [], "errores": [], "esperas": [], "descartadas": []}
+            for sol, resultado in zip(solicitudes, resultados):
+                if resultado["ok"]:
+                    ids_enviados.append(sol['id'])
+                    enviados["aceptados" if sol['estado'] == 'Aceptado' else "rechazados"] += 1
+                    continue
+                intentos = sol['respuesta_intentos'] + 1
+                descartada = intentos >= NOTIF_MAX_INTENTOS
+                if descartada:
+                    print(f"❌ Respuesta de {sol['id']} a la cola de fallidos tras {intentos} intentos: "
+                          f"{resultado['error']}")
+                fallidos.append({"id": sol['id'], "intentos": intentos, "descartada": descartada, **resultado})
+                fallas["ids"].append(sol['id'])
+                fallas["errores"].append(resultado["error"])
+                fallas["esperas"].append(
+                    calcular_backoff(sol['respuesta_intentos'], NOTIF_BACKOFF_BASE, NOTIF_BACKOFF_MAX)
+                )
+                fallas["descartadas"].append(descartada)
+
+            # Un UPDATE por lote para las enviadas y otro para las fallas
+            with etapa("cron", "marcar_enviadas"):
+                async with db.conexion() as conn, conn.cursor() as cur:
+                    if ids_enviados:
+                        await cur.execute(SQL_MARCAR_RESPUESTAS_ENVIADAS, (ids_enviados,))
+                    if fallas["ids"]:
+                        await cur.execute(SQL_MARCAR_RESPUESTAS_FALLIDAS, tuple(fallas.values()))
+    finally:
+        await asyncio.to_thread(sesion.cerrar)
+
+
+async def _resumen_pendientes(enviados: Dict[str, Any], fallidos: List[Dict[str, Any]]):
+    """
+    Envía al equipo el resumen completo de pendientes (cada DIGEST_COMPLETO_HORAS) o solo
+    las novedades desde la marca de agua. La marca avanza únicamente si el email salió.
+    """
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute(SQL_DIGEST_ESTADO, (DIGEST_MARGEN,))
+        estado = await cur.fetchone()
+        corte = estado['corte']
+        ultimo_reporte = estado['ultimo_reporte']
+        ultimo_completo = estado['ultimo_completo']
+
+        completo = (
+            ultimo_reporte is None
+            or ultimo_completo is None
+            or corte - ultimo_completo >= timedelta(hours=DIGEST_COMPLETO_HORAS)
+        )
+        with etapa("cron", "consultar_pendientes"):
+            await cur.execute(SQL_PENDIENTES, (DESDE_SIEMPRE if completo else ultimo_reporte, corte))
+            pendientes = await cur.fetchall()
+            if not completo:
+                await cur.execute(SQL_CONTAR_RESUELTAS, (ultimo_reporte, corte))
+                resueltas = (await cur.fetchone())['cantidad']
+
+    mensaje = None
+    if completo:
+        enviados["resumen"] = "completo"
+        if pendientes:
+            with etapa("cron", "generar_resumen"):
+                mensaje = (
+                    EMAIL_DESTINO,
+                    f"⏳ {len(pendientes)} Solicitud(es) Pendiente(s)",
+                    generar_email_resumen_pendientes(pendientes)
+                )
+    else:
+        enviados["resumen"] = "novedades"
+        if pendientes or resueltas:
+            async with db.conexion() as conn, conn.cursor() as cur:
+                await cur.execute(SQL_CONTAR_PENDIENTES)
+                total = (await cur.fetchone())['cantidad']
+            with etapa("cron", "generar_resumen"):
+                mensaje = (
+                    EMAIL_DESTINO,
+                    f"🆕 {len(pendientes)} Solicitud(es) Nueva(s) - {total} Pendiente(s)",
+                    generar_email_novedades_pendientes(pendientes, resueltas, total)
+                )
+
+    if mensaje:
+        with etapa("cron", "envio_resumen"):
+            resultado = (await asyncio.to_thread(enviar_lote, [mensaje]))[0]
+        if not resultado["ok"]:
+            # La marca no avanza: lo no informado entra en el próximo resumen
+            fallidos.append({"id": None, **resultado})
+            return
+        enviados["pendientes"] = len(pendientes)
+
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute(SQL_GUARDAR_DIGEST, (corte, corte if completo else None))
+
+
+async def ejecutar() -> Dict[str, Any]:
+    """Corre el proceso completo de notificaciones si no hay otra corrida activa"""
+    ahora = datetime.now(timezone.utc)
+    hace_48h = ahora - timedelta(hours=48)
+    hace_72h = ahora - timedelta(hours=72)
+
+    enviados = {"aceptados": 0, "rechazados": 0, "pendientes": 0}
+    fallidos = []
+
+    # El lock es de la transacción de lock_conn, que queda abierta toda la corrida: se libera
+    # al terminar (commit o rollback) aunque el pooler reparta las sesiones entre backends
+    async with db.conexion() as lock_conn:
+        cur = await lock_conn.execute("SELECT pg_try_advisory_xact_lock(%s) AS ok", (LOCK_NOTIFICACIONES,))
+        if not (await cur.fetchone())['ok']:
+            return {
+                "success": True,
+                "omitido": "Ya hay una corrida de notificaciones en curso",
+                "timestamp": ahora.isoformat()
+            }
+
+        # 1. Respuestas a ACEPTADOS (>48h) y RECHAZADOS (>72h); si un worker falla se cancelan
+        # los demás antes de soltar el lock
+        with etapa("cron", "respuestas"):
+            async with asyncio.TaskGroup() as grupo:
+                for _ in range(NOTIF_PARALELISMO):
+                    grupo.create_task(_worker_respuestas((hace_48h, hace_72h), enviados, fallidos))
+
+        # 2. Resumen de PENDIENTES (completo o solo novedades)
+        with etapa("cron", "resumen"):
+            await _resumen_pendientes(enviados, fallidos)
+
+        # 3. Outbox (por si el worker no llegó a enviarlos, p. ej. instancia apagada)
+        with etapa("cron", "outbox"):
+            enviados["outbox"] = await outbox.drenar()
+
+        # 4. Archivo de las solicitudes ya procesadas (la partición caliente no crece)
+        with etapa("cron", "archivo"):
+            try:
+                enviados["archivadas"] = await archivo.archivar()
+            except Exception as e:
+                # No afecta a los envíos; se reintenta en la próxima corrida
+                print(f"❌ Error archivando solicitudes: {str(e)}")
+
+    return {
+        "success": True,
+        "enviados": enviados,
+        "fallidos": fallidos,
+        "timestamp": ahora.isoformat()
+    }
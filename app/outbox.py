@@ -0,0 +1,144 @@
+"""
+Outbox transaccional de emails
+Los emails se guardan en la tabla email_outbox dentro de la misma transacción que
+los genera, y un worker en segundo plano los envía con reintentos y backoff exponencial.
+"""
+
+import asyncio
+import os
+from typing import Dict
+
+import db
+from mailer import enviar_lote
+from metricas import etapa, request_id
+
+# Configuración del worker
+OUTBOX_LOTE = int(os.getenv("OUTBOX_LOTE", 20))
+OUTBOX_MAX_INTENTOS = int(os.getenv("OUTBOX_MAX_INTENTOS", 6))
+OUTBOX_BACKOFF_BASE = int(os.getenv("OUTBOX_BACKOFF_BASE", 30))  # segundos
+OUTBOX_BACKOFF_MAX = int(os.getenv("OUTBOX_BACKOFF_MAX", 3600))  # segundos
+OUTBOX_POLL = int(os.getenv("OUTBOX_POLL", 30))  # segundos entre revisiones sin aviso
+
+# Tiempo que un email queda reservado por un worker mientras se envía
+OUTBOX_RESERVA = 300  # segundos
+
+SQL_ENCOLAR = """
+    INSERT INTO email_outbox (destinatario, asunto, html, request_id)
+    VALUES (%s, %s, %s, %s)
+"""
+
+# Reserva un lote de emails vencidos; SKIP LOCKED evita que dos workers tomen el mismo
+SQL_RESERVAR = """
+    UPDATE email_outbox
+    SET proximo_intento = NOW() + make_interval(secs => %s)
+    WHERE id IN (
+        SELECT id FROM email_outbox
+        WHERE estado = 'pendiente' AND proximo_intento <= NOW()
+        ORDER BY proximo_intento
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, destinatario, asunto, html, intentos, request_id
+"""
+
+SQL_MARCAR_ENVIADO = """
+    UPDATE email_outbox
+    SET estado = 'enviado', intentos = intentos + 1, enviado_en = NOW(), ultimo_error = NULL
+    WHERE id = %s
+"""
+
+SQL_MARCAR_ERROR = """
+    UPDATE email_outbox
+    SET estado = %s, intentos = intentos + 1, ultimo_error = %s,
+        proximo_intento = NOW() + make_interval(secs => %s)
+    WHERE id = %s
+"""
+
+_aviso = asyncio.Event()
+_tarea = None
+
+
+async def encolar(cur, destinatario: str, asunto: str, html_body: str):
+    """
+    Agrega un email al outbox usando el cursor (y la transacción) de quien llama.
+    Guarda el request ID para poder seguir el email hasta el request que lo generó.
+    """
+    await cur.execute(SQL_ENCOLAR, (destinatario, asunto, html_body, request_id.get()))
+
+
+def despertar():
+    """Avisa al worker que hay emails nuevos (llamar después del commit)"""
+    _aviso.set()
+
+
+def calcular_backoff(intentos: int, base: int = OUTBOX_BACKOFF_BASE, maximo: int = OUTBOX_BACKOFF_MAX) -> int:
+    """Segundos de espera antes del próximo intento (exponencial con tope)"""
+    return min(base * 2 ** intentos, maximo)
+
+
+async def drenar(lote: int = OUTBOX_LOTE) -> Dict[str, int]:
+    """Envía los emails vencidos del outbox hasta vaciarlo"""
+    resultado = {"enviados": 0, "fallidos": 0}
+
+    while True:
+        with etapa("outbox", "reservar"):
+            async with db.conexion() as conn, conn.cursor() as cur:
+                await cur.execute(SQL_RESERVAR, (OUTBOX_RESERVA, lote))
+                emails = await cur.fetchall()
+
+        if not emails:
+            return resultado
+
+        with etapa("outbox", "envio"):
+            resultados = await asyncio.to_thread(
+                enviar_lote,
+                [(email['destinatario'], email['asunto'], email['html']) for email in emails]
+            )
+
+        async with db.conexion() as conn, conn.cursor() as cur:
+            for email, envio in zip(emails, resultados):
+                if envio["ok"]:
+                    await cur.execute(SQL_MARCAR_ENVIADO, (email['id'],))
+                    resultado["enviados"] += 1
+                    continue
+                intentos = email['intentos'] + 1
+                estado = 'fallido' if intentos >= OUTBOX_MAX_INTENTOS else 'pendiente'
+                print(f"❌ [{email['request_id'] or '-'}] Email {email['id']} del outbox: "
+                      f"intento {intentos} fallido ({estado})")
+                await cur.execute(SQL_MARCAR_ERROR, (
+                    estado, envio["error"], calcular_backoff(email['intentos']), email['id']
+                ))
+                resultado["fallidos"] += 1
+
+
+async def _worker():
+    """Loop del worker: drena el outbox cuando lo avisan o cada OUTBOX_POLL segundos"""
+    while True:
+        _aviso.clear()
+        try:
+            await drenar()
+        except Exception as e:
+            print(f"❌ Error en el worker del outbox: {str(e)}")
+        try:
+            await asyncio.wait_for(_aviso.wait(), timeout=OUTBOX_POLL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def iniciar_worker():
+    """Arranca el worker en segundo plano (se llama al iniciar la aplicación)"""
+    global _tarea
+    if _tarea is None:
+        _tarea = asyncio.create_task(_worker())
+
+
+async def detener_worker():
+    """Cancela el worker (se llama al apagar la aplicación)"""
+    global _tarea
+    if _tarea is not None:
+        _tarea.cancel()
+        try:
+            await _tarea
+        except asyncio.CancelledError:
+            pass
+        _tarea = None
@@ -0,0 +1,102 @@
+"""
+Motor de plantillas HTML para los emails y páginas
+Cada plantilla de app/plantillas/ se lee y compila una sola vez: el texto queda partido
+en fragmentos estáticos y campos, y renderizar es un solo "".join (o un generador).
+
+Sintaxis:
+    {{ campo }}       valor escapado para HTML
+    {{ campo|html }}  valor insertado tal cual (fragmentos ya renderizados)
+"""
+
+import html
+import os
+import re
+from typing import Dict, Any, Iterator
+
+DIRECTORIO = os.path.join(os.path.dirname(__file__), "plantillas")
+
+_CAMPO = re.compile(r"\{\{\s*(\w+)(\|html)?\s*\}\}")
+
+
+def _escapar(valor: Any) -> str:
+    """html.escape con atajo para los valores que no tienen caracteres especiales"""
+    texto = valor if type(valor) is str else str(valor)
+    if "&" in texto or "<" in texto or ">" in texto or '"' in texto or "'" in texto:
+        return html.escape(texto)
+    return texto
+
+
+class Plantilla:
+    """Plantilla compilada: fragmentos estáticos intercalados con campos"""
+
+    __slots__ = ("_estaticos", "_campos", "_pasos")
+
+    def __init__(self, texto: str = None):
+        self._estaticos = []
+        self._campos = []
+        if texto is None:
+            return
+        inicio = 0
+        for match in _CAMPO.finditer(texto):
+            self._estaticos.append(texto[inicio:match.start()])
+            self._campos.append((match.group(1), bool(match.group(2))))
+            inicio = match.end()
+        self._estaticos.append(texto[inicio:])
+        self._compilar()
+
+    def _compilar(self):
+        """Prepara los pasos del render: (campo, conversión, fragmento estático que le sigue)"""
+        self._pasos = [
+            (campo, str if crudo else _escapar, estatico)
+            for (campo, crudo), estatico in zip(self._campos, self._estaticos[1:])
+        ]
+
+    def fijar(self, **valores) -> "Plantilla":
+        """
+        Devuelve una plantilla con esos campos ya resueltos dentro de los fragmentos
+        estáticos (para valores constantes como CLOUD_RUN_URL)
+        """
+        fija = Plantilla()
+        fija._estaticos = [self._estaticos[0]]
+        for (campo, crudo), estatico in zip(self._campos, self._estaticos[1:]):
+            if campo in valores:
+                valor = valores[campo]
+                fija._estaticos[-1] += (str(valor) if crudo else _escapar(valor)) + estatico
+            else:
+                fija._campos.append((campo, crudo))
+                fija._estaticos.append(estatico)
+        fija._compilar()
+        return fija
+
+    def render_stream(self, contexto: Dict[str, Any]) -> Iterator[str]:
+        """Genera el HTML de a fragmentos, sin armar el string completo"""
+        yield self._estaticos[0]
+        for campo, convertir, estatico in self._pasos:
+            yield convertir(contexto[campo])
+            yield estatico
+
+    def render(self, contexto: Dict[str, Any]) -> str:
+        partes = [self._estaticos[0]]
+        for campo, convertir, estatico in self._pasos:
+            partes.append(convertir(contexto[campo]))
+            partes.append(estatico)
+        return "".join(partes)
+
+
+_cache: Dict[str, Plantilla] = {}
+
+
+def cargar(directorio: str = DIRECTORIO) -> Dict[str, Plantilla]:
+    """Lee y compila todas las plantillas del directorio (una sola vez por proceso)"""
+    for archivo in sorted(os.listdir(directorio)):
+        if archivo.endswith(".html"):
+            with open(os.path.join(directorio, archivo), encoding="utf-8") as f:
+                _cache[archivo[:-len(".html")]] = Plantilla(f.read())
+    return _cache
+
+
+def obtener(nombre: str) -> Plantilla:
+    """Devuelve la plantilla compilada"""
+    if not _cache:
+        cargar()
+    return _cache[nombre]
@@ -0,0 +1,70 @@
+"""
+Protección de los endpoints administrativos
+Se exige ADMIN_TOKEN en el header X-Admin-Token (nunca en la URL: quedaría en los logs
+de acceso y en el historial del navegador). Sin ADMIN_TOKEN configurado quedan cerrados.
+Las páginas que se abren desde los emails (vista de pendientes) usan links firmados: la
+firma (HMAC con ADMIN_TOKEN) vale solo para esa vista y vence a los FIRMA_DIAS.
+Las fotos del proxy (/imagenes) también van firmadas, pero sin vencimiento: los emails
+se releen meses después.
+"""
+
+import hashlib
+import hmac
+import os
+import time
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+FIRMA_DIAS = int(os.getenv("FIRMA_DIAS", 7))
+
+
+def requerir_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependencia de FastAPI que valida el token de administración"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="ADMIN_TOKEN no está configurado")
+    if not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token de administración inválido")
+
+
+def firmar(alcance: str, vence: int) -> str:
+    return hmac.new(ADMIN_TOKEN.encode(), f"{alcance}:{vence}".encode(), hashlib.sha256).hexdigest()
+
+
+def parametros_firmados(alcance: str) -> str:
+    """Query string "vence=...&firma=..." para un link de email (vacío sin ADMIN_TOKEN)"""
+    if not ADMIN_TOKEN:
+        return ""
+    vence = int(time.time()) + FIRMA_DIAS * 86400
+    return f"vence={vence}&firma={firmar(alcance, vence)}"
+
+
+def firma_valida(alcance: str, vence: Optional[str], firma: Optional[str]) -> bool:
+    """True si la firma corresponde al alcance y todavía no venció"""
+    if not ADMIN_TOKEN or not vence or not firma or not (vence.isascii() and vence.isdigit()):
+        return False
+    if int(vence) < time.time():
+        return False
+    return hmac.compare_digest(firma.encode(), firmar(alcance, int(vence)).encode())
+
+
+def firma_imagen(file_id: str) -> Optional[str]:
+    """Firma de /imagenes/{file_id} (None sin ADMIN_TOKEN: el proxy queda cerrado)"""
+    if not ADMIN_TOKEN:
+        return None
+    return firmar(f"imagen:{file_id}", 0)[:32]
+
+
+def firma_imagen_valida(file_id: str, firma: Optional[str]) -> bool:
+    esperada = firma_imagen(file_id)
+    return bool(esperada and firma) and hmac.compare_digest(firma.encode(), esperada.encode())
+
+
+def requerir_admin_o_firma(alcance: str):
+    """Dependencia que acepta el header de administración o un link firmado para ese alcance"""
+    def validar(x_admin_token: Optional[str] = Header(None), vence: Optional[str] = None,
+                firma: Optional[str] = None):
+        if not firma_valida(alcance, vence, firma):
+            requerir_admin(x_admin_token)
+    return validar
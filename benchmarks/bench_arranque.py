@@ -0,0 +1,109 @@
+"""
+Benchmark de arranque en frío
+
+Mide, en procesos nuevos (como una instancia de Cloud Run que escala desde cero):
+- import: tiempo de `import main` (con y sin bytecode precompilado)
+- listen: desde que se lanza uvicorn hasta que acepta conexiones (incluye el lifespan)
+- primer request: latencia del primer GET / y GET /ready
+
+Sin variables DB_* la base no responde: el servicio escucha igual (el calentamiento de la
+base corre en segundo plano) y /ready da 503.
+
+Uso:
+    DB_HOST=... DB_PORT=... DB_NAME=... DB_USER=... DB_PASSWORD=... \\
+        python benchmarks/bench_arranque.py --repeticiones 5
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+DIRECTORIO_APP = os.path.join(os.path.dirname(__file__), "..", "app")
+
+MEDIR_IMPORT = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def medir_import(precompilado: bool) -> float:
+    env = dict(os.environ)
+    if not precompilado:
+        # Cache de bytecode vacío: cada corrida compila todos los módulos
+        env["PYTHONPYCACHEPREFIX"] = tempfile.mkdtemp()
+    salida = subprocess.run(
+        [sys.executable, "-c", MEDIR_IMPORT], cwd=DIRECTORIO_APP, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def get(url: str) -> tuple:
+    """(status, segundos) de un GET"""
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=30) as respuesta:
+            status = respuesta.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - inicio
+
+
+def medir_servidor() -> dict:
+    puerto = puerto_libre()
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto), "--log-level", "warning"],
+        cwd=DIRECTORIO_APP, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", puerto), timeout=0.05).close()
+                break
+            except OSError:
+                if proceso.poll() is not None:
+                    raise RuntimeError("uvicorn terminó antes de escuchar")
+                time.sleep(0.005)
+        listen = time.perf_counter() - inicio
+        _, primero = get(f"http://127.0.0.1:{puerto}/")
+        status_ready, ready = get(f"http://127.0.0.1:{puerto}/ready")
+        return {"listen": listen, "primer_request": primero, "ready": ready, "status_ready": status_ready}
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    sin_pyc = [medir_import(False) for _ in range(args.repeticiones)]
+    con_pyc = [medir_import(True) for _ in range(args.repeticiones)]
+    servidor = [medir_servidor() for _ in range(args.repeticiones)]
+
+    def fila(nombre, valores):
+        print(f"{nombre:<28} mediana {statistics.median(valores) * 1000:8.1f} ms   "
+              f"máx {max(valores) * 1000:8.1f} ms")
+
+    fila("import main (sin .pyc)", sin_pyc)
+    fila("import main (con .pyc)", con_pyc)
+    fila("uvicorn escuchando", [s["listen"] for s in servidor])
+    fila("primer GET /", [s["primer_request"] for s in servidor])
+    fila("primer GET /ready", [s["ready"] for s in servidor])
+    print(f"status de /ready: {sorted({s['status_ready'] for s in servidor})}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Prueba de carga local de la API: webhook, clics de /action y cron de notificaciones
+
+Todo corre en la máquina:
+- Postgres descartable (--docker levanta un contenedor postgres:16; sin --docker usa
+  las variables DB_* y exige --limpiar porque vacía las tablas) cargado con create_table.sql
+- sumidero SMTP local en lugar de Gmail (benchmarks/sumidero_smtp.py)
+- la API levantada con uvicorn en un subproceso
+- generador de carga con httpx
+
+Escenarios:
+- webhook: POST /webhook/form con respuestas del formulario sintéticas (todas distintas)
+- action:  ráfaga de GET /action sobre las solicitudes creadas por el webhook
+- cron:    POST /cron/enviar-notificaciones sobre una tabla sembrada con --filas filas,
+           de las cuales --por-enviar tienen una respuesta pendiente de envío
+
+Reporta throughput y latencias p50/p95/p99. Con --json guarda los resultados y con
+--comparar marca las latencias p95 que empeoraron más de --umbral respecto de otra corrida.
+
+Uso:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_carga.py --docker --webhooks 2000 --clics 2000 --filas 100000
+    python benchmarks/bench_carga.py --docker --filas 1000000 --json base.json
+    python benchmarks/bench_carga.py --docker --filas 1000000 --comparar base.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List, Callable, Awaitable
+
+import httpx
+import psycopg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import emails  # noqa: E402
+from sumidero_smtp import SumideroSMTP  # noqa: E402
+
+DIRECTORIO_APP = os.path.join(os.path.dirname(__file__), "..", "app")
+CREATE_TABLE = os.path.join(DIRECTORIO_APP, "create_table.sql")
+
+CONTENEDOR = "rescataditos-bench-pg"
+IMAGEN_POSTGRES = "postgres:16-alpine"
+
+# Siembra de la tabla para el cron: las primeras `por_enviar` filas tienen la respuesta
+# pendiente (vencida), `pendientes` filas están sin decidir y el resto ya fue notificado
+SQL_SEMBRAR = """
+    INSERT INTO solicitudes_adopcion (
+        id, fecha_solicitud, estado, nombre_apellido, edad, ocupacion, email, instagram,
+        celular, zona, tipo_vivienda, tenencia_vivienda, nombre_peludo,
+        email_respuesta_enviado, datos_completos
+    )
+    SELECT
+        'BEN-' || lpad(to_hex(g), 8, '0'),
+        NOW() - make_interval(hours => 100 + g %% 2000),
+        CASE
+            WHEN g <= %(por_enviar)s THEN (ARRAY['Aceptado', 'Rechazado'])[1 + g %% 2]
+            WHEN g <= %(por_enviar)s + %(pendientes)s THEN 'Pendiente'
+            ELSE (ARRAY['Aceptado', 'Rechazado'])[1 + g %% 2]
+        END,
+        'Solicitante ' || g, '30', 'Docente', 'solicitante' || g || '@example.com', '@solicitante',
+        '11 5555-5555', 'PALERMO', 'Departamento', 'Alquilada', 'Firulais',
+        g > %(por_enviar)s + %(pendientes)s,
+        '{}'::jsonb
+    FROM generate_series(1, %(filas)s) AS g
+"""
+
+# También se limpia la reserva y los intentos de la corrida anterior: si no, las
+# repeticiones siguientes no encuentran nada para enviar
+SQL_REARMAR_RESPUESTAS = """
+    UPDATE solicitudes_adopcion
+    SET email_respuesta_enviado = FALSE, respuesta_proximo_intento = NULL, respuesta_intentos = 0
+    WHERE id LIKE 'BEN-%%' AND id <= 'BEN-' || lpad(to_hex(%s::int), 8, '0')
+    AND estado IN ('Aceptado', 'Rechazado')
+"""
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def resumir(nombre: str, latencias: List[float], errores: int, duracion: float) -> Dict[str, Any]:
+    return {
+        "escenario": nombre,
+        "requests": len(latencias) + errores,
+        "errores": errores,
+        "rps": len(latencias) / duracion if duracion else 0.0,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000
+    }
+
+
+# --- Postgres ---
+
+def levantar_postgres_docker() -> Dict[str, str]:
+    puerto = puerto_libre()
+    subprocess.run(["docker", "rm", "-f", CONTENEDOR], capture_output=True)
+    subprocess.run([
+        "docker", "run", "-d", "--rm", "--name", CONTENEDOR,
+        "-e", "POSTGRES_PASSWORD=bench", "-p", f"127.0.0.1:{puerto}:5432", IMAGEN_POSTGRES
+    ], check=True, capture_output=True)
+    env = {"DB_HOST": "127.0.0.1", "DB_PORT": str(puerto), "DB_NAME": "postgres",
+           "DB_USER": "postgres", "DB_PASSWORD": "bench"}
+    for _ in range(60):
+        try:
+            psycopg.connect(conninfo(env), connect_timeout=2).close()
+            return env
+        except psycopg.OperationalError:
+            time.sleep(1)
+    raise RuntimeError("Postgres no arrancó a tiempo")
+
+
+def bajar_postgres_docker():
+    subprocess.run(["docker", "rm", "-f", CONTENEDOR], capture_output=True)
+
+
+def conninfo(env: Dict[str, str]) -> str:
+    return (f"host={env['DB_HOST']} port={env.get('DB_PORT', '5432')} dbname={env['DB_NAME']} "
+            f"user={env['DB_USER']} password={env.get('DB_PASSWORD', '')}")
+
+
+def preparar_base(env: Dict[str, str]):
+    """Crea el esquema y vacía las tablas"""
+    with psycopg.connect(conninfo(env), autocommit=True) as conn:
+        with open(CREATE_TABLE, encoding="utf-8") as f:
+            conn.execute(f.read())
+        conn.execute("TRUNCATE solicitudes_adopcion, email_outbox, estadisticas_adopcion")
+
+
+def sembrar(env: Dict[str, str], filas: int, por_enviar: int, pendientes: int):
+    inicio = time.perf_counter()
+    with psycopg.connect(conninfo(env), autocommit=True) as conn:
+        conn.execute(SQL_SEMBRAR, {"filas": filas, "por_enviar": por_enviar, "pendientes": pendientes})
+        conn.execute("VACUUM ANALYZE solicitudes_adopcion")
+    print(f"✅ {filas} filas sembradas en {time.perf_counter() - inicio:.1f}s")
+
+
+def rearmar_respuestas(env: Dict[str, str], por_enviar: int):
+    with psycopg.connect(conninfo(env), autocommit=True) as conn:
+        conn.execute(SQL_REARMAR_RESPUESTAS, (por_enviar,))
+
+
+# --- API ---
+
+def levantar_api(env_db: Dict[str, str], sumidero: SumideroSMTP, puerto: int) -> subprocess.Popen:
+    env = {
+        **os.environ, **env_db,
+        "SMTP_HOST": sumidero.host, "SMTP_PORT": str(sumidero.puerto), "SMTP_SSL": "0",
+        "GMAIL_USER": "bench@example.com", "GMAIL_APP_PASSWORD": "",
+        "EMAIL_DESTINO": "equipo@example.com",
+        # Sin límite de envío: se mide la app, no el token bucket
+        "MAIL_TASA_POR_MINUTO": "1000000000", "MAIL_RAFAGA": "1000000"
+    }
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto), "--log-level", "warning"],
+        cwd=DIRECTORIO_APP, env=env
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{puerto}/", timeout=1)
+            return proceso
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proceso.terminate()
+    raise RuntimeError("La API no arrancó a tiempo")
+
+
+# --- Generador de carga ---
+
+def payload_formulario(i: int) -> Dict[str, Any]:
+    """Respuesta completa del formulario como la manda Apps Script (todas distintas entre sí)"""
+    datos = {pregunta: f"Respuesta {i} a {campo}" for campo, pregunta in emails.PREGUNTAS_EMAIL.items()}
+    datos.update({
+        "Timestamp": f"2024-01-01T00:00:00.{i % 1_000_000:06d}-03:00",
+        "Nombre y Apellido": f"Solicitante {i}",
+        "Email": f"solicitante{i}@example.com",
+        "¿Vivís en CABA? ¿En qué zona estas?": "Palermo",
+        emails.PREGUNTA_FOTOS: ["https://drive.google.com/open?id=1AbCdEfGhIjKlMnOpQrStUvWxYz012345"]
+    })
+    return datos
+
+
+async def rafaga(total: int, concurrencia: int,
+                 hacer: Callable[[int], Awaitable[httpx.Response]]) -> Dict[str, Any]:
+    """Ejecuta `total` requests con `concurrencia` clientes; devuelve latencias, errores y duración"""
+    latencias: List[float] = []
+    errores = 0
+    siguiente = iter(range(total))
+
+    async def cliente():
+        nonlocal errores
+        for i in siguiente:
+            inicio = time.perf_counter()
+            try:
+                respuesta = await hacer(i)
+                ok = respuesta.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencias.append(time.perf_counter() - inicio)
+            else:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+    return {"latencias": latencias, "errores": errores, "duracion": time.perf_counter() - inicio}
+
+
+async def escenario_webhook(http: httpx.AsyncClient, total: int, concurrencia: int, ids: List[str]):
+    async def hacer(i):
+        respuesta = await http.post("/webhook/form", json=payload_formulario(i))
+        if respuesta.status_code == 200:
+            ids.append(respuesta.json()["id"])
+        return respuesta
+
+    r = await rafaga(total, concurrencia, hacer)
+    return resumir("webhook", r["latencias"], r["errores"], r["duracion"])
+
+
+async def escenario_action(http: httpx.AsyncClient, total: int, concurrencia: int, ids: List[str]):
+    azar = random.Random(101)
+
+    async def hacer(i):
+        return await http.get("/action", params={
+            "action": azar.choice(("aceptar", "rechazar")), "id": azar.choice(ids)
+        })
+
+    r = await rafaga(total, concurrencia, hacer)
+    return resumir("action", r["latencias"], r["errores"], r["duracion"])
+
+
+async def escenario_cron(http: httpx.AsyncClient, env_db: Dict[str, str], repeticiones: int,
+                         por_enviar: int, filas: int):
+    """
+    Corridas secuenciales del cron (tiene advisory lock: en paralelo se omitirían).
+    Una corrida que no envía al menos las por_enviar respuestas rearmadas cuenta como error,
+    no como latencia.
+    """
+    latencias = []
+    errores = 0
+    inicio_total = time.perf_counter()
+    for _ in range(repeticiones):
+        rearmar_respuestas(env_db, por_enviar)
+        inicio = time.perf_counter()
+        respuesta = await http.post("/cron/enviar-notificaciones", timeout=None)
+        tiempo = time.perf_counter() - inicio
+        cuerpo = respuesta.json() if respuesta.status_code == 200 else {}
+        enviados = cuerpo.get("enviados", {})
+        if cuerpo.get("success") and enviados.get("aceptados", 0) + enviados.get("rechazados", 0) >= por_enviar:
+            latencias.append(tiempo)
+        else:
+            errores += 1
+    duracion = time.perf_counter() - inicio_total
+    return resumir(f"cron ({filas} filas)", latencias, errores, duracion)
+
+
+def imprimir(resultados: List[Dict[str, Any]], base: Dict[str, Dict[str, Any]], umbral: float):
+    print(f"\n{'escenario':<24}{'requests':>10}{'errores':>9}{'req/s':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    regresiones = 0
+    for r in resultados:
+        linea = (f"{r['escenario']:<24}{r['requests']:>10}{r['errores']:>9}{r['rps']:>10.1f}"
+                 f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+        anterior = base.get(r["escenario"])
+        if anterior and anterior["p95_ms"]:
+            cambio = r["p95_ms"] / anterior["p95_ms"] - 1
+            linea += f"   p95 {cambio:+.0%}"
+            if cambio > umbral:
+                linea += " ❌ regresión"
+                regresiones += 1
+        print(linea)
+    return regresiones
+
+
+async def correr(args, env_db: Dict[str, str]) -> List[Dict[str, Any]]:
+    preparar_base(env_db)
+    sumidero = SumideroSMTP(latencia=args.latencia_smtp).iniciar_en_hilo()
+    puerto = puerto_libre()
+    api = levantar_api(env_db, sumidero, puerto)
+    resultados = []
+    try:
+        limites = httpx.Limits(max_connections=args.concurrencia)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{puerto}", limits=limites,
+                                     timeout=60) as http:
+            ids: List[str] = []
+            if args.webhooks:
+                resultados.append(await escenario_webhook(http, args.webhooks, args.concurrencia, ids))
+            if args.clics and ids:
+                resultados.append(await escenario_action(http, args.clics, args.concurrencia, ids))
+            if args.filas:
+                sembrar(env_db, args.filas, args.por_enviar, args.pendientes)
+                resultados.append(await escenario_cron(
+                    http, env_db, args.repeticiones_cron, args.por_enviar, args.filas
+                ))
+    finally:
+        api.terminate()
+        api.wait()
+    print(f"✅ Emails recibidos por el sumidero: {sumidero.recibidos} "
+          f"en {sumidero.conexiones} conexiones SMTP")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docker", action="store_true", help="levantar Postgres descartable en Docker")
+    parser.add_argument("--limpiar", action="store_true",
+                        help="permitir vaciar las tablas de la base DB_* (sin --docker)")
+    parser.add_argument("--webhooks", type=int, default=1000)
+    parser.add_argument("--clics", type=int, default=1000)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--filas", type=int, default=10_000, help="filas sembradas para el cron (0 = no correr)")
+    parser.add_argument("--por-enviar", type=int, default=200, help="respuestas pendientes de envío")
+    parser.add_argument("--pendientes", type=int, default=100, help="solicitudes sin decidir (resumen)")
+    parser.add_argument("--repeticiones-cron", type=int, default=5)
+    parser.add_argument("--latencia-smtp", type=float, default=0.0, help="segundos por email en el sumidero")
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    parser.add_argument("--comparar", help="resultados de una corrida anterior (--json)")
+    parser.add_argument("--umbral", type=float, default=0.2, help="empeoramiento de p95 tolerado")
+    args = parser.parse_args()
+
+    if args.docker:
+        env_db = levantar_postgres_docker()
+    else:
+        if not args.limpiar:
+            parser.error("sin --docker hay que pasar --limpiar: el benchmark vacía las tablas de DB_*")
+        env_db = {k: os.environ[k] for k in ("DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD")
+                  if k in os.environ}
+
+    try:
+        resultados = asyncio.run(correr(args, env_db))
+    finally:
+        if args.docker:
+            bajar_postgres_docker()
+
+    base = {}
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = {r["escenario"]: r for r in json.load(f)}
+    regresiones = imprimir(resultados, base, args.umbral)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark de concurrencia: driver síncrono vs. pool asíncrono
+
+Simula N webhooks simultáneos que hacen una consulta de duración fija
+(pg_sleep) contra la base configurada con las variables DB_*:
+
+- sync:  pool síncrono del mismo tamaño usado dentro de un handler async (comportamiento
+         anterior: cada consulta bloquea el event loop y los requests se atienden de a uno)
+- async: pool asíncrono de app/db.py (las consultas se solapan hasta DB_POOL_MAX)
+
+Uso:
+    DB_HOST=... DB_PORT=... DB_NAME=... DB_USER=... DB_PASSWORD=... \\
+        python benchmarks/bench_concurrencia.py --requests 50 --latencia 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from psycopg_pool import ConnectionPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import db  # noqa: E402
+
+
+pool_sync = None
+
+
+async def request_sync(latencia: float):
+    """Handler al estilo anterior: driver síncrono dentro de async def"""
+    with pool_sync.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_sleep(%s)", (latencia,))
+
+
+async def request_async(latencia: float):
+    """Handler con el pool asíncrono compartido"""
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute("SELECT pg_sleep(%s)", (latencia,))
+
+
+async def correr(handler, n: int, latencia: float) -> float:
+    inicio = time.perf_counter()
+    await asyncio.gather(*(handler(latencia) for _ in range(n)))
+    return time.perf_counter() - inicio
+
+
+async def main():
+    global pool_sync
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="requests concurrentes")
+    parser.add_argument("--latencia", type=float, default=0.05, help="segundos por consulta")
+    args = parser.parse_args()
+
+    pool_sync = ConnectionPool(db.get_pool().conninfo, min_size=db.DB_POOL_MAX, max_size=db.DB_POOL_MAX)
+    pool_sync.wait()
+    await db.abrir_pool()
+    await db.get_pool().wait()
+    try:
+        for nombre, handler in (("sync", request_sync), ("async", request_async)):
+            total = await correr(handler, args.requests, args.latencia)
+            print(f"{nombre:>5}: {args.requests} requests en {total:.3f}s "
+                  f"({args.requests / total:.1f} req/s)")
+    finally:
+        pool_sync.close()
+        await db.cerrar_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
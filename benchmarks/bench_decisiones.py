@@ -0,0 +1,97 @@
+"""
+Benchmark de decisiones: un clic por solicitud vs. decisión en lote
+
+Carga N solicitudes pendientes de prueba en la base configurada con las variables DB_*
+y las acepta de dos formas:
+
+- clics: como /action, una conexión del pool, un UPDATE y un commit por ID
+         (las voluntarias hacen los clics de a uno)
+- lote:  decisiones.decidir_lote(), un solo UPDATE para todos los IDs
+
+Las filas de prueba (id BENCH-DEC-*) se borran al terminar.
+
+Uso:
+    DB_HOST=... DB_PORT=... DB_NAME=... DB_USER=... DB_PASSWORD=... \\
+        python benchmarks/bench_decisiones.py --solicitudes 50 --repeticiones 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import db  # noqa: E402
+from decisiones import ACCIONES, SQL_DECIDIR, ahora_bsas, decidir_lote  # noqa: E402
+
+PREFIJO = "BENCH-DEC-"
+
+
+async def preparar(ids):
+    """Crea (o vuelve a dejar pendientes) las solicitudes de prueba"""
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.executemany("""
+            INSERT INTO solicitudes_activas (id, fecha_solicitud, nombre_apellido)
+            VALUES (%s, NOW(), 'Benchmark')
+            ON CONFLICT (id) DO UPDATE
+            SET estado = 'Pendiente', fecha_aceptado = NULL, fecha_rechazado = NULL
+        """, [(i,) for i in ids])
+
+
+async def limpiar():
+    async with db.conexion() as conn, conn.cursor() as cur:
+        await cur.execute("DELETE FROM solicitudes_adopcion WHERE id LIKE %s", (PREFIJO + "%",))
+
+
+async def clics(ids):
+    """El camino de /action repetido por cada ID"""
+    nuevo_estado, _, _, _, campo_fecha = ACCIONES["aceptar"]
+    for solicitud_id in ids:
+        now = ahora_bsas()
+        async with db.conexion() as conn, conn.cursor() as cur:
+            await cur.execute(
+                SQL_DECIDIR.format(tabla="solicitudes_activas", campo_fecha=campo_fecha),
+                (nuevo_estado, now, now, solicitud_id)
+            )
+
+
+async def lote(ids):
+    resultado = await decidir_lote("aceptar", ids)
+    assert resultado["actualizadas"] == len(ids), resultado
+
+
+async def medir(funcion, ids, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        await preparar(ids)
+        inicio = time.perf_counter()
+        await funcion(ids)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--solicitudes", type=int, default=50, help="pendientes a decidir")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    ids = [f"{PREFIJO}{i:05d}" for i in range(args.solicitudes)]
+    await db.abrir_pool()
+    await db.get_pool().wait()
+    try:
+        for nombre, funcion in (("clics", clics), ("lote", lote)):
+            tiempos = await medir(funcion, ids, args.repeticiones)
+            mediana = statistics.median(tiempos)
+            print(f"{nombre:>5}: {args.solicitudes} solicitudes en {mediana * 1000:.1f} ms "
+                  f"(mediana de {args.repeticiones}, {args.solicitudes / mediana:.0f} decisiones/s)")
+    finally:
+        await limpiar()
+        await db.cerrar_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
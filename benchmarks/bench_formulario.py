@@ -0,0 +1,107 @@
+"""
+Micro-benchmark de la normalización de una respuesta del formulario
+
+Compara, por solicitud:
+- anterior: extraer_campos_db y el get_value de generar_html_email, cada uno buscando
+  las mismas preguntas largas en el dict y chequeando isinstance(list) en cada lectura
+- esquema: formulario.normalizar (una pasada) + campos_db() + los valores del email
+
+Antes de medir verifica que los dos caminos den los mismos valores. No necesita base ni SMTP.
+
+Uso:
+    python benchmarks/bench_formulario.py --repeticiones 20000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import emails  # noqa: E402
+from formulario import celular_digitos, edad_anios, normalizar  # noqa: E402
+
+
+def extraer_campos_db_anterior(datos: dict) -> dict:
+    """extraer_campos_db tal como estaba en ingesta.py"""
+
+    def get_value(key: str) -> str:
+        return datos.get(key, [""])[0] if isinstance(datos.get(key), list) else datos.get(key, "")
+
+    zona_value = get_value("¿Vivís en CABA? ¿En qué zona estas?")
+
+    return {
+        "nombre_apellido": get_value("Nombre y Apellido"),
+        "edad": get_value("Edad"),
+        "ocupacion": get_value("Ocupación"),
+        "email": get_value("Email"),
+        "instagram": get_value("Instagram"),
+        "celular": get_value("Celular de contacto"),
+        "zona": zona_value.upper() if zona_value else "",
+        "tipo_vivienda": get_value("¿Vivís en casa o departamento?"),
+        "tenencia_vivienda": get_value("Tipo de tenencia de la vivienda"),
+        "cerramientos_url": get_value("En este espacio cargue las fotos o un video de los cerramientos. No mas de 100MB"),
+        "nombre_peludo": get_value("Nombre del peludo en el que estas interesado/a.En caso de que no tenga un nombre asignado por nosotras, describir su aspecto.")
+    }
+
+
+def valores_email_anterior(datos: dict) -> dict:
+    """Contexto de generar_html_email tal como se armaba antes (sin las fotos)"""
+
+    def get_value(key: str) -> str:
+        val = datos.get(key, [""])[0] if isinstance(datos.get(key), list) else datos.get(key, "")
+        return val if val else "No especificado"
+
+    return {campo: get_value(pregunta) for campo, pregunta in emails.PREGUNTAS_EMAIL.items()}
+
+
+def anterior(datos: dict):
+    return extraer_campos_db_anterior(datos), valores_email_anterior(datos)
+
+
+def esquema(datos: dict):
+    solicitud = normalizar(datos)
+    valores = {campo: getattr(solicitud, campo) or "No especificado" for campo in emails.PREGUNTAS_EMAIL}
+    return solicitud.campos_db(), valores
+
+
+def datos_formulario() -> dict:
+    """Respuesta completa, con valores como listas y como texto (así llegan de Apps Script)"""
+    datos = {}
+    for i, (campo, pregunta) in enumerate(emails.PREGUNTAS_EMAIL.items()):
+        valor = f"Respuesta a {campo}"
+        datos[pregunta] = [valor] if i % 2 else valor
+    datos["Timestamp"] = "2024-01-01T10:00:00-03:00"
+    datos[emails.PREGUNTA_FOTOS] = ["https://drive.google.com/open?id=1AbCdEfGhIjKlMnOpQrStUvWxYz012345"]
+    datos["Pregunta que no está en el esquema"] = "Otra respuesta"
+    return datos
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20000)
+    args = parser.parse_args()
+
+    datos = datos_formulario()
+    campos_anterior, email_anterior = anterior(datos)
+    # Cambios intencionales: el email muestra la zona normalizada, igual que la base, y la
+    # fila suma la edad y el celular tipados
+    email_anterior["zona"] = email_anterior["zona"].strip().upper()
+    campos_anterior["edad_anios"] = edad_anios(campos_anterior["edad"])
+    campos_anterior["celular_digitos"] = celular_digitos(campos_anterior["celular"])
+    assert (campos_anterior, email_anterior) == esquema(datos), "la normalización cambió los valores"
+
+    t_anterior = min(timeit.repeat(lambda: anterior(datos), number=args.repeticiones, repeat=5))
+    t_esquema = min(timeit.repeat(lambda: esquema(datos), number=args.repeticiones, repeat=5))
+    t_normalizar = min(timeit.repeat(lambda: normalizar(datos), number=args.repeticiones, repeat=5))
+
+    por_solicitud = 1e6 / args.repeticiones
+    print(f"{'anterior (dos get_value)':<32}{t_anterior * por_solicitud:8.2f} µs/solicitud")
+    print(f"{'esquema (normalizar + usos)':<32}{t_esquema * por_solicitud:8.2f} µs/solicitud"
+          f"   x{t_anterior / t_esquema:.2f}")
+    print(f"{'solo normalizar':<32}{t_normalizar * por_solicitud:8.2f} µs/solicitud")
+
+
+if __name__ == "__main__":
+    main_bench()
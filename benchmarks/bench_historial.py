@@ -0,0 +1,185 @@
+"""
+Benchmark de historial: latencia del cron de notificaciones a medida que crece la tabla
+
+Siembra un conjunto caliente fijo (--por-enviar respuestas vencidas y --pendientes sin
+decidir) y va agregando historial ya procesado (decididas y respondidas, de los últimos
+5 años) hasta cada tamaño de --historial. En cada paso corre el cron completo
+(notificaciones.ejecutar, con el sumidero SMTP local) y reporta la mediana:
+
+- archivado:    el historial se mueve a solicitudes_archivo (archivo.archivar) y el cron
+                solo toca solicitudes_activas
+- sin_archivar: el historial queda en la partición caliente (comportamiento anterior)
+
+Cada repetición tiene que enviar las --por-enviar respuestas (si no, falla): medir un cron
+que no encontró nada daría una latencia plana sin sentido.
+
+Medido en PostgreSQL 18 local (200 respuestas, mediana de 3 corridas):
+    historial      archivado   sin_archivar
+    0                 476 ms         437 ms
+    100000            378 ms         434 ms
+    1000000           529 ms         476 ms
+La latencia del cron no crece en ningún modo: los índices parciales (respuestas por
+enviar, pendientes) ya lo aíslan del historial. El archivo sirve para acotar la partición
+caliente (VACUUM, tamaño de sus índices, /action), no para acelerar el cron.
+
+Uso:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_historial.py --docker --historial 0,100000,1000000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import psycopg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_carga import bajar_postgres_docker, conninfo, levantar_postgres_docker, preparar_base  # noqa: E402
+from sumidero_smtp import SumideroSMTP  # noqa: E402
+
+SQL_SEMBRAR_CALIENTE = """
+    INSERT INTO solicitudes_adopcion (
+        id, fecha_solicitud, estado, nombre_apellido, email, zona, nombre_peludo,
+        email_respuesta_enviado, datos_completos
+    )
+    SELECT
+        'CAL-' || lpad(to_hex(g), 8, '0'),
+        NOW() - make_interval(hours => 100 + g),
+        CASE WHEN g <= %(por_enviar)s THEN (ARRAY['Aceptado', 'Rechazado'])[1 + g %% 2] ELSE 'Pendiente' END,
+        'Solicitante ' || g, 'solicitante' || g || '@example.com', 'PALERMO', 'Firulais',
+        FALSE, '{}'::jsonb
+    FROM generate_series(1, %(por_enviar)s + %(pendientes)s) AS g
+"""
+
+SQL_SEMBRAR_HISTORIAL = """
+    INSERT INTO solicitudes_adopcion (
+        id, fecha_solicitud, fecha_actualizacion, estado, fecha_aceptado, fecha_rechazado,
+        nombre_apellido, email, zona, nombre_peludo, email_respuesta_enviado, datos_completos
+    )
+    SELECT
+        'HIS-' || lpad(to_hex(g), 8, '0'),
+        f, f + interval '2 days',
+        CASE WHEN g %% 2 = 0 THEN 'Aceptado' ELSE 'Rechazado' END,
+        CASE WHEN g %% 2 = 0 THEN f + interval '2 days' END,
+        CASE WHEN g %% 2 = 1 THEN f + interval '2 days' END,
+        'Solicitante ' || g, 'solicitante' || g || '@example.com', 'PALERMO', 'Peludo ' || (g %% 500),
+        TRUE, '{}'::jsonb
+    FROM (
+        SELECT g, NOW() - make_interval(days => 60 + g %% 1800) AS f
+        FROM generate_series(%(desde)s::int, %(hasta)s::int) AS g
+    ) AS s
+"""
+
+# Cada corrida vuelve a encontrar las mismas respuestas por enviar (sin reserva ni
+# intentos de la corrida anterior) y hace el resumen completo
+SQL_REARMAR = """
+    UPDATE solicitudes_activas
+    SET email_respuesta_enviado = FALSE, respuesta_proximo_intento = NULL, respuesta_intentos = 0
+    WHERE id LIKE 'CAL-%' AND estado <> 'Pendiente';
+    UPDATE digest_estado SET ultimo_reporte = NULL, ultimo_completo = NULL;
+"""
+
+
+async def sin_archivo(*args, **kwargs) -> int:
+    return 0
+
+
+async def medir_modo(modo: str, env, historiales, args) -> list:
+    """Corre el cron en cada tamaño de historial; devuelve [(historial, mediana_s)]"""
+    import archivo
+    import db
+    import notificaciones
+
+    preparar_base(env)
+    with psycopg.connect(conninfo(env), autocommit=True) as conn:
+        conn.execute(SQL_SEMBRAR_CALIENTE, {"por_enviar": args.por_enviar, "pendientes": args.pendientes})
+
+    archivar_original = archivo.archivar
+    if modo == "sin_archivar":
+        archivo.archivar = sin_archivo
+
+    resultados = []
+    cargadas = 0
+    await db.abrir_pool()
+    try:
+        for historial in historiales:
+            if historial > cargadas:
+                inicio = time.perf_counter()
+                with psycopg.connect(conninfo(env), autocommit=True) as conn:
+                    conn.execute(SQL_SEMBRAR_HISTORIAL, {"desde": cargadas + 1, "hasta": historial})
+                cargadas = historial
+                if modo == "archivado":
+                    movidas = await archivar_original()
+                    print(f"   {movidas} filas archivadas")
+                with psycopg.connect(conninfo(env), autocommit=True) as conn:
+                    conn.execute("VACUUM ANALYZE solicitudes_activas")
+                    conn.execute("ANALYZE solicitudes_adopcion")
+                print(f"✅ historial {historial} cargado en {time.perf_counter() - inicio:.1f}s")
+
+            tiempos = []
+            for _ in range(args.repeticiones):
+                with psycopg.connect(conninfo(env), autocommit=True) as conn:
+                    conn.execute(SQL_REARMAR)
+                inicio = time.perf_counter()
+                resultado = await notificaciones.ejecutar()
+                tiempos.append(time.perf_counter() - inicio)
+                assert not resultado["fallidos"], resultado["fallidos"]
+                respondidas = resultado["enviados"]["aceptados"] + resultado["enviados"]["rechazados"]
+                # Una corrida que no encontró respuestas mediría un cron vacío
+                assert respondidas == args.por_enviar, f"{respondidas} respuestas de {args.por_enviar}"
+            resultados.append((historial, statistics.median(tiempos)))
+    finally:
+        archivo.archivar = archivar_original
+        await db.cerrar_pool()
+    return resultados
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docker", action="store_true", help="levanta un Postgres descartable")
+    parser.add_argument("--limpiar", action="store_true", help="permite vaciar la base de DB_* (sin --docker)")
+    parser.add_argument("--historial", default="0,100000,1000000", help="tamaños de historial (acumulativos)")
+    parser.add_argument("--por-enviar", type=int, default=200, help="respuestas vencidas por corrida")
+    parser.add_argument("--pendientes", type=int, default=100, help="solicitudes sin decidir")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--modos", default="archivado,sin_archivar")
+    args = parser.parse_args()
+
+    if not args.docker and not args.limpiar:
+        parser.error("sin --docker se usa la base de DB_* y hay que pasar --limpiar (vacía las tablas)")
+    historiales = sorted(int(h) for h in args.historial.split(","))
+
+    env = levantar_postgres_docker() if args.docker else {
+        k: os.environ[k] for k in ("DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD") if k in os.environ
+    }
+    sumidero = SumideroSMTP().iniciar_en_hilo()
+    # Antes de importar la app: db, mailer y notificaciones leen el entorno al importarse
+    os.environ.update({
+        **env,
+        "SMTP_HOST": sumidero.host, "SMTP_PORT": str(sumidero.puerto), "SMTP_SSL": "0",
+        "GMAIL_USER": "bench@example.com", "GMAIL_APP_PASSWORD": "",
+        "EMAIL_DESTINO": "equipo@example.com",
+        "MAIL_TASA_POR_MINUTO": "1000000000", "MAIL_RAFAGA": "1000000"
+    })
+    try:
+        tabla = {}
+        for modo in args.modos.split(","):
+            print(f"--- {modo} ---")
+            tabla[modo] = dict(await medir_modo(modo, env, historiales, args))
+    finally:
+        if args.docker:
+            bajar_postgres_docker()
+
+    modos = list(tabla)
+    print(f"\n{'historial':>10} | " + " | ".join(f"{m:>14}" for m in modos))
+    for historial in historiales:
+        print(f"{historial:>10} | " + " | ".join(f"{tabla[m][historial] * 1000:>11.0f} ms" for m in modos))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
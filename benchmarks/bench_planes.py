@@ -0,0 +1,323 @@
+"""
+Regresiones de planes de consulta: EXPLAIN (ANALYZE, BUFFERS) de cada SQL de la app
+
+Siembra una base local con volumen realista (--filas en la partición caliente, --historial
+archivado con archivo.archivar, --outbox emails ya enviados y --fallidos respuestas y emails
+que agotaron sus reintentos) y corre EXPLAIN de las consultas del webhook, /action,
+/action/lote, el cron, el outbox, la cola de fallidos, las estadísticas, la exportación y
+el panel, con los mismos SQL que usa la app (las escrituras dentro de una transacción que
+se descarta).
+
+Falla (código de salida 1) si:
+- alguna consulta hace Seq Scan sobre una tabla con más de --min-filas filas
+- con --comparar, los buffers leídos (shared hit + read) de una consulta superan la base
+  en más de --umbral (y en más de --margen bloques, para no fallar por ruido), o la base
+  no tiene consultas
+
+Uso:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_planes.py --docker --guardar benchmarks/planes_base.json
+    python benchmarks/bench_planes.py --docker --comparar benchmarks/planes_base.json
+    # contra un PostgreSQL propio (variables DB_*; vacía las tablas)
+    python benchmarks/bench_planes.py --limpiar --comparar benchmarks/planes_base.json
+
+benchmarks/planes_base.json es la base versionada: al cambiar un SQL o un índice se
+regenera con --guardar (con los volúmenes por defecto) y se commitea junto con el cambio.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import psycopg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_carga import (  # noqa: E402
+    bajar_postgres_docker, conninfo, levantar_postgres_docker, payload_formulario, preparar_base, sembrar
+)
+from bench_historial import SQL_SEMBRAR_HISTORIAL  # noqa: E402
+
+SQL_SEMBRAR_OUTBOX = """
+    INSERT INTO email_outbox (destinatario, asunto, html, estado, intentos, enviado_en, proximo_intento)
+    SELECT 'equipo@example.com', 'Solicitud ' || g, '<p>Solicitud ' || g || '</p>',
+           CASE WHEN g <= %(pendientes)s THEN 'pendiente'
+                WHEN g <= %(pendientes)s + %(fallidos)s THEN 'fallido'
+                ELSE 'enviado' END,
+           1, NOW() - make_interval(mins => g), NOW() - make_interval(mins => g)
+    FROM generate_series(1, %(filas)s) AS g
+"""
+
+# Las últimas filas sembradas (ya decididas y respondidas) pasan a respuesta fallida
+SQL_SEMBRAR_RESPUESTAS_FALLIDAS = """
+    UPDATE solicitudes_activas
+    SET respuesta_fallida = TRUE, respuesta_intentos = 5, respuesta_ultimo_error = '550 no existe'
+    WHERE id = ANY(%s)
+"""
+
+# bench_carga siembra todo con fecha_actualizacion = NOW(): las decididas pasan a tener la
+# fecha de su decisión (dos días después de la solicitud) y solo las que esperan respuesta
+# quedan en la última hora, la ventana que cuenta el resumen de pendientes
+SQL_FECHAR_DECISIONES = """
+    UPDATE solicitudes_activas
+    SET fecha_actualizacion = CASE WHEN id <= %(ultima_por_enviar)s THEN NOW() - interval '10 minutes'
+                                   ELSE fecha_solicitud + interval '2 days' END
+    WHERE estado <> 'Pendiente'
+"""
+
+# Los sembrados se llaman todos "Solicitante N" (buscar eso trae la tabla entera): unas
+# pocas filas calientes y archivadas con otro nombre miden una búsqueda selectiva
+NOMBRE_BUSCADO = "Ramona Quiroga"
+SQL_SEMBRAR_NOMBRES = """
+    UPDATE solicitudes_adopcion SET nombre_apellido = %s WHERE id = ANY(%s)
+"""
+
+SQL_FILAS = """
+    SELECT c.relname, c.reltuples::bigint AS filas
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema() AND c.relkind = 'r'
+"""
+
+
+def id_sembrado(g: int) -> str:
+    """ID de la fila g de bench_carga.SQL_SEMBRAR"""
+    return f"BEN-{g:08x}"
+
+
+def consultas(args) -> Dict[str, tuple]:
+    """{nombre: (sql, params)} con los SQL de la app y parámetros que encuentran filas sembradas"""
+    import decisiones
+    import estadisticas
+    import exportacion
+    import fallidos
+    import ingesta
+    import listado
+    import notificaciones
+    import outbox
+    from formulario import normalizar
+
+    ahora = datetime.now(timezone.utc)
+    payload = payload_formulario(10 ** 9)
+    fila = ingesta.fila_solicitud(ingesta.generar_id(), normalizar(payload), ingesta.calcular_huella(payload))
+    pendiente = id_sembrado(args.por_enviar + 1)
+    por_enviar = [id_sembrado(g) for g in range(1, min(args.por_enviar, notificaciones.NOTIF_LOTE) + 1)]
+    lote = [id_sembrado(g) for g in range(args.por_enviar + 1, args.por_enviar + min(args.pendientes, 100) + 1)]
+    texto = NOMBRE_BUSCADO.split()[-1].lower()
+
+    return {
+        "webhook_insertar": (ingesta.SQL_INSERTAR_SOLICITUD, fila),
+        "webhook_id_por_huella": (ingesta.SQL_ID_POR_HUELLA, (fila[-1],)),
+        "action_activas": (
+            decisiones.SQL_DECIDIR.format(tabla="solicitudes_activas", campo_fecha="fecha_aceptado"),
+            ("Aceptado", ahora, ahora, pendiente)
+        ),
+        "action_archivo": (
+            decisiones.SQL_DECIDIR.format(tabla="solicitudes_archivo", campo_fecha="fecha_aceptado"),
+            ("Aceptado", ahora, ahora, "HIS-00000002")
+        ),
+        "action_lote": (
+            decisiones.SQL_DECIDIR_LOTE.format(campo_fecha="fecha_aceptado"),
+            {"ids": lote, "estado": "Aceptado", "ahora": ahora}
+        ),
+        "pendientes": (decisiones.SQL_PENDIENTES, (decisiones.PENDIENTES_PAGINA,)),
+        "cron_reclamar_respuestas": (
+            notificaciones.SQL_RECLAMAR_RESPUESTAS,
+            (notificaciones.NOTIF_RESERVA, ahora - timedelta(hours=48), ahora - timedelta(hours=72),
+             notificaciones.NOTIF_LOTE)
+        ),
+        "cron_marcar_enviadas": (notificaciones.SQL_MARCAR_RESPUESTAS_ENVIADAS, (por_enviar,)),
+        "cron_pendientes": (notificaciones.SQL_PENDIENTES, (notificaciones.DESDE_SIEMPRE, ahora)),
+        "cron_contar_pendientes": (notificaciones.SQL_CONTAR_PENDIENTES, None),
+        "cron_contar_resueltas": (notificaciones.SQL_CONTAR_RESUELTAS, (ahora - timedelta(hours=1), ahora)),
+        "outbox_reservar": (outbox.SQL_RESERVAR, (outbox.OUTBOX_RESERVA, outbox.OUTBOX_LOTE)),
+        "fallidos_listar": (fallidos.SQL_LISTAR, (fallidos.FALLIDOS_LIMITE,)),
+        "fallidos_reintentar_respuestas": (fallidos.SQL_REINTENTAR["respuesta"], None),
+        "fallidos_reintentar_outbox": (fallidos.SQL_REINTENTAR["outbox"], None),
+        "estadisticas": (estadisticas.SQL_LEER, None),
+        # Sin filtros la exportación recorre todo a propósito: se mide la de pendientes
+        "exportacion_pendientes": exportacion.armar_consulta(
+            exportacion.COLUMNAS_POR_DEFECTO, "Pendiente", None, None, None, None
+        ),
+        "listado": listado.armar_consulta(None, None, None, None, None, None, listado.LISTADO_LIMITE),
+        "listado_pendientes": listado.armar_consulta(
+            "Pendiente", None, None, None, None, None, listado.LISTADO_LIMITE
+        ),
+        "listado_zona": listado.armar_consulta(None, None, "palermo", None, None, None, listado.LISTADO_LIMITE),
+        "buscar": (listado.SQL_BUSCAR, {
+            "texto": texto, "patron": f"%{texto}%", "estado": None, "limite": listado.LISTADO_LIMITE
+        })
+    }
+
+
+def nodos(plan: Dict[str, Any]):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from nodos(hijo)
+
+
+def describir(nodo: Dict[str, Any]) -> str:
+    texto = nodo["Node Type"]
+    if "Relation Name" in nodo:
+        texto += f" on {nodo['Relation Name']}"
+    if "Index Name" in nodo:
+        texto += f" using {nodo['Index Name']}"
+    return texto
+
+
+def explicar(conn: psycopg.Connection, sql: str, params, filas: Dict[str, int], min_filas: int) -> Dict[str, Any]:
+    """Corre EXPLAIN ANALYZE y descarta lo que haya escrito; devuelve buffers, tiempo y nodos"""
+    try:
+        resultado = conn.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params).fetchone()[0][0]
+    finally:
+        conn.rollback()
+
+    plan = resultado["Plan"]
+    todos = list(nodos(plan))
+    return {
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+        "tiempo_ms": round(resultado["Execution Time"], 3),
+        "nodos": [describir(n) for n in todos],
+        "secuenciales": sorted({
+            n["Relation Name"] for n in todos
+            if n["Node Type"] == "Seq Scan" and filas.get(n["Relation Name"], 0) >= min_filas
+        })
+    }
+
+
+def comparar(resultados: Dict[str, Dict[str, Any]], base: Dict[str, Any], umbral: float, margen: int) -> List[str]:
+    """Consultas cuyos buffers empeoraron respecto de la base (los cambios de plan solo se informan)"""
+    regresiones = []
+    anteriores = base["consultas"]
+    for nombre, actual in resultados.items():
+        anterior = anteriores.get(nombre)
+        if anterior is None:
+            print(f"   {nombre}: nueva, sin base")
+            continue
+        limite = max(anterior["buffers"] * (1 + umbral), anterior["buffers"] + margen)
+        if actual["buffers"] > limite:
+            regresiones.append(f"{nombre}: {anterior['buffers']} -> {actual['buffers']} buffers")
+        if actual["nodos"] != anterior["nodos"]:
+            print(f"   {nombre}: cambió el plan\n      antes: {', '.join(anterior['nodos'])}"
+                  f"\n      ahora: {', '.join(actual['nodos'])}")
+    for nombre in anteriores.keys() - resultados.keys():
+        print(f"   {nombre}: está en la base pero ya no se mide")
+    return regresiones
+
+
+async def sembrar_historial(env: Dict[str, str], historial: int) -> int:
+    """Siembra historial procesado y lo mueve al archivo como lo haría el cron"""
+    import archivo
+    import db
+
+    with psycopg.connect(conninfo(env), autocommit=True) as conn:
+        conn.execute(SQL_SEMBRAR_HISTORIAL, {"desde": 1, "hasta": historial})
+    await db.abrir_pool()
+    try:
+        return await archivo.archivar()
+    finally:
+        await db.cerrar_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docker", action="store_true", help="levanta un Postgres descartable")
+    parser.add_argument("--limpiar", action="store_true", help="permite vaciar la base de DB_* (sin --docker)")
+    parser.add_argument("--filas", type=int, default=200_000, help="filas en la partición caliente")
+    parser.add_argument("--por-enviar", type=int, default=200, help="respuestas pendientes de envío")
+    parser.add_argument("--pendientes", type=int, default=100, help="solicitudes sin decidir")
+    parser.add_argument("--historial", type=int, default=500_000, help="filas archivadas")
+    parser.add_argument("--outbox", type=int, default=50_000, help="emails en el outbox (20 pendientes)")
+    parser.add_argument("--fallidos", type=int, default=20,
+                        help="respuestas y emails del outbox que agotaron sus reintentos")
+    parser.add_argument("--min-filas", type=int, default=1000,
+                        help="un Seq Scan sobre tablas más chicas no cuenta como falla")
+    parser.add_argument("--guardar", help="guardar los planes como base en este archivo JSON")
+    parser.add_argument("--comparar", help="base de una corrida anterior (--guardar)")
+    parser.add_argument("--umbral", type=float, default=0.25, help="aumento de buffers tolerado")
+    parser.add_argument("--margen", type=int, default=50, help="aumento de buffers que nunca cuenta como regresión")
+    args = parser.parse_args()
+
+    if not args.docker and not args.limpiar:
+        parser.error("sin --docker se usa la base de DB_* y hay que pasar --limpiar (vacía las tablas)")
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+
+    env = levantar_postgres_docker() if args.docker else {
+        k: os.environ[k] for k in ("DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD") if k in os.environ
+    }
+    # Antes de importar la app: db y notificaciones leen el entorno al importarse
+    os.environ.update(env)
+    try:
+        preparar_base(env)
+        sembrar(env, args.filas, args.por_enviar, args.pendientes)
+        inicio = time.perf_counter()
+        movidas = asyncio.run(sembrar_historial(env, args.historial)) if args.historial else 0
+        print(f"✅ {movidas} filas archivadas en {time.perf_counter() - inicio:.1f}s")
+
+        with psycopg.connect(conninfo(env), autocommit=True) as conn:
+            conn.execute(SQL_SEMBRAR_OUTBOX, {
+                "filas": args.outbox, "pendientes": min(20, args.outbox),
+                "fallidos": max(0, min(args.fallidos, args.outbox - 20))
+            })
+            conn.execute(SQL_FECHAR_DECISIONES, {"ultima_por_enviar": id_sembrado(args.por_enviar)})
+            conn.execute(SQL_SEMBRAR_RESPUESTAS_FALLIDAS, (
+                [id_sembrado(g) for g in range(max(1, args.filas - args.fallidos + 1), args.filas + 1)],
+            ))
+            conn.execute(SQL_SEMBRAR_NOMBRES, (NOMBRE_BUSCADO, [
+                *(id_sembrado(g) for g in range(1, args.filas + 1, max(1, args.filas // 5))),
+                *(f"HIS-{g:08x}" for g in range(1, args.historial + 1, max(1, args.historial // 5)))
+            ]))
+            # Todas las particiones: las anuales recién llenadas por archivo.archivar todavía
+            # tienen las entradas GIN en la lista pendiente (el planner las evita)
+            conn.execute("VACUUM ANALYZE solicitudes_adopcion")
+            conn.execute("VACUUM ANALYZE email_outbox")
+            filas = {fila[0]: fila[1] for fila in conn.execute(SQL_FILAS)}
+            version = conn.execute("SHOW server_version").fetchone()[0]
+
+        resultados = {}
+        with psycopg.connect(conninfo(env)) as conn:
+            for nombre, (sql, params) in consultas(args).items():
+                resultados[nombre] = explicar(conn, sql, params, filas, args.min_filas)
+    finally:
+        if args.docker:
+            bajar_postgres_docker()
+
+    ancho = max(map(len, resultados))
+    print(f"\n{'consulta':<{ancho}} | {'buffers':>8} | {'tiempo':>10} | plan")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<{ancho}} | {r['buffers']:>8} | {r['tiempo_ms']:>7.2f} ms | {r['nodos'][0]}")
+
+    fallas = [f"{nombre}: Seq Scan sobre {', '.join(r['secuenciales'])}"
+              for nombre, r in resultados.items() if r["secuenciales"]]
+    if base and not base["consultas"]:
+        fallas.append(f"{args.comparar} no tiene consultas: generarla con --guardar")
+    elif base:
+        if base.get("filas") != args.filas or base.get("historial") != args.historial:
+            print("⚠️  La base se generó con otro volumen; los buffers no son comparables")
+        fallas += comparar(resultados, base, args.umbral, args.margen)
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump({
+                "postgres": version, "filas": args.filas, "historial": args.historial,
+                "outbox": args.outbox, "fallidos": args.fallidos, "consultas": resultados
+            }, f, indent=2, ensure_ascii=False)
+        print(f"✅ Base guardada en {args.guardar}")
+
+    for falla in fallas:
+        print(f"❌ {falla}")
+    if fallas:
+        sys.exit(1)
+    print("✅ Sin Seq Scans ni regresiones de buffers")
+
+
+if __name__ == "__main__":
+    main()
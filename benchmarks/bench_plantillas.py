@@ -0,0 +1,82 @@
+"""
+Micro-benchmark del motor de plantillas vs. los f-strings anteriores
+
+Compara, con datos sintéticos:
+- email de nueva solicitud (generar_html_email)
+- resumen de pendientes con N solicitudes (generar_email_resumen_pendientes)
+
+No necesita base de datos ni SMTP.
+
+Uso:
+    python benchmarks/bench_plantillas.py --repeticiones 2000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import emails  # noqa: E402
+import legado_emails  # noqa: E402
+
+
+def datos_formulario() -> dict:
+    """Respuesta completa del formulario, con los valores como listas (así llegan de Apps Script)"""
+    datos = {pregunta: [f"Respuesta a {campo}"] for campo, pregunta in emails.PREGUNTAS_EMAIL.items()}
+    datos[emails.PREGUNTA_FOTOS] = ["https://drive.google.com/open?id=1AbCdEfGhIjKlMnOpQrStUvWxYz012345"]
+    return datos
+
+
+def pendientes(cantidad: int) -> list:
+    return [
+        {
+            "id": f"SOL-{i:08X}",
+            "nombre_apellido": f"Solicitante {i}",
+            "edad": "30",
+            "ocupacion": "Docente",
+            "zona": "PALERMO",
+            "email": f"solicitante{i}@example.com",
+            "celular": "11 5555-5555",
+            "instagram": "@solicitante",
+            "tipo_vivienda": "Departamento",
+            "tenencia_vivienda": "Alquilada",
+            "nombre_peludo": "Firulais"
+        }
+        for i in range(cantidad)
+    ]
+
+
+def medir(nombre: str, anterior, nuevo, repeticiones: int):
+    t_anterior = min(timeit.repeat(anterior, number=repeticiones, repeat=5)) / repeticiones
+    t_nuevo = min(timeit.repeat(nuevo, number=repeticiones, repeat=5)) / repeticiones
+    print(f"{nombre:<32} anterior {t_anterior * 1e6:10.1f} µs   "
+          f"plantillas {t_nuevo * 1e6:10.1f} µs   x{t_anterior / t_nuevo:.2f}")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+
+    datos = datos_formulario()
+    medir(
+        "email nueva solicitud",
+        lambda: legado_emails.generar_html_email("SOL-00000001", datos),
+        lambda: emails.generar_html_email("SOL-00000001", datos),
+        args.repeticiones
+    )
+    for cantidad in (10, 100, 1000, 5000):
+        lista = pendientes(cantidad)
+        medir(
+            f"resumen con {cantidad} pendientes",
+            lambda: legado_emails.generar_email_resumen_pendientes(lista),
+            lambda: emails.generar_email_resumen_pendientes(lista),
+            max(1, args.repeticiones // cantidad)
+        )
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,95 @@
+"""
+Implementación anterior de los emails reducida a lo que compara bench_plantillas.py:
+el email de una solicitud como un f-string con un get_value por pregunta (y el helper de
+Drive que recorría sus patrones en cada llamada) y el resumen armado con += por solicitud.
+El CSS y el layout fijos se reemplazaron por bloques del mismo tamaño: no cambian lo que
+cuesta renderizar, solo lo que se copia.
+"""
+
+import re
+from typing import Dict, Any
+
+from emails import PREGUNTAS_EMAIL, PREGUNTA_FOTOS
+
+CLOUD_RUN_URL = "https://adopciones.example.run.app"
+
+# Tamaño aproximado del marcado fijo de cada email anterior
+_MARCADO_SOLICITUD = " " * 4600
+_MARCADO_RESUMEN = " " * 1750
+
+
+def generar_html_email(solicitud_id: str, datos: Dict[str, Any]) -> str:
+    """Genera el HTML del email con todos los campos del formulario"""
+
+    def drive_url_to_image(url: str) -> str:
+        if not url or url == 'N/A':
+            return ''
+        patterns = [
+            r'/file/d/([a-zA-Z0-9_-]+)',
+            r'id=([a-zA-Z0-9_-]+)',
+            r'/open\?id=([a-zA-Z0-9_-]+)',
+            r'^([a-zA-Z0-9_-]{25,})$'
+        ]
+        for pattern in patterns:
+            match = re.search(pattern, url)
+            if match:
+                return f'https://lh3.googleusercontent.com/d/{match.group(1)}'
+        return url
+
+    def get_value(key: str) -> str:
+        val = datos.get(key, [""])[0] if isinstance(datos.get(key), list) else datos.get(key, "")
+        return val if val else "No especificado"
+
+    url_aceptar = f"{CLOUD_RUN_URL}/action?action=aceptar&id={solicitud_id}"
+    url_rechazar = f"{CLOUD_RUN_URL}/action?action=rechazar&id={solicitud_id}"
+
+    lineas = "".join(
+        f'<div class="info-line"><strong>{campo}:</strong> {get_value(pregunta)}</div>'
+        for campo, pregunta in PREGUNTAS_EMAIL.items()
+    )
+    return f"""
+    <html>{_MARCADO_SOLICITUD}
+      <div class="badge">ID: {solicitud_id}</div>
+      {lineas}
+      <img src="{drive_url_to_image(get_value(PREGUNTA_FOTOS))}" style="max-width: 100%;">
+      <a href="{url_aceptar}" class="button btn-aceptar">✅ Aceptar</a>
+      <a href="{url_rechazar}" class="button btn-rechazar">❌ Rechazar</a>
+    </html>
+    """
+
+
+def generar_email_resumen_pendientes(solicitudes: list) -> str:
+    """Genera email con resumen de solicitudes pendientes"""
+
+    items_html = ""
+    for sol in solicitudes:
+        url_aceptar = f"{CLOUD_RUN_URL}/action?action=aceptar&id={sol['id']}"
+        url_rechazar = f"{CLOUD_RUN_URL}/action?action=rechazar&id={sol['id']}"
+
+        items_html += f"""
+        <div class="solicitud-item">
+            <div class="solicitud-header">
+                <strong>{sol.get('nombre_apellido', 'Sin nombre')}</strong>
+                <span class="badge-pendiente">Pendiente</span>
+            </div>
+            <div class="solicitud-info">
+                <p><strong>👤 Datos Personales:</strong> {sol.get('edad', 'N/A')} años • {sol.get('ocupacion', 'N/A')} • {sol.get('zona', 'N/A')}</p>
+                <p><strong>📧 Contacto:</strong> {sol.get('email', 'N/A')} • {sol.get('celular', 'N/A')} • {sol.get('instagram', 'N/A')}</p>
+                <p><strong>🏠 Vivienda:</strong> {sol.get('tipo_vivienda', 'N/A')} ({sol.get('tenencia_vivienda', 'N/A')})</p>
+                <p><strong>🐾 Peludo:</strong> {sol.get('nombre_peludo', 'N/A')}</p>
+                <p><strong>ID:</strong> <code>{sol['id']}</code></p>
+            </div>
+            <div class="solicitud-actions">
+                <a href="{url_aceptar}" class="btn btn-aceptar">✅ Aceptar</a>
+                <a href="{url_rechazar}" class="btn btn-rechazar">❌ Rechazar</a>
+            </div>
+        </div>
+        """
+
+    return f"""
+    <html>{_MARCADO_RESUMEN}
+      <h1>⏳ Solicitudes Pendientes ({len(solicitudes)})</h1>
+      <p>Tienes <strong>{len(solicitudes)}</strong> solicitud(es) sin responder:</p>
+      {items_html}
+    </html>
+    """
@@ -0,0 +1,95 @@
+"""
+Sumidero SMTP local para los benchmarks
+Acepta cualquier email (sin TLS ni autenticación), lo descarta y lo cuenta.
+Reemplaza a Gmail con SMTP_HOST=127.0.0.1 SMTP_PORT=<puerto> SMTP_SSL=0.
+
+Uso:
+    python benchmarks/sumidero_smtp.py --puerto 2525 --latencia 0.05
+"""
+
+import argparse
+import asyncio
+import threading
+
+
+class SumideroSMTP:
+    """Servidor SMTP mínimo sobre asyncio; `latencia` simula el tiempo de aceptación de Gmail"""
+
+    def __init__(self, host: str = "127.0.0.1", puerto: int = 2525, latencia: float = 0.0):
+        self.host = host
+        self.puerto = puerto
+        self.latencia = latencia
+        self.recibidos = 0
+        self.conexiones = 0
+        self._server = None
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.conexiones += 1
+
+        async def responder(linea: str):
+            writer.write(linea.encode() + b"\r\n")
+            await writer.drain()
+
+        await responder("220 sumidero ESMTP")
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                comando = linea[:4].upper()
+                if comando in (b"EHLO", b"HELO"):
+                    await responder("250-sumidero\r\n250 8BITMIME")
+                elif comando == b"DATA":
+                    await responder("354 Fin con <CRLF>.<CRLF>")
+                    while (await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    if self.latencia:
+                        await asyncio.sleep(self.latencia)
+                    self.recibidos += 1
+                    await responder("250 OK")
+                elif comando == b"QUIT":
+                    await responder("221 Chau")
+                    break
+                else:
+                    # MAIL, RCPT, RSET, NOOP, AUTH...
+                    await responder("250 OK")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def iniciar(self):
+        self._server = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._server.sockets[0].getsockname()[1]
+
+    def iniciar_en_hilo(self) -> "SumideroSMTP":
+        """Corre el servidor en un hilo propio (para usarlo desde código sync o de otro loop)"""
+        listo = threading.Event()
+
+        def correr():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.iniciar())
+            listo.set()
+            loop.run_forever()
+
+        threading.Thread(target=correr, daemon=True).start()
+        listo.wait()
+        return self
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=2525)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por email")
+    args = parser.parse_args()
+
+    sumidero = SumideroSMTP(args.host, args.puerto, args.latencia)
+    await sumidero.iniciar()
+    print(f"✅ Sumidero SMTP escuchando en {sumidero.host}:{sumidero.puerto}")
+    async with sumidero._server:
+        await sumidero._server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
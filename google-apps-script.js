@@ -29,6 +29,8 @@ function onFormSubmit(e) {
       method: "post",
       contentType: "application/json",
       payload: JSON.stringify(payload),
+      // El ID de la respuesta no cambia entre reintentos: el backend descarta los duplicados
+      headers: { "Idempotency-Key": e.response.getId() },
       muteHttpExceptions: true
     };
     
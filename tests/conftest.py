@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos de la app se importan como en Cloud Run (import db, import ingesta...)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
@@ -0,0 +1,55 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import ingesta
+
+
+class CursorLote:
+    """Simula la tabla temporal y el volcado de insertar_lote contra una tabla con PK y huella únicas"""
+
+    def __init__(self, ids_cargados):
+        self.tabla = {solicitud_id: f"otra-{solicitud_id}" for solicitud_id in ids_cargados}
+        self.temporal = []
+        self._filas = []
+
+    @asynccontextmanager
+    async def copy(self, sql):
+        class Copia:
+            async def write_row(_, fila):
+                self.temporal.append({"id": fila[0], "huella": fila[-1]})
+        yield Copia()
+
+    async def execute(self, sql, params=None):
+        if sql == ingesta.SQL_VOLCAR_TEMPORAL:
+            self._filas = []
+            for fila in self.temporal:
+                if fila["id"] not in self.tabla and fila["huella"] not in self.tabla.values():
+                    self.tabla[fila["id"]] = fila["huella"]
+                    self._filas.append(dict(fila))
+        elif sql == ingesta.SQL_CHOQUES_DE_ID:
+            self._filas = [fila for fila in self.temporal if fila["huella"] not in self.tabla.values()]
+
+    async def executemany(self, sql, params):
+        assert sql == ingesta.SQL_CAMBIAR_ID
+        for nuevo, huella in params:
+            for fila in self.temporal:
+                if fila["huella"] == huella:
+                    fila["id"] = nuevo
+
+    async def fetchall(self):
+        return self._filas
+
+
+def test_lote_con_id_repetido_se_carga_con_otro_id(monkeypatch):
+    ids = iter(["SOL-CARGADA", "SOL-00000001", "SOL-00000001", "SOL-00000002", "SOL-00000003"])
+    monkeypatch.setattr(ingesta, "generar_id", lambda: next(ids))
+    cursor = CursorLote(["SOL-CARGADA"])
+    # La última es la misma respuesta que la primera
+    lote = [{"Nombre y Apellido": nombre} for nombre in ("Ana", "Beto", "Caro", "Ana")]
+
+    cargadas = asyncio.run(ingesta.insertar_lote(cursor, lote, "ninguno"))
+
+    assert [(sol["id"], sol["nombre_apellido"]) for sol in cargadas] == [
+        ("SOL-00000002", "Ana"), ("SOL-00000001", "Beto"), ("SOL-00000003", "Caro")
+    ]
+    assert len(cursor.tabla) == 4
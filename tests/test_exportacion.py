@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from exportacion import COLUMNAS_POR_DEFECTO, _valor_csv, armar_consulta, elegir_columnas
+
+
+@pytest.mark.parametrize("valor", ["=HYPERLINK(\"http://x\")", "+54 9 11 5555-5555", "-1", "@SUMA(A1)", "\tx"])
+def test_csv_neutraliza_formulas(valor):
+    assert _valor_csv(valor) == "'" + valor
+
+
+def test_csv_valores_comunes():
+    fecha = datetime(2024, 1, 2, 3, 4, tzinfo=timezone.utc)
+    assert _valor_csv("Ana") == "Ana"
+    assert _valor_csv(None) == ""
+    assert _valor_csv(fecha) == fecha.isoformat()
+    assert _valor_csv({"a": "ñ"}) == '{"a": "ñ"}'
+    assert _valor_csv(3) == 3
+
+
+def test_elegir_columnas():
+    assert elegir_columnas(None) == list(COLUMNAS_POR_DEFECTO)
+    assert elegir_columnas(" id , estado ") == ["id", "estado"]
+    with pytest.raises(ValueError):
+        elegir_columnas("id,password")
+
+
+def test_consulta_con_los_filtros_del_listado():
+    sql, params = armar_consulta(("id", "estado"), "Pendiente", None, "norte", None, None)
+    assert "SELECT id, estado" in sql
+    assert "WHERE estado = %s AND zona = %s" in sql
+    assert "ORDER BY fecha_solicitud, id" in sql
+    assert params == ["Pendiente", "NORTE"]
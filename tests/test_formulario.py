@@ -0,0 +1,73 @@
+import pytest
+
+from diccionario import CLAVE_VERSION, VERSION_ACTUAL, VERSIONES, codificar
+from exportacion import elegir_columnas
+from formulario import celular_digitos, edad_anios, normalizar
+
+PREGUNTAS = VERSIONES[VERSION_ACTUAL]
+
+
+def respuesta_cruda():
+    return {
+        PREGUNTAS["nombre"]: ["Ana Pérez"],
+        PREGUNTAS["edad"]: 32,
+        PREGUNTAS["celular"]: "+54 9 11 5555-5555",
+        PREGUNTAS["zona"]: "  palermo ",
+        PREGUNTAS["fotos"]: ["id-1", "id-2"],
+        "Timestamp": "2024-01-01T10:00:00-03:00",
+        "Pregunta nueva": "sin código"
+    }
+
+
+def test_normaliza_respuesta_cruda():
+    solicitud = normalizar(respuesta_cruda())
+    assert solicitud.nombre == "Ana Pérez"
+    assert solicitud.edad == "32"
+    assert solicitud.edad_anios == 32
+    assert solicitud.celular_digitos == "5491155555555"
+    assert solicitud.zona == "PALERMO"
+    assert solicitud.fotos == ["id-1", "id-2"]
+    assert solicitud.email == ""
+    assert solicitud.timestamp == "2024-01-01T10:00:00-03:00"
+    assert solicitud.datos["Pregunta nueva"] == "sin código"
+
+
+def test_datos_completos_codificados_dan_lo_mismo():
+    cruda = respuesta_cruda()
+    codificada = codificar(cruda)
+    assert codificada[CLAVE_VERSION] == VERSION_ACTUAL
+    assert normalizar(codificada).campos_db() == normalizar(cruda).campos_db()
+
+
+def test_version_desconocida_o_invalida_se_lee_como_cruda():
+    esperado = normalizar(respuesta_cruda()).campos_db()
+    for version in (99, "1", [1], {"a": 1}, True):
+        assert normalizar({**respuesta_cruda(), CLAVE_VERSION: version}).campos_db() == esperado
+
+
+@pytest.mark.parametrize("edad,esperada", [
+    ("32", 32), ("32 años", 32), ("tengo 45", 45), ("045", 45), ("25/30", 25),
+    ("", None), ("treinta", None), ("0", None), ("120", None), ("99999999999999999999", None),
+])
+def test_edad_anios(edad, esperada):
+    assert edad_anios(edad) == esperada
+
+
+@pytest.mark.parametrize("celular,esperado", [
+    ("+54 9 11 5555-5555", "5491155555555"), ("(011) 4444.4444", "01144444444"),
+    ("no tengo", ""), ("", ""),
+])
+def test_celular_digitos(celular, esperado):
+    assert celular_digitos(celular) == esperado
+
+
+def test_edad_y_celular_mal_cargados_no_rompen_la_normalizacion():
+    solicitud = normalizar({PREGUNTAS["edad"]: ["muchos"], PREGUNTAS["celular"]: None})
+    assert solicitud.edad == "muchos"
+    assert solicitud.edad_anios is None
+    assert solicitud.celular_digitos == ""
+    assert solicitud.campos_db()["edad_anios"] is None
+
+
+def test_edad_y_celular_tipados_se_pueden_exportar():
+    assert elegir_columnas("edad_anios,celular_digitos") == ["edad_anios", "celular_digitos"]
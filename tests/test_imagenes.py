@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+import imagenes
+from imagenes import CacheDisco, ImagenNoEncontrada
+
+FILE_ID = "abcdefghij123"
+
+
+class OrigenFalso:
+    def __init__(self, respuestas):
+        self.respuestas = respuestas
+        self.pedidos = 0
+
+    async def obtener(self, file_id, ancho):
+        self.pedidos += 1
+        respuesta = self.respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheDisco(str(tmp_path), 1024 * 1024)
+
+
+def test_cambio_de_tipo_no_deja_el_archivo_anterior(cache, tmp_path):
+    cache.guardar("foto-800", b"png", "image/png")
+    cache.guardar("foto-800", b"jpeg", "image/jpeg")
+    assert [p.suffix for p in tmp_path.iterdir()] == [".jpg"]
+    assert cache.total == 4
+
+
+def test_404_del_origen_se_recuerda(cache):
+    origen = OrigenFalso([ImagenNoEncontrada(FILE_ID)])
+    imagenes.configurar(origen=origen, cache=cache)
+    for _ in range(2):
+        with pytest.raises(ImagenNoEncontrada):
+            asyncio.run(imagenes.obtener(FILE_ID))
+    assert origen.pedidos == 1
+
+
+def test_segundo_pedido_sale_del_cache(cache):
+    origen = OrigenFalso([(b"jpeg", "image/jpeg")])
+    imagenes.configurar(origen=origen, cache=cache)
+    primera = asyncio.run(imagenes.obtener(FILE_ID))
+    assert asyncio.run(imagenes.obtener(FILE_ID)) == primera
+    assert origen.pedidos == 1
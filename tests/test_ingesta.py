@@ -0,0 +1,93 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from starlette.requests import Request
+
+import ingesta
+import main
+
+DATOS = {"Nombre y Apellido": "Ana Pérez", "Email": "ana@example.com"}
+
+
+def request_json(datos):
+    cuerpo = json.dumps(datos).encode()
+
+    async def recibir():
+        return {"type": "http.request", "body": cuerpo, "more_body": False}
+
+    return Request({"type": "http", "method": "POST", "path": "/webhook/form", "headers": []}, recibir)
+
+
+class CursorFalso:
+    """Simula el INSERT ... ON CONFLICT (huella) DO NOTHING sobre una fila ya cargada"""
+
+    def __init__(self, id_existente):
+        self.id_existente = id_existente
+        self.consultas = []
+        self._fila = None
+
+    async def execute(self, sql, params=None):
+        self.consultas.append((sql, params))
+        if sql == ingesta.SQL_INSERTAR_SOLICITUD:
+            self._fila = None
+        elif sql == ingesta.SQL_ID_POR_HUELLA:
+            self._fila = {"id": self.id_existente}
+
+    async def fetchone(self):
+        return self._fila
+
+
+def base_falsa(monkeypatch, cursor):
+    class ConexionFalsa:
+        @asynccontextmanager
+        async def cursor(self):
+            yield cursor
+
+        def __call__(self):
+            return self
+
+    @asynccontextmanager
+    async def conexion():
+        yield ConexionFalsa()
+
+    monkeypatch.setattr(main.db, "conexion", conexion)
+
+
+def test_huella_usa_idempotency_key_si_viene():
+    editada = {**DATOS, "Email": "otra@example.com"}
+    assert ingesta.calcular_huella(DATOS, "resp-1") == ingesta.calcular_huella(editada, "resp-1")
+    assert ingesta.calcular_huella(DATOS, "resp-1") != ingesta.calcular_huella(DATOS, "resp-2")
+    assert ingesta.calcular_huella(DATOS, "resp-1").startswith("k:")
+
+
+def test_huella_sin_clave_es_hash_del_contenido():
+    invertidos = dict(reversed(list(DATOS.items())))
+    assert ingesta.calcular_huella(DATOS) == ingesta.calcular_huella(invertidos)
+    assert ingesta.calcular_huella(DATOS) != ingesta.calcular_huella({**DATOS, "Email": "x@example.com"})
+    assert ingesta.calcular_huella(DATOS, "").startswith("c:")
+
+
+def test_reintento_reciente_no_toca_la_base(monkeypatch):
+    huella = ingesta.calcular_huella(DATOS, "resp-reciente")
+    ingesta.recordar_huella(huella, "SOL-ORIGINAL")
+    monkeypatch.setattr(main.db, "conexion", None)  # fallaría si se usara
+
+    respuesta = asyncio.run(main.handle_form_submission(request_json(DATOS), "resp-reciente"))
+
+    assert respuesta["duplicado"] is True
+    assert respuesta["id"] == "SOL-ORIGINAL"
+
+
+def test_reenvio_editado_con_la_misma_clave_devuelve_el_id_original(monkeypatch):
+    cursor = CursorFalso("SOL-CARGADA")
+    base_falsa(monkeypatch, cursor)
+    editada = {**DATOS, "Email": "corregido@example.com"}
+
+    respuesta = asyncio.run(main.handle_form_submission(request_json(editada), "resp-editada"))
+
+    assert respuesta == main.respuesta_duplicada("SOL-CARGADA")
+    insert, select = cursor.consultas
+    assert insert[1][-1] == ingesta.calcular_huella(DATOS, "resp-editada")
+    assert select == (ingesta.SQL_ID_POR_HUELLA, (insert[1][-1],))
+    assert ingesta.id_reciente(insert[1][-1]) == "SOL-CARGADA"
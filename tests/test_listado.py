@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+
+import listado
+
+
+def test_cursor_ida_y_vuelta():
+    fecha = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = listado.codificar_cursor(fecha, "SOL-ABC")
+    assert "=" not in cursor
+    assert listado.decodificar_cursor(cursor) == (fecha, "SOL-ABC")
+
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!", "bnVsbA", "WzFd"])
+def test_cursor_invalido(cursor):
+    with pytest.raises(ValueError):
+        listado.decodificar_cursor(cursor)
+
+
+def test_armar_consulta_con_filtros_y_cursor():
+    despues_de = (datetime(2024, 1, 1, tzinfo=timezone.utc), "SOL-1")
+    sql, params = listado.armar_consulta("Pendiente", None, "palermo", None, None, despues_de, 20)
+    assert "estado = %s AND zona = %s AND (fecha_solicitud, id) < (%s, %s)" in sql
+    assert params == ["Pendiente", "PALERMO", *despues_de, 21]
+
+
+def test_armar_consulta_sin_filtros():
+    sql, params = listado.armar_consulta(None, None, None, None, None, None, 5)
+    assert "WHERE" not in sql
+    assert params == [6]
+
+
+def buscar_con_base_falsa(monkeypatch, texto):
+    """Corre listado.buscar y devuelve los parámetros que recibió la consulta"""
+    ejecutadas = []
+
+    class CursorFalso:
+        async def execute(self, sql, params):
+            ejecutadas.append(params)
+
+        async def fetchall(self):
+            return []
+
+    class ConexionFalsa:
+        @asynccontextmanager
+        async def cursor(self):
+            yield CursorFalso()
+
+    @asynccontextmanager
+    async def conexion():
+        yield ConexionFalsa()
+
+    monkeypatch.setattr(listado.db, "conexion", conexion)
+    listado.invalidar_cache()
+    asyncio.run(listado.buscar(texto))
+    return ejecutadas[0]
+
+
+@pytest.mark.parametrize("texto", ["11 5555-5555", "(11) 5555.5555", "+11 5555 5555"])
+def test_telefono_se_busca_por_sus_digitos(monkeypatch, texto):
+    params = buscar_con_base_falsa(monkeypatch, texto)
+    assert params["patron"] == "%1155555555%"
+    assert params["texto"] == texto
+
+
+@pytest.mark.parametrize("texto,patron", [("ana 50%", "%ana 50\\%%"), ("12-3", "%12-3%"), ("calle 1234567", "%calle 1234567%")])
+def test_texto_que_no_es_telefono_se_busca_literal(monkeypatch, texto, patron):
+    assert buscar_con_base_falsa(monkeypatch, texto)["patron"] == patron
@@ -0,0 +1,107 @@
+import smtplib
+import time
+
+from mailer import LimitadorTasa, SesionSMTP
+
+
+class ServidorFalso:
+    def __init__(self, errores):
+        self.errores = errores
+        self.enviados = []
+
+    def send_message(self, mensaje):
+        if self.errores:
+            raise self.errores.pop(0)
+        self.enviados.append(mensaje["To"])
+
+    def quit(self):
+        pass
+
+
+def sesion_con(servidores):
+    sesion = SesionSMTP(limitador=LimitadorTasa(1000, 1000))
+    conexiones = []
+
+    def conectar():
+        sesion._server = servidores[len(conexiones)]
+        conexiones.append(sesion._server)
+
+    sesion._conectar = conectar
+    return sesion, conexiones
+
+
+def test_limitador_deja_pasar_la_rafaga_y_despues_espera():
+    limitador = LimitadorTasa(tasa=20, capacidad=2)
+    inicio = time.monotonic()
+    limitador.esperar()
+    limitador.esperar()
+    assert time.monotonic() - inicio < 0.02
+    limitador.esperar()
+    assert time.monotonic() - inicio >= 0.04
+
+
+def test_reconecta_una_vez_si_se_corta_la_conexion():
+    sesion, conexiones = sesion_con([
+        ServidorFalso([smtplib.SMTPServerDisconnected("cortada")]),
+        ServidorFalso([])
+    ])
+    resultado = sesion.enviar("ana@example.com", "Hola", "<p>hola</p>")
+    assert resultado == {"destinatario": "ana@example.com", "ok": True, "error": None}
+    assert len(conexiones) == 2
+
+
+def test_rechazo_del_destinatario_no_se_reintenta():
+    rechazo = smtplib.SMTPRecipientsRefused({"x@example.com": (550, b"no existe")})
+    sesion, conexiones = sesion_con([ServidorFalso([rechazo]), ServidorFalso([])])
+    resultado = sesion.enviar("x@example.com", "Hola", "<p>hola</p>")
+    assert resultado["ok"] is False
+    assert len(conexiones) == 1
+
+
+def test_enviar_todos_sigue_despues_de_una_falla():
+    caida = OSError("sin red")
+    sesion, _ = sesion_con([ServidorFalso([caida]), ServidorFalso([caida]), ServidorFalso([])])
+    resultados = sesion.enviar_todos([
+        ("a@example.com", "A", "<p>a</p>"),
+        ("b@example.com", "B", "<p>b</p>")
+    ])
+    assert [r["ok"] for r in resultados] == [False, True]
+
+
+def test_destinatario_con_salto_de_linea_no_corta_el_lote():
+    sesion, conexiones = sesion_con([ServidorFalso([])])
+    resultados = sesion.enviar_todos([
+        ("x@y.z\nBcc: evil@x", "Hola", "<p>hola</p>"),
+        ("ana@example.com", "Hola", "<p>hola</p>"),
+    ])
+    assert resultados[0]["ok"] is False
+    assert resultados[1]["ok"] is True
+    assert conexiones[0].enviados == ["ana@example.com"]
+
+
+def test_error_al_serializar_no_se_propaga():
+    sesion, _ = sesion_con([ServidorFalso([ValueError("header inválido")])])
+    resultado = sesion.enviar("ana@example.com", "Hola", "<p>hola</p>")
+    assert resultado == {"destinatario": "ana@example.com", "ok": False, "error": "header inválido"}
+
+
+def test_421_reconecta_y_reintenta():
+    limite = smtplib.SMTPDataError(421, b"demasiados mensajes, intente mas tarde")
+    sesion, conexiones = sesion_con([ServidorFalso([limite]), ServidorFalso([])])
+    resultado = sesion.enviar("ana@example.com", "Hola", "<p>hola</p>")
+    assert resultado["ok"] is True
+    assert len(conexiones) == 2
+
+
+def test_destinatario_rechazado_temporalmente_se_reintenta():
+    rechazo = smtplib.SMTPRecipientsRefused({"ana@example.com": (450, b"buzon ocupado")})
+    sesion, conexiones = sesion_con([ServidorFalso([rechazo]), ServidorFalso([])])
+    assert sesion.enviar("ana@example.com", "Hola", "<p>hola</p>")["ok"] is True
+    assert len(conexiones) == 2
+
+
+def test_5xx_no_se_reintenta():
+    rechazo = smtplib.SMTPDataError(554, b"mensaje rechazado")
+    sesion, conexiones = sesion_con([ServidorFalso([rechazo]), ServidorFalso([])])
+    assert sesion.enviar("ana@example.com", "Hola", "<p>hola</p>")["ok"] is False
+    assert len(conexiones) == 1
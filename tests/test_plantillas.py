@@ -0,0 +1,24 @@
+from plantillas import Plantilla
+
+
+def test_escapa_los_campos_y_respeta_html():
+    plantilla = Plantilla("<p>{{ nombre }}</p>{{ extra|html }}")
+    contexto = {"nombre": "<Ana & \"Luz\">", "extra": "<b>ok</b>"}
+    assert plantilla.render(contexto) == "<p>&lt;Ana &amp; &quot;Luz&quot;&gt;</p><b>ok</b>"
+
+
+def test_render_stream_es_igual_a_render():
+    plantilla = Plantilla("a{{ x }}b{{ y }}c")
+    contexto = {"x": 1, "y": "<"}
+    assert "".join(plantilla.render_stream(contexto)) == plantilla.render(contexto) == "a1b&lt;c"
+
+
+def test_fijar_resuelve_constantes():
+    plantilla = Plantilla('<a href="{{ url_base }}/action?id={{ id }}">')
+    fija = plantilla.fijar(url_base="https://x.run.app")
+    assert fija.render({"id": "SOL-1"}) == '<a href="https://x.run.app/action?id=SOL-1">'
+
+
+def test_sin_campos():
+    assert Plantilla("").render({}) == ""
+    assert Plantilla("solo texto {llaves}").render({}) == "solo texto {llaves}"
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import seguridad
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(seguridad, "ADMIN_TOKEN", "secreto")
+
+
+def firma_de(parametros):
+    vence, firma = (p.split("=", 1)[1] for p in parametros.split("&"))
+    return vence, firma
+
+
+def test_sin_admin_token_queda_cerrado(monkeypatch):
+    monkeypatch.setattr(seguridad, "ADMIN_TOKEN", None)
+    with pytest.raises(HTTPException) as error:
+        seguridad.requerir_admin("cualquiera")
+    assert error.value.status_code == 503
+    assert seguridad.parametros_firmados("pendientes") == ""
+    assert not seguridad.firma_valida("pendientes", "9999999999", "x")
+
+
+def test_header_de_administracion(token):
+    seguridad.requerir_admin("secreto")
+    for recibido in (None, "", "otro"):
+        with pytest.raises(HTTPException) as error:
+            seguridad.requerir_admin(recibido)
+        assert error.value.status_code == 401
+
+
+def test_link_firmado(token):
+    vence, firma = firma_de(seguridad.parametros_firmados("pendientes"))
+    assert seguridad.firma_valida("pendientes", vence, firma)
+    assert not seguridad.firma_valida("otra_vista", vence, firma)
+    assert not seguridad.firma_valida("pendientes", str(int(vence) + 1), firma)
+    assert not seguridad.firma_valida("pendientes", "²", firma)
+
+
+def test_link_vencido(token):
+    vence = int(time.time()) - 1
+    assert not seguridad.firma_valida("pendientes", str(vence), seguridad.firmar("pendientes", vence))
+
+
+def test_dependencia_acepta_firma_o_header(token):
+    validar = seguridad.requerir_admin_o_firma("pendientes")
+    validar(None, *firma_de(seguridad.parametros_firmados("pendientes")))
+    validar("secreto", None, None)
+    with pytest.raises(HTTPException):
+        validar(None, "9999999999", "firma-falsa")
+
+
+def test_firma_de_imagen(token, monkeypatch):
+    firma = seguridad.firma_imagen("abcdefghij123")
+    assert seguridad.firma_imagen_valida("abcdefghij123", firma)
+    assert not seguridad.firma_imagen_valida("otroidabcdef", firma)
+    assert not seguridad.firma_imagen_valida("abcdefghij123", None)
+    monkeypatch.setattr(seguridad, "ADMIN_TOKEN", None)
+    assert seguridad.firma_imagen("abcdefghij123") is None
+    assert not seguridad.firma_imagen_valida("abcdefghij123", firma)